@@ -0,0 +1,135 @@
+import os
+
+import sys
+
+import tempfile
+
+import threading
+
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pwm_channel
+
+
+# Checks PwmChannel against a fake sysfs tree (no Pi needed).
+# A small "kernel" thread watches the chip's export/unexport files and
+# creates or removes pwmN with its attribute files, like the real driver.
+# Attribute contents are read back to check what each update wrote.
+
+CHIP = 0
+CHANNEL = 3
+
+
+class FakePwmChip:
+    """pwmchipN directory with export/unexport handled by a polling thread."""
+
+    def __init__(self, root, chip):
+        self.chip_dir = os.path.join(root, f"pwmchip{chip}")
+        os.makedirs(self.chip_dir)
+        for name in ("export", "unexport"):
+            open(os.path.join(self.chip_dir, name), "w").close()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _take(self, name):
+        path = os.path.join(self.chip_dir, name)
+        with open(path) as f:
+            value = f.read().strip()
+        if value:
+            open(path, "w").close()
+        return value
+
+    def _run(self):
+        while self.running:
+            channel = self._take("export")
+            if channel:
+                channel_dir = os.path.join(self.chip_dir, f"pwm{channel}")
+                os.makedirs(channel_dir, exist_ok=True)
+                for name in pwm_channel.ATTRIBUTES:
+                    with open(os.path.join(channel_dir, name), "w") as f:
+                        f.write("0")
+
+            channel = self._take("unexport")
+            if channel:
+                channel_dir = os.path.join(self.chip_dir, f"pwm{channel}")
+                for name in pwm_channel.ATTRIBUTES:
+                    os.remove(os.path.join(channel_dir, name))
+                os.rmdir(channel_dir)
+
+            time.sleep(0.01)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+
+def read_attr(pwm, name, expected):
+    # pwrite at offset 0 does not truncate a regular file (sysfs has no file
+    # length), so only the bytes of the expected value are compared
+    with open(os.path.join(pwm.channel_dir, name)) as f:
+        return f.read()[:len(str(expected))]
+
+
+def check(label, condition):
+    print(f"{'OK  ' if condition else 'FAIL'} {label}")
+    return condition
+
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as root:
+        chip = FakePwmChip(root, CHIP)
+        pwm = pwm_channel.PwmChannel(CHIP, CHANNEL, root=root)
+
+        try:
+            # Export creates pwmN and opens every attribute
+            pwm.export()
+            results.append(check("export created the channel", os.path.isdir(pwm.channel_dir)))
+            results.append(check("attribute files opened", sorted(pwm.fds) == sorted(pwm_channel.ATTRIBUTES)))
+
+            # Period and duty writes
+            period = 20_000_000
+            results.append(check("period written", pwm.set_period(period)))
+            results.append(check("period value", read_attr(pwm, "period", period) == str(period)))
+
+            for duty in (1_500_000, 2_400_000, 500_000):
+                pwm.set_duty(duty)
+                results.append(check(f"duty {duty}", read_attr(pwm, "duty_cycle", duty) == str(duty)))
+
+            # Unchanged values are skipped
+            skipped = pwm.skipped
+            results.append(check("unchanged duty skipped", not pwm.set_duty(500_000)))
+            results.append(check("skip counted", pwm.skipped == skipped + 1))
+
+            # Enable / disable
+            pwm.enable()
+            results.append(check("enable", read_attr(pwm, "enable", 1) == "1"))
+            pwm.disable()
+            results.append(check("disable", read_attr(pwm, "enable", 0) == "0"))
+
+            stats = pwm.latency_stats()
+            print(f"Latency: {stats}")
+            results.append(check("no write errors", stats["errors"] == 0))
+            results.append(check("writes counted", stats["writes"] == 6))
+        finally:
+            # Cleanup closes the descriptors and unexports the channel
+            pwm.unexport()
+            for _ in range(50):
+                if not os.path.exists(pwm.channel_dir):
+                    break
+                time.sleep(0.01)
+            chip.stop()
+
+        results.append(check("descriptors closed", not pwm.fds))
+        results.append(check("unexport removed the channel", not os.path.exists(pwm.channel_dir)))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed.")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import hardware_controller
+import motion_planner
+
+# Compares stepper edge timing with and without the real-time motion thread
+# settings. Moves the aim back and forth between two angles.
+# Run as root to allow SCHED_FIFO and mlockall.
+
+MOVES_PER_CONFIG = 10
+ANGLE_A = 60
+ANGLE_B = 120
+
+CONFIGS = {
+    "main thread": {"lanes": False, "rt": False},
+    "thread, no rt": {"lanes": True, "rt": False},
+    "thread, full rt": {"lanes": True, "rt": True, "cpus": {"stepper": 3, "servo": 2}, "fifo": 50, "mlock": True, "gc": True},
+}
+
+
+def run_config(name, config):
+    hardware_controller.HARDWARE_LANES_ENABLED = config["lanes"]
+    hardware_controller.MOTION_THREAD_ENABLED = config["rt"]
+    if config["rt"]:
+        hardware_controller.MOTION_CPUS = config["cpus"]
+        hardware_controller.MOTION_FIFO_PRIORITY = config["fifo"]
+        hardware_controller.MOTION_LOCK_MEMORY = config["mlock"]
+        hardware_controller.MOTION_DISABLE_GC = config["gc"]
+
+    hardware_controller.setup_all()
+    hardware_controller.home_stepper()
+
+    max_errors, jitters = [], []
+    for i in range(MOVES_PER_CONFIG):
+        angle = ANGLE_A if i % 2 == 0 else ANGLE_B
+        hardware_controller.set_stepper_angle(angle)
+        stats = motion_planner.last_move_stats
+        max_errors.append(stats["max_error_us"])
+        jitters.append(stats["jitter_us"])
+        time.sleep(0.2)
+
+    hardware_controller.cleanup_all()
+
+    print(
+        f"[{name}] worst edge error {max(max_errors):.0f}us, "
+        f"mean jitter {sum(jitters) / len(jitters):.0f}us"
+    )
+
+
+if __name__ == "__main__":
+    for name, config in CONFIGS.items():
+        run_config(name, config)
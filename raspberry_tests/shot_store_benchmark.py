@@ -0,0 +1,100 @@
+import os
+
+import random
+
+import sys
+
+import tempfile
+
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import calibration_store
+
+import shot_store
+
+
+# Nearest-shot lookup with a large shot history (no Pi needed).
+# Records SHOTS random shots into a temporary shot file, checks every query
+# against a brute-force scan and reports the lookup latency: the prompt hints
+# need it well under LATENCY_LIMIT_US per query.
+
+SHOTS = 5000
+QUERIES = 1000
+TABLE_MM = (1000.0, 500.0)
+LATENCY_LIMIT_US = 1000.0
+AIM_CALIBRATION = "benchmark"
+
+
+def brute_force(rows, target, k):
+    distances = sorted(
+        ((row["ball"][0] - target[0]) ** 2 + (row["ball"][1] - target[1]) ** 2) ** 0.5
+        for row in rows
+    )
+    return distances[:k]
+
+
+def random_point(rng):
+    return (rng.uniform(0, TABLE_MM[0]), rng.uniform(0, TABLE_MM[1]))
+
+
+def main():
+    rng = random.Random(1)
+    calibration_store.DATA_DIR = tempfile.mkdtemp()
+
+    store = shot_store.ShotStore()
+    store.open("mm", AIM_CALIBRATION)
+    # The write path is not what is measured: skip the fsync per shot
+    store.conn.execute("PRAGMA synchronous = OFF")
+
+    start = time.perf_counter()
+    for _ in range(SHOTS):
+        store.record(
+            rng.uniform(45, 135), rng.randint(0, 100), random_point(rng), (500.0, 100.0),
+            "mm", rng.randint(0, 300), AIM_CALIBRATION,
+        )
+    print(f"Recorded {SHOTS} shots in {time.perf_counter() - start:.2f}s ({store.indexed} indexed in the tree)")
+
+    # First with the shots recorded since the last rebuild searched linearly,
+    # then reopened (the whole history in one tree)
+    for label in ("with pending shots", "after reopening"):
+        store.query_stats = {"queries": 0, "mean_us": 0.0, "max_us": 0.0}
+        mismatches = 0
+        latencies = []
+        for _ in range(QUERIES):
+            target = random_point(rng)
+            query_start = time.perf_counter_ns()
+            neighbours = store.nearest(target)
+            latencies.append((time.perf_counter_ns() - query_start) / 1000)
+            found = [n["distance"] for n in neighbours]
+            expected = brute_force(store.rows, target, shot_store.HINT_NEIGHBOURS)
+            if any(abs(a - b) > 1e-9 for a, b in zip(found, expected)):
+                mismatches += 1
+
+        stats = store.query_stats
+        print(
+            f"{label}: {QUERIES} queries, {mismatches} mismatches, "
+            f"mean {stats['mean_us']:.0f}us, p99 {sorted(latencies)[int(0.99 * QUERIES)]:.0f}us, "
+            f"max {stats['max_us']:.0f}us"
+        )
+        passed = mismatches == 0 and stats["mean_us"] < LATENCY_LIMIT_US
+        print(f"{'OK' if passed else 'FAIL'} (mean under {LATENCY_LIMIT_US:.0f}us)")
+        if not passed:
+            return 1
+
+        store.open("mm", AIM_CALIBRATION)
+
+    # Shots of another aim calibration are not indexed
+    store.open("mm", "other")
+    if store.rows:
+        print("FAIL: shots of another aim calibration were indexed")
+        return 1
+    print("OK: another aim calibration starts empty")
+
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+import re
+import sys
+import tempfile
+import time
+
+# Runs full games against the simulated table (hal_sim) with a scripted
+# golfer instead of the LLM, and reports wall time vs simulated time.
+# Runs anywhere: no GPIO, PWM, camera, audio or network needed.
+# --calibrate runs the shot calibration (main_controller --calibrate) first.
+
+os.environ["GOLFER_HAL"] = "sim"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import calibration_store
+import hal
+import table_calibration
+import hardware_controller
+import main_controller
+
+GAMES = 3
+MAX_SHOTS = 30
+
+
+class ScriptedGolfer:
+    """Halves its aim and force corrections based on the feedback text."""
+
+    def __init__(self):
+        self.aim, self.force = 90.0, 40
+        self.aim_step, self.force_step = 20.0, 20
+        self.shots = 0
+
+    def start_new_game(self):
+        self.__init__()
+
+    def get_next_shot_decision(self, prompt):
+        if self.shots >= MAX_SHOTS:
+            raise RuntimeError(f"No hole in {MAX_SHOTS} shots")
+        self.shots += 1
+        hint = re.search(r"strike_force of about (\d+)", prompt)
+        nearest = re.search(r"stopped nearest the hole: aim ([\d.]+), force (\d+)", prompt)
+        model = re.search(r"aim_degrees about ([\d.]+) .*? strike_force about (\d+)", prompt)
+        if self.shots == 1 and model:
+            # Inverse shot model fitted on earlier games
+            self.aim, self.force = float(model.group(1)), int(model.group(2))
+            self.aim_step, self.force_step = 2.0, 5
+        elif self.shots == 1 and nearest:
+            # Best shot of earlier games
+            self.aim, self.force = float(nearest.group(1)), int(nearest.group(2))
+            self.aim_step, self.force_step = 2.0, 5
+        elif self.shots == 1 and hint:
+            # Calibrated force for the hole distance
+            self.force, self.force_step = int(hint.group(1)), 5
+        decision = {"aim_degrees": self.aim, "strike_force": self.force, "commentary": "Scripted."}
+        return {"decision": decision, "tool_call_id": f"shot-{self.shots}"}
+
+    def add_tool_response_to_history(self, tool_id, result):
+        if "left" in result:
+            self.aim += self.aim_step
+            self.aim_step = max(self.aim_step / 2, 1.0)
+        elif "right" in result:
+            self.aim -= self.aim_step
+            self.aim_step = max(self.aim_step / 2, 1.0)
+
+        if "lost sight" in result:
+            # Usually rolled off the far end
+            self.force = max(self.force - self.force_step, 0)
+        elif re.search(r"\bshort\b", result):
+            self.force = min(self.force + self.force_step, 100)
+            self.force_step = max(self.force_step // 2, 1)
+        elif "long" in result:
+            self.force = max(self.force - self.force_step, 0)
+            self.force_step = max(self.force_step // 2, 1)
+
+    def get_simple_text_response(self, prompt):
+        return "Scripted reaction."
+
+
+if __name__ == "__main__":
+    # Keep the real calibration data untouched
+    workdir = tempfile.mkdtemp(prefix="golfer_sim_")
+    calibration_store.DATA_DIR = workdir
+    os.chdir(workdir)
+
+    # The simulated field is drawn at the nominal table size
+    table_calibration.TABLE_SIZE_MEASURED = True
+
+    # Real-time thread settings only matter on the Pi
+    hardware_controller.MOTION_THREAD_ENABLED = False
+
+    if "--calibrate" in sys.argv[1:]:
+        sim_start = hal.clock.monotonic()
+        main_controller.run_calibration()
+        print(f"\n[calibration] {hal.clock.monotonic() - sim_start:.0f}s simulated\n")
+
+    for game in range(GAMES):
+        golfer = ScriptedGolfer()
+        wall_start = time.perf_counter()
+        sim_start = hal.clock.monotonic()
+        try:
+            main_controller.run_game(golfer)
+        except SystemExit:
+            pass
+        print(
+            f"\n[game {game + 1}] {golfer.shots} shots, "
+            f"{time.perf_counter() - wall_start:.2f}s wall, "
+            f"{hal.clock.monotonic() - sim_start:.0f}s simulated, "
+            f"ball resets {hardware_controller.reset_stats}\n"
+        )
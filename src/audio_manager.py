@@ -3,6 +3,7 @@ import shutil
 import os
 import sys
 
+import hal
 
 
 def play_speech(text: str):
@@ -14,6 +15,9 @@ def play_speech(text: str):
         return
 
     print(f"Playing audio: '{text}'")
+
+    if hal.SIMULATED:
+        return
     
     # Try Piper TTS first (better quality)
     try:
@@ -4,10 +4,18 @@ import subprocess
 import signal
 import os
 import sys
+from datetime import timedelta
 
 # Button Pin (BCM Number)
 BUTTON_PIN = 16
 
+# Kernel debounce of button edges
+BUTTON_DEBOUNCE = timedelta(milliseconds=20)
+# Presses during an action or within this time after it are ignored (seconds)
+BUTTON_LOCKOUT = 0.5
+# wait_edge_events timeout: only bounds how long Ctrl+C takes to be noticed
+EVENT_WAIT_TIMEOUT = timedelta(seconds=1)
+
 # GPIO Chip Path
 GPIO_CHIP_PATH = "/dev/gpiochip4"
 
@@ -64,6 +72,22 @@ class ServiceManager:
             print("Nothing to stop.")
 
 
+def handle_press(manager):
+    # Simple Logic: Toggle
+    # If running -> Stop
+    # If stopped -> Start
+
+    if manager.running:
+        # Check if process actually died on its own
+        if manager.process.poll() is not None:
+            manager.running = False
+            manager.start_game()  # Restart if it crashed/finished
+        else:
+            manager.stop_game()  # Stop if running
+    else:
+        manager.start_game()
+
+
 def main():
     print("Button Service Started.")
     manager = ServiceManager()
@@ -72,9 +96,13 @@ def main():
     try:
         chip = gpiod.Chip(GPIO_CHIP_PATH)
         # V2: request_lines
+        # Press pulls the line low: debounced, timestamped falling edges
         config = {
             BUTTON_PIN: gpiod.LineSettings(
-                direction=gpiod.line.Direction.INPUT, bias=gpiod.line.Bias.PULL_UP
+                direction=gpiod.line.Direction.INPUT,
+                bias=gpiod.line.Bias.PULL_UP,
+                edge_detection=gpiod.line.Edge.FALLING,
+                debounce_period=BUTTON_DEBOUNCE,
             )
         }
         button_req = chip.request_lines(consumer="ButtonMgr", config=config)
@@ -83,44 +111,39 @@ def main():
         print(f"GPIO Setup Failed: {e}")
         return
 
-    # Button State Tracking
-    last_val = gpiod.line.Value.ACTIVE
+    # Press-to-action latency (kernel edge timestamp -> action started), ms
+    latencies = []
+    ignore_until_ns = 0
 
     try:
         while True:
-            current_val = button_req.get_value(BUTTON_PIN)
-
-            # Detect Falling Edge (Button Press: 1 -> 0)
-            if (
-                last_val == gpiod.line.Value.ACTIVE
-                and current_val == gpiod.line.Value.INACTIVE
-            ):
-                print("Button Pressed!")
-
-                # Simple Logic: Toggle
-                # If running -> Stop
-                # If stopped -> Start
-
-                if manager.running:
-                    # Check if process actually died on its own
-                    if manager.process.poll() is not None:
-                        manager.running = False
-                        manager.start_game()  # Restart if it crashed/finished
-                    else:
-                        manager.stop_game()  # Stop if running
-                else:
-                    manager.start_game()
-
-                # Debounce
-                time.sleep(0.5)
-
-            last_val = current_val
-            time.sleep(0.05)
+            # Blocks in the kernel until a press (no polling while idle)
+            if not button_req.wait_edge_events(EVENT_WAIT_TIMEOUT):
+                continue
+
+            for event in button_req.read_edge_events():
+                if event.event_type != gpiod.EdgeEvent.Type.FALLING_EDGE:
+                    continue
+
+                # Event timestamps use CLOCK_MONOTONIC, like time.monotonic_ns
+                if event.timestamp_ns < ignore_until_ns:
+                    continue
+
+                latency_ms = (time.monotonic_ns() - event.timestamp_ns) / 1e6
+                latencies.append(latency_ms)
+                print(
+                    f"Button Pressed! Press-to-action latency {latency_ms:.2f}ms "
+                    f"(mean {sum(latencies) / len(latencies):.2f}ms, max {max(latencies):.2f}ms)"
+                )
+
+                handle_press(manager)
+                ignore_until_ns = time.monotonic_ns() + int(BUTTON_LOCKOUT * 1e9)
 
     except KeyboardInterrupt:
         print("Exiting...")
         manager.stop_game()
     finally:
+        button_req.release()
         chip.close()
 
 
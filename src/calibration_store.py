@@ -0,0 +1,91 @@
+import os
+
+import json
+
+import numpy as np
+
+
+# Directory for values measured on the rig that should survive a restart
+# (camera exposure, calibration results, ...). Kept next to the sources so
+# it does not depend on the working directory of the button service.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def data_path(name):
+    """Returns the absolute path of a file inside the data directory."""
+    return os.path.join(DATA_DIR, name)
+
+
+def _atomic_replace(path, write_fn):
+    """
+    Writes to a temporary file and renames it over the target, so a crash or
+    power cut mid-write never leaves a truncated calibration file behind.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    write_fn(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_json(name):
+    """Loads a JSON file from the data directory. Returns None if missing or corrupt."""
+    path = data_path(name)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"STORE WARNING: Could not read {path}: {e}")
+        return None
+
+
+def save_json(name, data):
+    """Saves a JSON-serializable object to the data directory."""
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    try:
+        _atomic_replace(data_path(name), write)
+    except OSError as e:
+        print(f"STORE WARNING: Could not write {name}: {e}")
+
+
+def load_array(name):
+    """Loads a NumPy array (.npy) from the data directory. Returns None if missing or corrupt."""
+    path = data_path(name)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError) as e:
+        print(f"STORE WARNING: Could not read {path}: {e}")
+        return None
+
+
+def save_array(name, array):
+    """Saves a NumPy array (.npy) to the data directory."""
+
+    def write(tmp_path):
+        # np.save appends .npy to names without it, so write through a file object
+        with open(tmp_path, "wb") as f:
+            np.save(f, array, allow_pickle=False)
+
+    try:
+        _atomic_replace(data_path(name), write)
+    except OSError as e:
+        print(f"STORE WARNING: Could not write {name}: {e}")
+
+
+def remove(name):
+    """Deletes a file from the data directory if it exists."""
+    try:
+        os.remove(data_path(name))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"STORE WARNING: Could not remove {name}: {e}")
@@ -1,10 +1,20 @@
 import math
 
 
-def get_fuzzy_feedback(ball_pos, hole_pos):
+# Distance thresholds (tiny, moderate, large miss) per coordinate unit.
+# Pixel thresholds are in the vision reference frame (640x480, positions are
+# normalized to it whatever the capture resolution). Millimetre thresholds
+# apply to table coordinates from table_calibration and mean the same
+# physical distance everywhere on the field.
+PIXEL_THRESHOLDS = (10, 60, 120)
+MM_THRESHOLDS = (15, 100, 200)
+
+
+def get_fuzzy_feedback(ball_pos, hole_pos, units="px"):
     """
-    Converts precise pixel coordinates into vague, natural language feedback.
-    Coordinate system: X=0 is left, Y=0 is top.
+    Converts precise coordinates into vague, natural language feedback.
+    Coordinate system: X=0 is left, Y=0 is top (table coordinates use the same
+    orientation). units: "px" for vision coordinates, "mm" for table coordinates.
     """
 
     # Vector from Hole TO Ball
@@ -17,11 +27,10 @@ def get_fuzzy_feedback(ball_pos, hole_pos):
 
     dy = ball_pos[1] - hole_pos[1]
 
-    # Distance thresholds in pixels (based on 640x480 resolution)
     # Tightened thresholds for harsher feedback
-    TINY_MISS = 10
-    MODERATE_MISS = 60
-    LARGE_MISS = 120
+    TINY_MISS, MODERATE_MISS, LARGE_MISS = (
+        MM_THRESHOLDS if units == "mm" else PIXEL_THRESHOLDS
+    )
 
     feedback_parts = []
 
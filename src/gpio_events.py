@@ -0,0 +1,69 @@
+import threading
+
+import time
+
+from datetime import timedelta
+
+
+# Edge events from gpiod v2 line requests.
+# The kernel timestamps each (debounced) edge; a watcher thread blocks in
+# wait_edge_events and flags the edge, so callers test a threading.Event
+# instead of reading the line.
+
+# How often a blocked watcher wakes up to check for stop()
+WAIT_TIMEOUT = timedelta(milliseconds=200)
+
+
+class EdgeWatcher(threading.Thread):
+    """
+    Waits for edges of one type on a line request and sets `triggered`.
+    request: gpiod LineRequest with edge_detection configured
+    offset: line to watch
+    event_type: gpiod.EdgeEvent.Type to react to (e.g. FALLING_EDGE)
+    clock_ns: time source matching the request's event clock (CLOCK_MONOTONIC
+    by default, i.e. time.monotonic_ns / time.perf_counter_ns on Linux)
+    """
+
+    def __init__(self, request, offset, event_type, clock_ns=time.monotonic_ns, name="edge-watcher"):
+        super().__init__(name=name, daemon=True)
+        self.request = request
+        self.offset = offset
+        self.event_type = event_type
+        self.clock_ns = clock_ns
+
+        self.triggered = threading.Event()
+        self.event_timestamp_ns = None
+        self.latency_ns = None  # Kernel timestamp -> flag set
+
+        self._stopping = threading.Event()
+
+    def arm(self, already_triggered=False):
+        """Clears the flag before a new wait (set it right away if the line is already in the target state)."""
+        self.event_timestamp_ns = None
+        self.latency_ns = None
+        if already_triggered:
+            self.triggered.set()
+        else:
+            self.triggered.clear()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                if not self.request.wait_edge_events(WAIT_TIMEOUT):
+                    continue
+                events = self.request.read_edge_events()
+            except OSError as e:
+                print(f"GPIO Warning: edge watcher stopped ({e})")
+                return
+
+            for event in events:
+                if event.line_offset != self.offset or event.event_type != self.event_type:
+                    continue
+                if not self.triggered.is_set():
+                    self.event_timestamp_ns = event.timestamp_ns
+                    self.latency_ns = self.clock_ns() - event.timestamp_ns
+                    self.triggered.set()
+
+    def stop(self, timeout=1.0):
+        self._stopping.set()
+        self.join(timeout)
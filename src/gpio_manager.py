@@ -0,0 +1,41 @@
+# Owns the process's GPIO lines: one gpiod request for every line, made once
+# at startup and released once at shutdown. Lines requested separately (or
+# again on every use) pay the request cost each time and stay busy if a
+# request is leaked.
+
+
+class GpioManager:
+    """
+    gpiod: the gpiod module (hal.gpiod)
+    chip_path: e.g. "/dev/gpiochip4"
+    lines: dict pin -> gpiod.LineSettings, all requested together
+    """
+
+    def __init__(self, gpiod, chip_path, lines, consumer="llm_golfer"):
+        self.gpiod = gpiod
+        self.chip = gpiod.Chip(chip_path)
+        try:
+            self.request = self.chip.request_lines(consumer=consumer, config=lines)
+        except Exception:
+            self.chip.close()
+            raise
+        self.pins = tuple(lines)
+
+    def set_value(self, pin, value):
+        self.request.set_value(pin, value)
+
+    def get_value(self, pin):
+        return self.request.get_value(pin)
+
+    def set_values(self, values):
+        """Sets several outputs in one call (dict pin -> Value), atomically."""
+        self.request.set_values(values)
+
+    def release(self):
+        """Releases all lines and closes the chip. Safe to call twice."""
+        if self.request is not None:
+            self.request.release()
+            self.request = None
+        if self.chip is not None:
+            self.chip.close()
+            self.chip = None
@@ -0,0 +1,122 @@
+import os
+
+import time
+
+import threading
+
+
+# Hardware abstraction layer.
+# Hardware modules reach GPIO, PWM, the camera and the clock through this
+# module instead of importing gpiod/picamera2 or calling time.sleep directly:
+#   gpiod        gpiod v2 API (Chip, LineSettings, line.Value/Direction/Bias),
+#                imported on first use so GPIO-free modules (vision, audio)
+#                can import hal without libgpiod
+#   backend      pwm_channel(chip, channel) and open_camera() factories
+#   clock        monotonic(), perf_counter_ns(), sleep(), advance_to()
+# The backend is chosen when this module is first imported, from the
+# GOLFER_HAL environment variable: "pi" (default) or "sim" (hal_sim: simulated
+# table with a virtual clock, so a full game runs off the Pi in milliseconds).
+# Select it before importing hardware_controller or vision_system.
+
+BACKEND_ENV = "GOLFER_HAL"
+DEFAULT_BACKEND = "pi"
+
+
+class RealClock:
+    """Wall clock: time.monotonic/perf_counter_ns/sleep."""
+
+    virtual = False
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def perf_counter_ns(self):
+        return time.perf_counter_ns()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def advance_to(self, deadline_ns):
+        """Blocks until perf_counter_ns() reaches deadline_ns."""
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+
+
+class VirtualClock:
+    """
+    Simulated clock: sleeping advances virtual time instantly.
+    Shared by all threads, so sleeps on concurrent threads add up rather
+    than overlap; durations are exact per phase, not for the whole run.
+    """
+
+    virtual = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ns = 0
+
+    def monotonic(self):
+        return self._ns / 1e9
+
+    def perf_counter_ns(self):
+        return self._ns
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._ns += int(seconds * 1e9)
+
+    def advance_to(self, deadline_ns):
+        with self._lock:
+            self._ns = max(self._ns, int(deadline_ns))
+
+
+class PiBackend:
+    """The real hardware: libgpiod, sysfs PWM and Picamera2."""
+
+    name = "pi"
+
+    def __init__(self):
+        self.clock = RealClock()
+
+    @property
+    def gpiod(self):
+        import gpiod
+
+        return gpiod
+
+    def pwm_channel(self, chip, channel):
+        import pwm_channel
+
+        return pwm_channel.PwmChannel(chip, channel)
+
+    def open_camera(self):
+        from picamera2 import Picamera2
+
+        return Picamera2()
+
+
+def _create_backend(name):
+    if name == "pi":
+        return PiBackend()
+    if name == "sim":
+        import hal_sim
+
+        return hal_sim.SimBackend()
+    raise ValueError(f"Unknown {BACKEND_ENV} backend: {name}")
+
+
+backend = _create_backend(os.environ.get(BACKEND_ENV, DEFAULT_BACKEND))
+
+clock = backend.clock
+
+SIMULATED = backend.name == "sim"
+
+
+def __getattr__(name):
+    # hal.gpiod: resolved on first use (see above)
+    if name == "gpiod":
+        return backend.gpiod
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,432 @@
+import enum
+
+import math
+
+import threading
+
+import types
+
+import numpy as np
+
+import cv2
+
+import hal
+
+import pwm_channel
+
+
+# Simulated table for the "sim" HAL backend (GOLFER_HAL=sim).
+# A SimWorld keeps the state the real hardware would have: stepper position,
+# limit switch, servo duty, actuator extension and the ball. Stepping, swings
+# and ball resets move the ball; the simulated camera renders the field, hole
+# and ball so the real vision code runs unchanged. All timing uses the
+# backend's VirtualClock.
+
+# Wiring (hardware_controller pin numbers and PWM channels)
+SIM_STEP_PIN = 20
+SIM_DIR_PIN = 21
+SIM_LIMIT_SWITCH_PIN = 4
+SIM_ENABLE_PIN = 22
+SIM_ACTUATOR_PINS = (17, 27)  # (extend, retract)
+SIM_SERVO_CHANNEL = 3
+SIM_ACTUATOR_CHANNEL = 2
+
+# Stepper: steps from the limit switch (step 0 = 180 deg, 300 = 0 deg)
+SIM_STEPS_FOR_180_DEGREES = 300
+SIM_START_STEP = 120  # Position at power-up (unknown to the controller)
+
+# Servo (pulse widths in ns, as in hardware_controller)
+SIM_SERVO_REST_NS = 1500 * 1000
+SIM_SERVO_MAX_BACKSWING_NS = 800 * 1000
+SIM_SERVO_MAX_RATE = 4_000_000  # Fastest servo sweep (duty ns per second)
+SIM_SWEEP_GAP = 0.1  # Writes further apart than this are separate commands (s)
+
+# Scene, in reference (640x480) pixels inside vision_system.FIELD_CORNERS
+SIM_TEE = (290, 310)  # Near the bottom of the image; shots roll up (toward y=0)
+SIM_HOLE = (290, 130)
+SIM_HOLE_RADIUS = 10
+SIM_BALL_RADIUS = 8
+SIM_MAX_SHOT_PX = 700  # Roll distance at full backswing and full servo speed
+SIM_ROLLBACK_TIME = 4.0  # Actuator extension (s) after which the ball is back on the tee
+
+SIM_FIELD_BGR = (40, 140, 40)
+SIM_BORDER_BGR = (30, 50, 80)
+SIM_HOLE_BGR = (15, 15, 15)
+
+
+# Minimal gpiod v2 API (the parts hardware_controller uses)
+
+class Value(enum.Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class Direction(enum.Enum):
+    AS_IS = 1
+    INPUT = 2
+    OUTPUT = 3
+
+
+class Bias(enum.Enum):
+    AS_IS = 1
+    UNKNOWN = 2
+    DISABLED = 3
+    PULL_UP = 4
+    PULL_DOWN = 5
+
+
+class Edge(enum.Enum):
+    NONE = 1
+    RISING = 2
+    FALLING = 3
+    BOTH = 4
+
+
+class EdgeEvent:
+    class Type(enum.Enum):
+        RISING_EDGE = 1
+        FALLING_EDGE = 2
+
+    def __init__(self, event_type, timestamp_ns, line_offset):
+        self.event_type = event_type
+        self.timestamp_ns = timestamp_ns
+        self.line_offset = line_offset
+
+
+class LineSettings:
+    def __init__(
+        self, direction=Direction.AS_IS, output_value=Value.INACTIVE, bias=Bias.AS_IS,
+        edge_detection=Edge.NONE, **kwargs,
+    ):
+        self.direction = direction
+        self.output_value = output_value
+        self.bias = bias
+        self.edge_detection = edge_detection
+
+
+# Max real time an edge waits for the watching thread to take it (seconds)
+SIM_EDGE_DELIVERY_TIMEOUT = 0.5
+
+
+class SimLineRequest:
+    """
+    Edge events are delivered synchronously: the thread causing an edge waits
+    until a thread blocked in wait_edge_events has read it and come back to
+    wait, as if the watcher always woke up before the next step.
+    """
+
+    def __init__(self, world, consumer, config):
+        self.world = world
+        self.consumer = consumer
+        self.offsets = []
+        self.edges = {}
+
+        self._cond = threading.Condition()
+        self._events = []
+        self._waiting = False
+        self._has_reader = False
+
+        for key, settings in config.items():
+            offsets = key if isinstance(key, tuple) else (key,)
+            for offset in offsets:
+                self.offsets.append(offset)
+                if settings.direction == Direction.OUTPUT:
+                    world.set_line(offset, settings.output_value)
+                if settings.edge_detection != Edge.NONE:
+                    self.edges[offset] = settings.edge_detection
+        if self.edges:
+            world.edge_requests.append(self)
+
+    def set_value(self, offset, value):
+        self.world.set_line(offset, value)
+
+    def get_value(self, offset):
+        return self.world.get_line(offset)
+
+    def set_values(self, values):
+        with self.world.lock:
+            for offset, value in values.items():
+                self.world.set_line(offset, value)
+
+    def get_values(self, offsets=None):
+        return [self.world.get_line(offset) for offset in (offsets or self.offsets)]
+
+    def push_edge(self, offset, rising, timestamp_ns):
+        edge = self.edges.get(offset)
+        if edge is None or edge == (Edge.FALLING if rising else Edge.RISING):
+            return
+        event_type = EdgeEvent.Type.RISING_EDGE if rising else EdgeEvent.Type.FALLING_EDGE
+        with self._cond:
+            self._events.append(EdgeEvent(event_type, timestamp_ns, offset))
+            self._cond.notify_all()
+            if not self._has_reader:
+                return
+            self._cond.wait_for(
+                lambda: not self._events and self._waiting, SIM_EDGE_DELIVERY_TIMEOUT
+            )
+
+    def wait_edge_events(self, timeout=None):
+        if hasattr(timeout, "total_seconds"):
+            timeout = timeout.total_seconds()
+        with self._cond:
+            self._has_reader = True
+            self._waiting = True
+            self._cond.notify_all()
+            ready = self._cond.wait_for(lambda: self._events, timeout)
+            self._waiting = False
+            return bool(ready)
+
+    def read_edge_events(self, max_events=None):
+        with self._cond:
+            events, self._events = self._events, []
+            return events
+
+    def release(self):
+        self.offsets = []
+        if self in self.world.edge_requests:
+            self.world.edge_requests.remove(self)
+
+
+class SimChip:
+    def __init__(self, world, path):
+        self.world = world
+        self.path = path
+
+    def request_lines(self, config, consumer=None, **kwargs):
+        return SimLineRequest(self.world, consumer, config)
+
+    def close(self):
+        pass
+
+
+class SimPwmChannel(pwm_channel.PwmChannel):
+    """PwmChannel whose attribute writes go to the SimWorld instead of sysfs."""
+
+    def __init__(self, world, chip, channel):
+        super().__init__(chip, channel, root="sim")
+        self.world = world
+
+    def export(self):
+        pass
+
+    def open(self):
+        pass
+
+    def write(self, name, value):
+        if self.values.get(name) == value:
+            self.skipped += 1
+            return False
+        self.writes += 1
+        self.values[name] = value
+        self.world.set_pwm(self.channel, name, value)
+        return True
+
+    def close(self):
+        self.values = {}
+
+    def unexport(self):
+        self.close()
+
+
+class SimCamera:
+    """Picamera2 stand-in: renders the SimWorld as a raw (upside-down) XBGR frame."""
+
+    def __init__(self, world):
+        self.world = world
+        self.size = (640, 480)
+        self.controls = {}
+
+    def create_preview_configuration(self, main=None, **kwargs):
+        return {"main": main or {"size": self.size}}
+
+    def configure(self, config):
+        self.size = tuple(config["main"]["size"])
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+    def set_controls(self, controls):
+        self.controls.update(controls)
+
+    def capture_metadata(self):
+        return {"ExposureTime": 10000, "AnalogueGain": 1.0, "ColourGains": (1.8, 1.5)}
+
+    def capture_array(self):
+        frame = self.world.render(self.size)
+        frame = cv2.rotate(frame, cv2.ROTATE_180)
+        return np.dstack([frame, np.full(frame.shape[:2], 255, np.uint8)])
+
+
+class SimWorld:
+    """State of the simulated table. Thread-safe: lines are set from the motion thread."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.lock = threading.RLock()
+
+        self.lines = {}
+        self.step = SIM_START_STEP
+        self.edge_requests = []
+
+        self.servo_duty = SIM_SERVO_REST_NS
+        self.servo_last_write = None
+        self.backswing_ns = SIM_SERVO_REST_NS
+
+        self.actuator_duty = 0
+        self.actuator_extension = 0.0  # Seconds of extension
+        self.actuator_since = clock.monotonic()
+
+        self.ball = SIM_TEE
+        self.shots = []
+
+    # GPIO
+
+    def set_line(self, offset, value):
+        with self.lock:
+            previous = self.lines.get(offset)
+            if offset in SIM_ACTUATOR_PINS:
+                self._update_actuator()
+            self.lines[offset] = value
+
+            if offset == SIM_STEP_PIN and value == Value.ACTIVE and previous != Value.ACTIVE:
+                self._on_step()
+
+    def get_line(self, offset):
+        with self.lock:
+            if offset == SIM_LIMIT_SWITCH_PIN:
+                # Pulled up, pressed shorts to ground
+                return Value.INACTIVE if self.step <= 0 else Value.ACTIVE
+            return self.lines.get(offset, Value.INACTIVE)
+
+    def _on_step(self):
+        if self.lines.get(SIM_ENABLE_PIN) != Value.INACTIVE:
+            return  # Driver disabled (enable is active low)
+        was_pressed = self.step <= 0
+        if self.lines.get(SIM_DIR_PIN) == Value.ACTIVE:
+            self.step = max(self.step - 1, 0)  # Toward the limit switch
+        else:
+            self.step = min(self.step + 1, SIM_STEPS_FOR_180_DEGREES + 50)
+
+        pressed = self.step <= 0
+        if pressed != was_pressed:
+            # Pressing pulls the line low: falling edge
+            for request in list(self.edge_requests):
+                request.push_edge(SIM_LIMIT_SWITCH_PIN, not pressed, self.clock.perf_counter_ns())
+
+    def aim_degrees(self):
+        return 180.0 * (1.0 - self.step / SIM_STEPS_FOR_180_DEGREES)
+
+    # PWM
+
+    def set_pwm(self, channel, name, value):
+        if name != "duty_cycle":
+            return
+        with self.lock:
+            if channel == SIM_SERVO_CHANNEL:
+                self._on_servo(value)
+            elif channel == SIM_ACTUATOR_CHANNEL:
+                self._update_actuator()
+                self.actuator_duty = value
+
+    def _on_servo(self, duty):
+        now = self.clock.monotonic()
+        previous = self.servo_duty
+        gap = now - self.servo_last_write if self.servo_last_write is not None else math.inf
+        self.servo_duty = duty
+        self.servo_last_write = now
+
+        if duty < SIM_SERVO_REST_NS:
+            self.backswing_ns = min(self.backswing_ns, duty)
+            return
+
+        # Club passes the ball (at the rest position) moving forward
+        if previous < SIM_SERVO_REST_NS <= duty:
+            rate = SIM_SERVO_MAX_RATE if gap > SIM_SWEEP_GAP else (duty - previous) / gap
+            self._strike(min(rate, SIM_SERVO_MAX_RATE) / SIM_SERVO_MAX_RATE)
+            self.backswing_ns = SIM_SERVO_REST_NS
+
+    def _strike(self, speed):
+        depth = (SIM_SERVO_REST_NS - self.backswing_ns) / (SIM_SERVO_REST_NS - SIM_SERVO_MAX_BACKSWING_NS)
+        distance = SIM_MAX_SHOT_PX * min(max(depth, 0.0), 1.0) * speed
+        angle = math.radians(self.aim_degrees())
+        # 90 deg straight up the image, 45 deg to the left (smaller x)
+        x = self.ball[0] - distance * math.cos(angle)
+        y = self.ball[1] - distance * math.sin(angle)
+
+        if math.dist((x, y), SIM_HOLE) <= SIM_HOLE_RADIUS:
+            x, y = SIM_HOLE
+        self.ball = (int(round(x)), int(round(y)))
+        self.shots.append({"aim": self.aim_degrees(), "distance": distance, "ball": self.ball})
+
+    def _update_actuator(self):
+        """Integrates actuator motion since the last change."""
+        now = self.clock.monotonic()
+        elapsed = now - self.actuator_since
+        self.actuator_since = now
+        if self.actuator_duty <= 0:
+            return
+
+        extend, retract = (self.lines.get(pin) == Value.ACTIVE for pin in SIM_ACTUATOR_PINS)
+        if extend and not retract:
+            self.actuator_extension += elapsed
+        elif retract and not extend:
+            self.actuator_extension = max(self.actuator_extension - elapsed, 0.0)
+
+        if self.actuator_extension >= SIM_ROLLBACK_TIME:
+            self.ball = SIM_TEE
+
+    # Camera
+
+    def render(self, size):
+        """BGR frame in physical orientation (reference scene scaled to size)."""
+        import vision_system
+
+        with self.lock:
+            self._update_actuator()
+            ball = self.ball
+
+        width, height = size
+        sx = width / vision_system.REFERENCE_WIDTH
+        sy = height / vision_system.REFERENCE_HEIGHT
+
+        def scale(point):
+            return (int(round(point[0] * sx)), int(round(point[1] * sy)))
+
+        frame = np.empty((height, width, 3), np.uint8)
+        frame[:] = SIM_BORDER_BGR
+        corners = np.array([scale(c) for c in vision_system.FIELD_CORNERS], np.int32)
+        cv2.fillPoly(frame, [corners], SIM_FIELD_BGR)
+        cv2.circle(frame, scale(SIM_HOLE), int(SIM_HOLE_RADIUS * sx), SIM_HOLE_BGR, -1)
+        if ball is not None:
+            cv2.circle(frame, scale(ball), int(SIM_BALL_RADIUS * sx), (255, 255, 255), -1)
+        return frame
+
+
+class SimBackend:
+    """HAL backend for the simulated table (see hal)."""
+
+    name = "sim"
+
+    def __init__(self):
+        self.clock = hal.VirtualClock()
+        self.world = SimWorld(self.clock)
+
+        line = types.SimpleNamespace(Value=Value, Direction=Direction, Bias=Bias, Edge=Edge)
+        self.gpiod = types.SimpleNamespace(
+            Chip=lambda path: SimChip(self.world, path),
+            LineSettings=LineSettings,
+            EdgeEvent=EdgeEvent,
+            line=line,
+        )
+
+    def pwm_channel(self, chip, channel):
+        return SimPwmChannel(self.world, chip, channel)
+
+    def open_camera(self):
+        return SimCamera(self.world)
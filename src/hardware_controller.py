@@ -2,11 +2,32 @@ import time
 
 import sys
 
-import numpy as np
+from datetime import timedelta
 
-import os
+import math
 
-import gpiod
+import hal
+
+import functools
+
+import signal
+
+import threading
+
+import motion_planner
+
+import hardware_executor
+
+import swing_profiles
+
+import calibration_store
+
+import gpio_events
+
+import gpio_manager
+
+# libgpiod, or its simulated stand-in (see hal)
+gpiod = hal.gpiod
 
 # Stepper Motor
 
@@ -20,6 +41,9 @@ DIR_PIN = 21
 
 LIMIT_SWITCH_PIN = 4
 
+# Kernel debounce of the limit switch edge (adds this much latency to the stop)
+LIMIT_SWITCH_DEBOUNCE = timedelta(milliseconds=1)
+
 ENABLE_PIN = 22
 
 # Stepper calibration: steps required for 180 degree rotation
@@ -29,6 +53,10 @@ TOTAL_STEPS_FOR_180_DEGREES = 300
 # Negative value = moves strictly towards limit switch (counter-clockwise/home)
 STEPPER_CENTER_OFFSET = -10
 
+# Measured angle -> steps lookup (shot_calibration.AimTable), installed by the
+# controller at startup. Without a calibration the formula below is used.
+aim_table = None
+
 
 # Speeds
 
@@ -36,6 +64,45 @@ HOMING_SPEED = 0.002
 
 MOVE_SPEED = 0.001
 
+# Aim moves use an acceleration-limited step schedule (see motion_planner.PROFILES)
+# "constant" reproduces the old fixed MOVE_SPEED stepping
+MOTION_PROFILE = "trapezoid"
+
+# Hardware executor: each device runs its commands on its own thread, away
+# from OpenCV and HTTP work (and from each other).
+# HARDWARE_LANES_ENABLED = False runs every command on the caller's thread.
+HARDWARE_LANES_ENABLED = True
+
+# Devices with their own command lane
+STEPPER = "stepper"
+SERVO = "servo"
+ACTUATOR = "actuator"
+
+# Optional real-time motion threads: with MOTION_THREAD_ENABLED the stepper
+# and servo lanes get the options below. Each degrades gracefully (e.g. when
+# not running as root); set to None/False to compare jitter without it.
+MOTION_THREAD_ENABLED = False
+# One core per lane: both may be moving (or spin-waiting) at the same time
+MOTION_CPUS = {STEPPER: 3, SERVO: 2}  # Last two cores of the Pi 5
+MOTION_FIFO_PRIORITY = 50  # SCHED_FIFO priority
+MOTION_LOCK_MEMORY = True  # mlockall (whole process)
+MOTION_DISABLE_GC = True  # No GC pauses while a move runs (whole process)
+
+# Safety bound on homing steps (the old loop crawled forever without a switch)
+HOMING_MAX_STEPS = TOTAL_STEPS_FOR_180_DEGREES * 3
+
+# Homing: fast ramped approach to the limit switch, back off, then a slow
+# re-approach at HOMING_SPEED for a precise trigger point. Step 0 is
+# HOMING_ZERO_OFFSET_STEPS away from the switch.
+HOMING_BACKOFF_STEPS = 15
+HOMING_ZERO_OFFSET_STEPS = 10
+
+# The aim position is saved on clean shutdown. At the next start a quick move
+# to step 0 plus a slow creep must hit the switch within this many steps of
+# HOMING_ZERO_OFFSET_STEPS, otherwise a full home runs.
+STEPPER_STATE_FILE = "stepper_position.json"
+HOMING_VERIFY_TOLERANCE = 3
+
 
 # Servo Motor
 # Pulse widths in nanoseconds (1ms = 1,000,000ns)
@@ -51,15 +118,33 @@ SERVO_REST_POS_NS = 1500 * 1000  # Middle/neutral position
 SERVO_MAX_SWING_NS = 800 * 1000  # Full backswing (servo mounted upside down)
 SERVO_FORWARD_SWING_NS = 2500 * 1000  # Full forward swing
 
+# Swing profiles (see swing_profiles.CURVES): "linear" keeps the original
+# power -> strike mapping; "minimum_jerk" and "exponential" change the feel
+SWING_CURVE = "linear"
+SWING_UPDATE_RATE = 100  # Hz, duty-cycle updates during the forward swing
+SWING_MAX_DURATION = 2.0  # Forward swing at 0% power
+SWING_MIN_DURATION = 0.05  # Forward swing at 80% power
+
 
 # Linear Actuator
 
+ACTUATOR_EXTEND_PIN = 17
+ACTUATOR_RETRACT_PIN = 27
+
 ACTUATOR_PWM_CHIP = 0
 
 ACTUATOR_PWM_CHANNEL = 2  # GPIO 18
 
 ACTUATOR_PWM_FREQ = 1000
 
+# Reset cycle timing (seconds). With a tee check the extension stops once the
+# ball has settled on the tee; the fixed times are the safety net.
+ACTUATOR_EXTEND_TIME = 25  # Full extension / extension timeout
+ACTUATOR_HOLD_TIME = 3  # Extra wait at full extension for the ball to roll back
+ACTUATOR_SETTLE_TIME = 1.0  # Ball must stay on the tee this long
+ACTUATOR_POLL_INTERVAL = 0.2  # Tee checks while tilting
+ACTUATOR_RETRACT_MARGIN = 1.2  # Retract a bit longer than extended, to reach the end stop
+
 
 # Directions
 
@@ -70,81 +155,103 @@ COUNTER_CLOCKWISE = 0
 
 # Handles
 
-gpiod_chip = None
+# All GPIO lines, requested once in setup_all (gpio_manager.GpioManager)
+gpio = None
 
-step_line, dir_line, limit_switch_line, enable_line = None, None, None, None
+# Waits for limit switch press events (gpio_events.EdgeWatcher)
+limit_watcher = None
 
 current_stepper_position = 0
 
+# False until homed or verified in this session (only then is the position saved)
+stepper_position_known = False
 
-# Low Level Functions
-
-
-def pwm_write(chip, channel, file, value):
-    """Safely writes to a PWM file."""
-
-    path = f"/sys/class/pwm/pwmchip{chip}/pwm{channel}/{file}"
-
-    try:
-
-        with open(path, "w") as f:
-
-            f.write(str(value))
+# hardware_executor.HardwareExecutor, created in setup_all
+executor = None
 
-    except Exception as e:
-        # Suppress errors during cleanup
-        pass
+# Set by cleanup_all (e.g. after Ctrl+C): actuator and stepper waits abort
+# with HardwareStopped instead of running to the end
+stop_requested = threading.Event()
 
+# Ball reset outcomes (see reset_ball_actuator)
+reset_stats = {"resets": 0, "checked": 0, "settled": 0, "total_s": 0.0}
 
-def pwm_export(chip, channel):
-    """Exports a PWM channel and waits for filesystem to initialize."""
+# Timing of the last forward swing (see swing_profiles.play)
+last_swing_stats = None
 
-    export_path = f"/sys/class/pwm/pwmchip{chip}/export"
+# PWM channels: attribute files stay open, so a duty update is one pwrite()
+servo_pwm = hal.backend.pwm_channel(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL)
 
-    pwm_dir = f"/sys/class/pwm/pwmchip{chip}/pwm{channel}"
+actuator_pwm = hal.backend.pwm_channel(ACTUATOR_PWM_CHIP, ACTUATOR_PWM_CHANNEL)
 
-    if os.path.exists(pwm_dir):
 
-        return  # Already exported
+# Low Level Functions
 
-    try:
 
-        with open(export_path, "w") as f:
+class HardwareStopped(Exception):
+    """A command was aborted because a stop was requested."""
 
-            f.write(str(channel))
 
-    except (IOError, OSError):
+def _check_stop():
+    if stop_requested.is_set():
+        raise HardwareStopped("stop requested")
 
-        # Device likely busy or already exported
 
-        pass
+def _sleep_unless_stopped(seconds):
+    """hal.clock.sleep in ACTUATOR_POLL_INTERVAL slices; raises HardwareStopped on a stop request."""
+    remaining = seconds
+    while remaining > 0:
+        _check_stop()
+        interval = min(remaining, ACTUATOR_POLL_INTERVAL)
+        hal.clock.sleep(interval)
+        remaining -= interval
+    _check_stop()
 
-    # Wait for OS to create the PWM files
-    for _ in range(10):
 
-        if os.path.exists(pwm_dir):
-            return
+def _on_lane(device):
+    """
+    Runs the decorated command on the device's executor lane. Calling it
+    blocks until the command is done; fn.submit(...) queues it and returns a
+    Future (with submitted_at/started_at/completed_at) without waiting.
+    Both run inline when the executor is not running.
+    """
 
-        time.sleep(0.1)
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if executor is None:
+                return fn(*args, **kwargs)
+            return executor.run(device, fn, *args, **kwargs)
 
-    print(f"PWM Export warning: {pwm_dir} did not appear quickly.")
+        def submit_command(*args, **kwargs):
+            if executor is None:
+                return hardware_executor.run_inline(fn, *args, **kwargs)
+            return executor.submit(device, fn, *args, **kwargs)
 
+        wrapper.submit = submit_command
+        return wrapper
 
-def pwm_unexport(chip, channel):
+    return decorate
 
-    try:
 
-        with open(f"/sys/class/pwm/pwmchip{chip}/unexport", "w") as f:
+def pwm_latency_stats():
+    """PWM update latency achieved by each channel (see PwmChannel.latency_stats)."""
+    return {
+        "servo": servo_pwm.latency_stats(),
+        "actuator": actuator_pwm.latency_stats(),
+    }
 
-            f.write(str(channel))
 
-    except:
-        pass
+def print_pwm_latency(*_):
+    """Prints the PWM latency report. Also the SIGUSR1 handler (kill -USR1 <pid>)."""
+    print(f"PWM update latency: {pwm_latency_stats()}")
 
 
 def setup_all():
 
-    global gpiod_chip, step_line, dir_line, limit_switch_line, enable_line
+    global gpio
+
+    stop_requested.clear()
 
     print("Attempting to open GPIO chip...")
 
@@ -153,60 +260,34 @@ def setup_all():
 
     print(f"Using Hardcoded GPIO Chip: {target_chip}")
 
-    try:
-
-        gpiod_chip = gpiod.Chip(target_chip)
-
-    except Exception as e:
-        print(f"Error: Could not open {target_chip}. {e}")
-        raise e
-
     print("Configuring Lines...")
 
-    try:
-        # Configure GPIO lines using gpiod v2 API
-
-        # STEP PIN
-        config = {
-            STEP_PIN: gpiod.LineSettings(
-                direction=gpiod.line.Direction.OUTPUT,
-                output_value=gpiod.line.Value.INACTIVE,
-            )
-        }
-        step_line = gpiod_chip.request_lines(consumer="stepper_step", config=config)
-
-        # DIR PIN
-        config = {
-            DIR_PIN: gpiod.LineSettings(
-                direction=gpiod.line.Direction.OUTPUT,
-                output_value=gpiod.line.Value.INACTIVE,
-            )
-        }
-        dir_line = gpiod_chip.request_lines(consumer="stepper_dir", config=config)
-
-        # ENABLE PIN
-        # Default to 1 (Disable) on start
-        config = {
-            ENABLE_PIN: gpiod.LineSettings(
-                direction=gpiod.line.Direction.OUTPUT,
-                output_value=gpiod.line.Value.ACTIVE,
-            )
-        }
-        enable_line = gpiod_chip.request_lines(consumer="stepper_enable", config=config)
-
-        # LIMIT SWITCH
-        config = {
-            LIMIT_SWITCH_PIN: gpiod.LineSettings(
-                direction=gpiod.line.Direction.INPUT, bias=gpiod.line.Bias.PULL_UP
-            )
-        }
-        limit_switch_line = gpiod_chip.request_lines(
-            consumer="limit_switch", config=config
-        )
+    def output(value):
+        return gpiod.LineSettings(direction=gpiod.line.Direction.OUTPUT, output_value=value)
 
-    except Exception as e:
-        print(f"Error: Pin configuration failed. Check pin numbers. {e}")
-        raise e
+    # Configure GPIO lines using gpiod v2 API, all in one request
+    lines = {
+        STEP_PIN: output(gpiod.line.Value.INACTIVE),
+        DIR_PIN: output(gpiod.line.Value.INACTIVE),
+        # Default to 1 (Disable) on start
+        ENABLE_PIN: output(gpiod.line.Value.ACTIVE),
+        ACTUATOR_EXTEND_PIN: output(gpiod.line.Value.INACTIVE),
+        ACTUATOR_RETRACT_PIN: output(gpiod.line.Value.INACTIVE),
+        # Pressing pulls the line low: a debounced, timestamped falling edge
+        LIMIT_SWITCH_PIN: gpiod.LineSettings(
+            direction=gpiod.line.Direction.INPUT,
+            bias=gpiod.line.Bias.PULL_UP,
+            edge_detection=gpiod.line.Edge.FALLING,
+            debounce_period=LIMIT_SWITCH_DEBOUNCE,
+        ),
+    }
+
+    if gpio is None:
+        try:
+            gpio = gpio_manager.GpioManager(gpiod, target_chip, lines)
+        except Exception as e:
+            print(f"Error: GPIO setup failed on {target_chip}. Check pin numbers. {e}")
+            raise e
 
     print("Configuring PWM...")
 
@@ -218,55 +299,99 @@ def setup_all():
     
     print(f"Using Hardcoded PWM Chip: {SERVO_PWM_CHIP}")
 
-    for channel in [SERVO_PWM_CHANNEL, ACTUATOR_PWM_CHANNEL]:
-        pwm_export(SERVO_PWM_CHIP, channel)
+    for pwm, freq in [(servo_pwm, SERVO_PWM_FREQ), (actuator_pwm, ACTUATOR_PWM_FREQ)]:
+        pwm.export()
 
-        time.sleep(0.2)  # Extra safety wait
+        hal.clock.sleep(0.2)  # Extra safety wait
 
         # Use correct frequency based on which channel this is
-        period = int(
-            1_000_000_000
-            / (SERVO_PWM_FREQ if channel == SERVO_PWM_CHANNEL else ACTUATOR_PWM_FREQ)
-        )
+        pwm.set_period(int(1_000_000_000 / freq))
 
-        pwm_write(SERVO_PWM_CHIP, channel, "period", period)
+        pwm.enable()
 
-        pwm_write(SERVO_PWM_CHIP, channel, "enable", "1")
+    servo_pwm.set_duty(SERVO_REST_POS_NS)
 
-    pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", SERVO_REST_POS_NS)
+    # Latency report on demand while the game runs
+    try:
+        signal.signal(signal.SIGUSR1, print_pwm_latency)
+    except ValueError:
+        pass  # Not the main thread
+
+    global executor, limit_watcher
+
+    if limit_watcher is None:
+        # perf_counter_ns is CLOCK_MONOTONIC, the default gpiod event clock
+        # Only this thread reads edge events from the shared request
+        limit_watcher = gpio_events.EdgeWatcher(
+            gpio.request, LIMIT_SWITCH_PIN, gpiod.EdgeEvent.Type.FALLING_EDGE,
+            clock_ns=hal.clock.perf_counter_ns, name="limit-switch",
+        )
+        limit_watcher.start()
+
+    if HARDWARE_LANES_ENABLED and executor is None:
+        lanes = {STEPPER: {}, SERVO: {}, ACTUATOR: {}}
+        if MOTION_THREAD_ENABLED:
+            for device in (STEPPER, SERVO):
+                lanes[device] = {
+                    "cpu": MOTION_CPUS.get(device),
+                    "fifo_priority": MOTION_FIFO_PRIORITY,
+                    "lock_memory": MOTION_LOCK_MEMORY,
+                    "disable_gc": MOTION_DISABLE_GC,
+                }
+        executor = hardware_executor.HardwareExecutor(lanes)
+        executor.start()
 
     print("Setup complete.")
 
 
 def cleanup_all():
 
+    global executor, limit_watcher, gpio
+
     print("Cleaning up...")
 
     try:
 
-        if enable_line:
-            enable_line.set_value(
-                ENABLE_PIN, gpiod.line.Value.ACTIVE
-            )  # Disable (set to 1/Active)
+        # Running actuator and stepper commands abort at their next check
+        stop_requested.set()
+
+        if executor:
+            # Queued commands are dropped (a queued ball reset would hold the
+            # shutdown for half a minute)
+            executor.stop(cancel_pending=True)
+            executor = None
+
+        if limit_watcher:
+            limit_watcher.stop()
+            limit_watcher = None
+
+        if gpio:
+            gpio.set_value(ENABLE_PIN, gpiod.line.Value.ACTIVE)  # Disable (set to 1/Active)
+            _set_actuator(False, False)
+
+        save_stepper_position()
 
         # Turn off PWM (Suppress errors if they weren't setup)
 
-        pwm_write(SERVO_PWM_CHIP, ACTUATOR_PWM_CHANNEL, "duty_cycle", 0)
+        actuator_pwm.set_duty(0)
 
-        pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", SERVO_REST_POS_NS)
+        servo_pwm.set_duty(SERVO_REST_POS_NS)
 
-        time.sleep(0.5)
+        hal.clock.sleep(0.5)
 
-        pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "enable", "0")
+        servo_pwm.disable()
 
-        pwm_write(SERVO_PWM_CHIP, ACTUATOR_PWM_CHANNEL, "enable", "0")
+        actuator_pwm.disable()
 
-        pwm_unexport(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL)
+        print_pwm_latency()
 
-        pwm_unexport(SERVO_PWM_CHIP, ACTUATOR_PWM_CHANNEL)
+        servo_pwm.unexport()
 
-        if gpiod_chip:
-            gpiod_chip.close()
+        actuator_pwm.unexport()
+
+        if gpio:
+            gpio.release()
+            gpio = None
 
     except Exception as e:
 
@@ -274,70 +399,201 @@ def cleanup_all():
 
 
 def enable_motor():
-    if enable_line:
+    if gpio:
         # v2: request.set_value(offset, value)
-        enable_line.set_value(ENABLE_PIN, gpiod.line.Value.INACTIVE)  # 0 to Enable
-        time.sleep(0.01)
+        gpio.set_value(ENABLE_PIN, gpiod.line.Value.INACTIVE)  # 0 to Enable
+        hal.clock.sleep(0.01)
 
 
 def disable_motor():
-    if enable_line:
-        enable_line.set_value(ENABLE_PIN, gpiod.line.Value.ACTIVE)  # 1 to Disable
+    if gpio:
+        gpio.set_value(ENABLE_PIN, gpiod.line.Value.ACTIVE)  # 1 to Disable
 
 
 # movement
 
-def move_stepper_raw(steps, direction):
+def _step_high():
+    gpio.set_value(STEP_PIN, gpiod.line.Value.ACTIVE)
+
+
+def _step_low():
+    gpio.set_value(STEP_PIN, gpiod.line.Value.INACTIVE)
+
+
+def move_stepper_raw(steps, direction, profile=None):
     # direction is 0 or 1
     val_dir = gpiod.line.Value.ACTIVE if direction == 1 else gpiod.line.Value.INACTIVE
-    dir_line.set_value(DIR_PIN, val_dir)
+    gpio.set_value(DIR_PIN, val_dir)
 
-    for _ in range(steps):
-        step_line.set_value(STEP_PIN, gpiod.line.Value.ACTIVE)
-        time.sleep(MOVE_SPEED)
-        step_line.set_value(STEP_PIN, gpiod.line.Value.INACTIVE)
-        time.sleep(MOVE_SPEED)
+    # Precomputed (cached) accel/cruise/decel intervals, replayed on deadlines
+    schedule = motion_planner.plan_move(steps, profile or MOTION_PROFILE)
+    stats = motion_planner.run_schedule(schedule, _step_high, _step_low, should_stop=stop_requested.is_set)
+    _check_stopped_move(stats)
+    print(f"Stepper timing: {motion_planner.format_stats(stats)}")
+    return stats
 
 
-def home_stepper():
-    global current_stepper_position
-    print("Homing...")
-    enable_motor()
+def _limit_switch_pressed():
+    return gpio.get_value(LIMIT_SWITCH_PIN) != gpiod.line.Value.ACTIVE
+
+
+def _run_steps(schedule, toward_switch, stop_at_switch=False):
+    """
+    Runs a step schedule in one direction. Returns run_schedule stats.
+    stop_at_switch: stop on the first limit switch press event (a flag set
+    by limit_watcher's thread, no GPIO read per step).
+    """
+    gpio.set_value(
+        DIR_PIN, gpiod.line.Value.ACTIVE if toward_switch else gpiod.line.Value.INACTIVE
+    )
+
+    should_stop = stop_requested.is_set
+    if stop_at_switch:
+        if limit_watcher is not None:
+            # Already pressed: no edge will come
+            limit_watcher.arm(already_triggered=_limit_switch_pressed())
+            switch_pressed = limit_watcher.triggered.is_set
+        else:
+            switch_pressed = _limit_switch_pressed
+        should_stop = lambda: switch_pressed() or stop_requested.is_set()
 
-    dir_line.set_value(DIR_PIN, gpiod.line.Value.ACTIVE)
+    stats = motion_planner.run_schedule(schedule, _step_high, _step_low, should_stop=should_stop)
+    _check_stopped_move(stats)
 
-    while limit_switch_line.get_value(LIMIT_SWITCH_PIN) == gpiod.line.Value.ACTIVE:
-        step_line.set_value(STEP_PIN, gpiod.line.Value.ACTIVE)
-        time.sleep(HOMING_SPEED)
-        step_line.set_value(STEP_PIN, gpiod.line.Value.INACTIVE)
-        time.sleep(HOMING_SPEED)
+    if stop_at_switch and limit_watcher is not None and limit_watcher.latency_ns is not None:
+        stats["switch_event_latency_us"] = limit_watcher.latency_ns / 1000.0
+    return stats
 
-    time.sleep(0.1)
 
-    dir_line.set_value(DIR_PIN, gpiod.line.Value.INACTIVE)
+def _check_stopped_move(stats):
+    """Raises HardwareStopped if a stop request cut the move short (position lost)."""
+    global stepper_position_known
+    if stats["stopped"] and stop_requested.is_set():
+        # Not saved at cleanup: the next start does a full home
+        stepper_position_known = False
+        raise HardwareStopped("stepper move aborted")
 
-    for _ in range(10):
-        step_line.set_value(STEP_PIN, gpiod.line.Value.ACTIVE)
-        time.sleep(HOMING_SPEED)
-        step_line.set_value(STEP_PIN, gpiod.line.Value.INACTIVE)
-        time.sleep(HOMING_SPEED)
+
+def _print_switch_latency(stats):
+    if "switch_event_latency_us" in stats:
+        print(f"Limit switch event -> stop flag: {stats['switch_event_latency_us']:.0f}us")
+
+
+def _slow_steps(steps):
+    return motion_planner.constant_schedule(steps, 2 * HOMING_SPEED)
+
+
+def save_stepper_position():
+    """Saves the aim position for the next start (clean shutdown only)."""
+    if stepper_position_known:
+        calibration_store.save_json(
+            STEPPER_STATE_FILE, {"position": current_stepper_position, "saved_at": time.time()}
+        )
+
+
+def _load_stepper_position():
+    """
+    Returns the position saved at the last clean shutdown, or None.
+    The file is removed, so after a crash the next start does a full home.
+    """
+    state = calibration_store.load_json(STEPPER_STATE_FILE)
+    calibration_store.remove(STEPPER_STATE_FILE)
+    if state is None:
+        return None
+    return int(state["position"])
+
+
+def _verify_position(position):
+    """
+    Quick check of a saved position: a ramped move to step 0 must not touch
+    the switch, and a slow creep must then hit it after about
+    HOMING_ZERO_OFFSET_STEPS. Leaves the carriage on the switch.
+    Returns True if the position was confirmed.
+    """
+    if _limit_switch_pressed():
+        return False
+
+    if position > 0:
+        stats = _run_steps(
+            motion_planner.plan_move(position, MOTION_PROFILE), True, stop_at_switch=True
+        )
+        if stats["stopped"]:
+            print(f"Homing: switch hit {position - stats['steps']} steps early.")
+            return False
+
+    stats = _run_steps(
+        _slow_steps(HOMING_ZERO_OFFSET_STEPS + HOMING_VERIFY_TOLERANCE), True, stop_at_switch=True
+    )
+    error = stats["steps"] - HOMING_ZERO_OFFSET_STEPS
+    if not stats["stopped"]:
+        print("Homing: switch not reached after the saved position.")
+        return False
+    if abs(error) > HOMING_VERIFY_TOLERANCE:
+        print(f"Homing: saved position off by {error:+d} steps.")
+        return False
+    return True
+
+
+def _find_switch():
+    """Fast approach, back-off and slow re-approach. Leaves the carriage on the switch."""
+    if not _limit_switch_pressed():
+        stats = _run_steps(
+            motion_planner.plan_move(HOMING_MAX_STEPS, MOTION_PROFILE), True, stop_at_switch=True
+        )
+        print(f"Homing fast approach: {motion_planner.format_stats(stats)}")
+        _print_switch_latency(stats)
+        if not stats["stopped"]:
+            print("Homing Warning: limit switch not reached.")
+            return
+
+    hal.clock.sleep(0.1)
+    _run_steps(_slow_steps(HOMING_BACKOFF_STEPS), False)
+
+    stats = _run_steps(_slow_steps(2 * HOMING_BACKOFF_STEPS), True, stop_at_switch=True)
+    print(f"Homing slow approach: {motion_planner.format_stats(stats)}")
+    _print_switch_latency(stats)
+    if not stats["stopped"]:
+        print("Homing Warning: limit switch not reached on re-approach.")
+
+
+@_on_lane(STEPPER)
+def home_stepper(force=False):
+    """
+    Establishes step 0. Confirms the position saved at the last clean
+    shutdown with a quick move when possible; otherwise (or with force=True)
+    runs the full two-phase home.
+    """
+    global current_stepper_position, stepper_position_known
+    print("Homing...")
+    start = hal.clock.monotonic()
+    enable_motor()
+
+    saved = None if force else _load_stepper_position()
+    if saved is not None and _verify_position(saved):
+        print(f"Homing: saved position {saved} confirmed.")
+    else:
+        _find_switch()
+
+    hal.clock.sleep(0.1)
+
+    _run_steps(_slow_steps(HOMING_ZERO_OFFSET_STEPS), False)
 
     current_stepper_position = 0
+    stepper_position_known = True
 
     disable_motor()
 
-    print("Homed.")
+    print(f"Homed in {hal.clock.monotonic() - start:.2f}s.")
 
 
 def map_angle_to_steps_non_linear(angle):
     # Non-linear mapping: exponent > 1.0 provides finer center control
+    # (fallback when no aim calibration is available, see shot_calibration)
     exponent = 1.5
 
     normalized_input = (angle / 90.0) - 1.0
 
-    sign = np.sign(normalized_input)
-
-    eased_output = sign * (abs(normalized_input) ** exponent)
+    eased_output = math.copysign(abs(normalized_input) ** exponent, normalized_input)
 
     target_steps = (eased_output + 1.0) / 2.0 * TOTAL_STEPS_FOR_180_DEGREES
 
@@ -350,25 +606,40 @@ def map_angle_to_steps_non_linear(angle):
     return int(final_steps)
 
 
+def angle_to_steps(angle):
+    """Step position for an aim angle: calibrated lookup if available, else the formula."""
+    if aim_table is not None and aim_table.available:
+        return aim_table.steps_for(angle)
+    return map_angle_to_steps_non_linear(angle)
+
+
+@_on_lane(STEPPER)
 def set_stepper_angle(angle):
 
-    global current_stepper_position
+    target_step = move_stepper_to(angle_to_steps(angle))
+
+    print(f"Stepper: Moved to {angle}° (Step {target_step})")
 
-    target_step = map_angle_to_steps_non_linear(angle)
 
-    target_step = max(0, min(TOTAL_STEPS_FOR_180_DEGREES, target_step))
+@_on_lane(STEPPER)
+def move_stepper_to(target_step):
+    """Moves to an absolute step position (clamped to the range). Returns the position."""
+
+    global current_stepper_position
+
+    target_step = max(0, min(TOTAL_STEPS_FOR_180_DEGREES, int(target_step)))
 
     diff = target_step - current_stepper_position
 
     if diff == 0:
-        return
+        return target_step
 
     enable_motor()
 
     # Determine direction based on position difference
     # Positive diff: move away from limit switch (INACTIVE)
     # Negative diff: move toward limit switch (ACTIVE)
-    direction = gpiod.line.Value.INACTIVE if diff > 0 else gpiod.line.Value.ACTIVE
+    direction = 0 if diff > 0 else 1
 
     move_stepper_raw(abs(diff), direction)
 
@@ -376,30 +647,41 @@ def set_stepper_angle(angle):
 
     current_stepper_position = target_step
 
-    print(f"Stepper: Moved to {angle}° (Step {target_step})")
+    return target_step
 
 
-def move_servo_smooth(start_ns, end_ns, duration):
+def move_servo_smooth(start_ns, end_ns, duration, curve=None):
     """
-    Moves the servo smoothly from start to end over duration seconds.
-    Used to simulate slower swing speeds for lower power.
+    Moves the servo from start to end over duration seconds, following a
+    precomputed swing profile (see swing_profiles.CURVES) played back on
+    absolute deadlines. Used to simulate slower swing speeds for lower power.
+    Returns: playback statistics (requested vs achieved duration)
     """
-    # Use 10ms updates (100Hz) - smoother and less overhead than 5ms
-    update_interval = 0.01
-    steps = int(duration / update_interval)
-    
-    if steps < 1:
-        pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", end_ns)
-        return
+    global last_swing_stats
+
+    values = swing_profiles.trajectory(
+        int(start_ns), int(end_ns), round(duration, 3), curve or SWING_CURVE, SWING_UPDATE_RATE
+    )
+    last_swing_stats = swing_profiles.play(values, servo_pwm.set_duty, SWING_UPDATE_RATE)
+    return last_swing_stats
 
-    step_ns = (end_ns - start_ns) / steps
 
-    for i in range(1, steps + 1):
-        current_ns = int(start_ns + (step_ns * i))
-        pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", current_ns)
-        time.sleep(update_interval)
+def swing_duration(power_percent):
+    """
+    Forward swing duration for a power: lower power = slower swing.
+    Power 0% -> 2.0s (putt-like), 80% -> 0.05s, then down to a direct
+    write at 100%, continuously (no mode switch above 80%).
+    """
+    if power_percent <= 80:
+        # Linear curve: 60% -> 0.5s, clearly distinct from max
+        # (the old squared curve made 60% nearly as fast as 80%)
+        duration = SWING_MAX_DURATION * (1.0 - power_percent / 80.0)
+        return max(duration, SWING_MIN_DURATION)
+
+    return SWING_MIN_DURATION * (100.0 - min(power_percent, 100)) / 20.0
 
 
+@_on_lane(SERVO)
 def swing_club(power_percent):
 
     print(f"Swinging at {power_percent}%...")
@@ -410,106 +692,139 @@ def swing_club(power_percent):
     boosted_power = 20 + (power_percent / 100.0) * 80
 
     # Start from neutral position
-    pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", SERVO_REST_POS_NS)
-    time.sleep(0.2)
+    servo_pwm.set_duty(SERVO_REST_POS_NS)
+    hal.clock.sleep(0.2)
 
     # Calculate backswing position based on power
     backswing_range = SERVO_MAX_SWING_NS - SERVO_REST_POS_NS
     backswing_ns = int((boosted_power / 100.0) * backswing_range) + SERVO_REST_POS_NS
 
     # Move to backswing position
-    pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", backswing_ns)
-    time.sleep(1.0)  # Hold backswing for 1 second
+    servo_pwm.set_duty(backswing_ns)
+    hal.clock.sleep(1.0)  # Hold backswing for 1 second
 
     # Swing through to full forward position (hitting the ball)
-    
-    # Speed Control Logic:
-    # If Power is High (>80%): Swing FAST (Direct write)
-    # If Power is Low: Swing slower (Smooth write)
-    
-    if power_percent > 80:
-        # Maximum Speed
-        print(f"Swing Mode: MAX SPEED (Direct Write)")
-        pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", SERVO_FORWARD_SWING_NS)
-    else:
-        # Variable Speed
-        # Calculate duration: Lower power = Slower (Longer duration)
-        # Power 0% -> 3.0s duration (Extremely slow/Put-like)
-        # Power 80% -> 0.05s duration (Fast)
-        
-        # Previous max was 1.2, increasing to 3.0 to really slow it down
-        # Adjusted to 2.0 with linear curve to fix 60% being too fast
-        max_slow_duration = 2.0
-        
-        # Invert power for duration calculation (0 is slow, 80 is fast)
-        # Normalize 0-80 range to 0.0-1.0
-        normalized_speed = power_percent / 80.0
-        
-        # Use Linear curve. 
-        # previous squared curve made 60% (norm 0.75) -> 0.06 factor -> very fast.
-        # Linear: 60% -> 0.25 factor -> 0.5s duration (clearly distinct from max)
-        duration_factor = (1.0 - normalized_speed)
-        duration = max_slow_duration * duration_factor
-        
-        # Ensure a tiny minimum duration
-        duration = max(duration, 0.05)
-        
-        print(f"Swing Mode: SMOOTH. Duration: {duration:.3f}s. Start: {backswing_ns} -> End: {SERVO_FORWARD_SWING_NS}")
-        move_servo_smooth(backswing_ns, SERVO_FORWARD_SWING_NS, duration)
-
-    time.sleep(1.0)  # Hold forward position
+    duration = swing_duration(power_percent)
+    print(f"Swing: {SWING_CURVE}, {duration:.3f}s. Start: {backswing_ns} -> End: {SERVO_FORWARD_SWING_NS}")
+    stats = move_servo_smooth(backswing_ns, SERVO_FORWARD_SWING_NS, duration)
+    print(
+        f"Swing timing: requested {stats['requested_s']:.3f}s, achieved {stats['achieved_s']:.3f}s "
+        f"({stats['samples']} updates, max late {stats['max_late_us']:.0f}us)"
+    )
+
+    hal.clock.sleep(1.0)  # Hold forward position
 
     # Return to neutral/rest
-    pwm_write(SERVO_PWM_CHIP, SERVO_PWM_CHANNEL, "duty_cycle", SERVO_REST_POS_NS)
-    time.sleep(0.5)
+    servo_pwm.set_duty(SERVO_REST_POS_NS)
+    hal.clock.sleep(0.5)
+
 
+def _set_actuator(extend, retract):
+    """Drives both actuator direction lines in one atomic update."""
+    value = gpiod.line.Value
+    gpio.set_values({
+        ACTUATOR_EXTEND_PIN: value.ACTIVE if extend else value.INACTIVE,
+        ACTUATOR_RETRACT_PIN: value.ACTIVE if retract else value.INACTIVE,
+    })
 
-def reset_ball_actuator():
+
+def _wait_for_tee(is_ball_on_tee, timeout):
+    """
+    Polls is_ball_on_tee until it has been True for ACTUATOR_SETTLE_TIME.
+    Returns True once settled, False on timeout. Raises HardwareStopped on a stop request.
+    """
+    deadline = hal.clock.monotonic() + timeout
+    on_tee_since = None
+
+    while hal.clock.monotonic() < deadline:
+        _check_stop()
+        if is_ball_on_tee():
+            now = hal.clock.monotonic()
+            if on_tee_since is None:
+                on_tee_since = now
+            elif now - on_tee_since >= ACTUATOR_SETTLE_TIME:
+                return True
+        else:
+            on_tee_since = None
+        hal.clock.sleep(ACTUATOR_POLL_INTERVAL)
+
+    return False
+
+
+@_on_lane(ACTUATOR)
+def reset_ball_actuator(is_ball_on_tee=None):
+    """
+    Tilts the course so the ball rolls back to the tee, then levels it again.
+    is_ball_on_tee: optional callable (True when the camera sees the ball on
+    the tee). With it, extension stops as soon as the ball has settled and the
+    retraction only undoes that extension; without it, the fixed full cycle runs.
+    Returns: True if the ball was seen back on the tee, None after a fixed
+    cycle without a check, False on a timeout or an error
+    """
     print("Resetting ball...")
 
-    ACT_PIN_1 = 17
-    ACT_PIN_2 = 27
+    start = hal.clock.monotonic()
+    settled = None
+    failed = False
 
     try:
-        # Request lines for the actuator
-        # v2: Request as block
-        config = {
-            ACT_PIN_1: gpiod.LineSettings(
-                direction=gpiod.line.Direction.OUTPUT,
-                output_value=gpiod.line.Value.INACTIVE,
-            ),
-            ACT_PIN_2: gpiod.LineSettings(
-                direction=gpiod.line.Direction.OUTPUT,
-                output_value=gpiod.line.Value.INACTIVE,
-            ),
-        }
-
-        act_req = gpiod_chip.request_lines(consumer="actuator", config=config)
-
+        _check_stop()
         period = int(1_000_000_000 / 1000)
-        pwm_write(ACTUATOR_PWM_CHIP, ACTUATOR_PWM_CHANNEL, "duty_cycle", period)
+        actuator_pwm.set_duty(period)
 
         # Extend
-        act_req.set_value(ACT_PIN_1, gpiod.line.Value.ACTIVE)
-        act_req.set_value(ACT_PIN_2, gpiod.line.Value.INACTIVE)
-        time.sleep(25)  # Extend for 25 seconds
-
-        # Wait at full extension
-        act_req.set_value(ACT_PIN_1, gpiod.line.Value.INACTIVE)
-        act_req.set_value(ACT_PIN_2, gpiod.line.Value.INACTIVE)
-        time.sleep(3)  # Hold at full extension for 3 seconds
-
-        # Retract
-        act_req.set_value(ACT_PIN_1, gpiod.line.Value.INACTIVE)
-        act_req.set_value(ACT_PIN_2, gpiod.line.Value.ACTIVE)
-        time.sleep(25)  # Retract for 25 seconds
-
-        # Stop
-        act_req.set_value(ACT_PIN_1, gpiod.line.Value.INACTIVE)
-        act_req.set_value(ACT_PIN_2, gpiod.line.Value.INACTIVE)
-
-        # Stop PWM
-        pwm_write(ACTUATOR_PWM_CHIP, ACTUATOR_PWM_CHANNEL, "duty_cycle", 0)
+        _set_actuator(True, False)
+        if is_ball_on_tee is None:
+            _sleep_unless_stopped(ACTUATOR_EXTEND_TIME)
+        else:
+            settled = _wait_for_tee(is_ball_on_tee, ACTUATOR_EXTEND_TIME)
+        extended_s = hal.clock.monotonic() - start
+
+        # Wait at the reached extension
+        _set_actuator(False, False)
+        if is_ball_on_tee is None:
+            _sleep_unless_stopped(ACTUATOR_HOLD_TIME)
+        elif not settled:
+            # Fully tilted: give the ball a last chance to roll back
+            settled = _wait_for_tee(is_ball_on_tee, ACTUATOR_HOLD_TIME)
+
+        # Retract (only as far as we extended, plus a margin)
+        _set_actuator(False, True)
+        _sleep_unless_stopped(min(extended_s * ACTUATOR_RETRACT_MARGIN, ACTUATOR_EXTEND_TIME))
+
+    except HardwareStopped:
+        print("Ball reset stopped.")
+        failed = True
 
     except Exception as e:
         print(f"Error in Reset Ball: {e}")
+        failed = True
+
+    finally:
+        # Stop, also when a wait above raised (a tee check, or an interrupt)
+        try:
+            _set_actuator(False, False)
+            actuator_pwm.set_duty(0)
+        except Exception as e:
+            print(f"Error stopping actuator: {e}")
+
+    elapsed = hal.clock.monotonic() - start
+    reset_stats["resets"] += 1
+    reset_stats["total_s"] += elapsed
+    if settled is not None:
+        reset_stats["checked"] += 1
+        reset_stats["settled"] += int(settled)
+
+    if failed:
+        print(f"Ball reset: failed after {elapsed:.1f}s")
+    elif settled is None:
+        print(f"Ball reset: fixed cycle, {elapsed:.1f}s")
+    else:
+        print(
+            f"Ball reset: {'on tee' if settled else 'NOT on tee (timeout)'} after {elapsed:.1f}s "
+            f"(success {reset_stats['settled']}/{reset_stats['checked']}, "
+            f"mean {reset_stats['total_s'] / reset_stats['resets']:.1f}s)"
+        )
+
+    # A failed cycle is not a confirmed reset
+    return False if failed else settled
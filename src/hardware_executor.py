@@ -0,0 +1,64 @@
+from concurrent.futures import Future
+
+import hal
+
+import motion_thread
+
+
+# Hardware command executor.
+# Each device (lane) owns one worker thread: commands for a device run in
+# submission order, commands for different devices run in parallel. Callers
+# get concurrent.futures.Future objects stamped with submitted_at, started_at
+# and completed_at (hal.clock seconds), so the controller can keep working
+# (vision, LLM, audio) while the hardware moves and wait only where needed.
+
+
+class HardwareExecutor:
+    """
+    lanes: dict device name -> dict of motion_thread.MotionThread options
+    (cpu, fifo_priority, lock_memory, disable_gc).
+    """
+
+    def __init__(self, lanes):
+        self.lanes = {
+            device: motion_thread.MotionThread(name=device, **options)
+            for device, options in lanes.items()
+        }
+
+    def start(self):
+        for lane in self.lanes.values():
+            lane.start()
+
+    def submit(self, device, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs) on the device's lane. Returns a Future."""
+        return self.lanes[device].submit(fn, *args, **kwargs)
+
+    def run(self, device, fn, *args, **kwargs):
+        """Runs fn on the device's lane and waits for it (inline if already on that lane)."""
+        lane = self.lanes[device]
+        if lane.is_current():
+            return fn(*args, **kwargs)
+        return lane.submit(fn, *args, **kwargs).result()
+
+    def stop(self, timeout=5.0, cancel_pending=False):
+        """
+        Ends all lanes after their queued commands, or with cancel_pending
+        right after the running ones (queued futures are cancelled).
+        """
+        for lane in self.lanes.values():
+            lane.stop(timeout, cancel_pending)
+
+
+def run_inline(fn, *args, **kwargs):
+    """Runs fn now on the calling thread. Returns a completed, timestamped Future."""
+    future = Future()
+    future.submitted_at = future.started_at = hal.clock.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        future.completed_at = hal.clock.monotonic()
+        future.set_exception(e)
+    else:
+        future.completed_at = hal.clock.monotonic()
+        future.set_result(result)
+    return future
@@ -2,12 +2,12 @@
 
 import math
 
+import statistics
+
 import time
 
 import sys
 
-from llm_golfer import AssistantGolfer
-
 import audio_manager
 
 import hardware_controller
@@ -16,6 +16,22 @@ import feedback_generator
 
 import vision_system
 
+import vision_worker
+
+import table_calibration
+
+import calibration_store
+
+import hal
+
+import shot_scheduler
+
+import shot_calibration
+
+import shot_store
+
+import shot_model
+
 
 # Game Configuration
 
@@ -25,37 +41,359 @@ import vision_system
 # HOLE_Y = 112
 # HOLE_COORDS = (HOLE_X, HOLE_Y)
 
+# Hole calibration cache: the hole does not move between games, so the
+# calibrated position is reused as long as the scene still looks the same
+HOLE_CACHE_FILE = "hole_calibration.json"
+HOLE_REFERENCE_FILE = "hole_reference.npy"
+HOLE_CACHE_MIN_SIMILARITY = 0.85
+
+# Check the camera pose against the calibration reference every N shots
+DRIFT_CHECK_INTERVAL = 3
+
+# Run capture and detection in a separate process during play, so vision
+# work does not add jitter to the stepper pulse loops
+VISION_WORKER_ENABLED = False
+
+
+# In-hole box half sizes (X, Y): vision reference pixels, or table millimetres
+# when the table maps are available
+HOLE_BOX_PX = (60, 40)
+HOLE_BOX_MM = (100, 75)
+
+# Tee position (reference pose), learned right after a confirmed fixed-cycle
+# reset. The ball counts as back on the tee within this radius.
+TEE_POSITION_FILE = "tee_position.json"
+TEE_RADIUS_PX = 20
+# Readings taken when learning; the ball must be still between them (px)
+TEE_LEARN_READINGS = 3
+TEE_LEARN_INTERVAL = 0.2
+TEE_STILL_PX = 3
+# A tee further than this from the previous one is only accepted when the
+# next learning confirms it (the ball may have stopped next to the tee)
+TEE_MAX_SHIFT_PX = 15
+# Closed-loop resets timing out in a row before the tee is learned again
+TEE_RELEARN_TIMEOUTS = 2
+
+tee_position = None
+# Unconfirmed far tee position, and closed-loop timeouts in a row
+tee_candidate = None
+tee_timeouts = 0
+
+
+def to_feedback_coords(point):
+    """
+    Converts a vision position to the coordinates used for feedback and the
+    win check. Returns (point, units): table mm if calibrated, else pixels.
+    """
+    mapper = table_calibration.table_mapper
+    if mapper.available and point is not None:
+        # The maps are baked for the reference camera pose
+        point = vision_system.vision_system_instance.remove_drift(point)
+        return mapper.to_table(point), "mm"
+    return point, "px"
+
+
+def measure_ball_position():
+    """Live ball position in feedback coordinates (table mm if calibrated), or None."""
+    point, _ = to_feedback_coords(vision_system.get_live_ball_position())
+    return point
+
 
 def is_ball_in_hole(ball_pos, hole_pos):
     """
-    Checks if ball is in hole using custom rectangular bounds.
+    Checks if ball is in hole using custom rectangular bounds
+    (vision reference coordinates, 640x480 whatever the capture resolution).
     Returns True if in hole, False otherwise.
     """
     if ball_pos is None or hole_pos is None:
         return False
-        
+
+    ball_pos, units = to_feedback_coords(ball_pos)
+    hole_pos, _ = to_feedback_coords(hole_pos)
+    box_x, box_y = HOLE_BOX_MM if units == "mm" else HOLE_BOX_PX
+
     dx = ball_pos[0] - hole_pos[0]
     dy = ball_pos[1] - hole_pos[1]
     
-    # Check X bounds (Left -60, Right +60)
-    if not (-60 <= dx <= 60):
+    # Check X bounds (Left, Right)
+    if not (-box_x <= dx <= box_x):
         return False
         
-    # Check Y bounds (Up -40, Down +40)
-    if not (-40 <= dy <= 40):
+    # Check Y bounds (Up, Down)
+    if not (-box_y <= dy <= box_y):
         return False
         
     return True
 
 
-def calibrate_hole_position():
+def load_tee_position():
+    """Loads the saved tee position. Returns: tuple (x, y) or None."""
+    global tee_position
+
+    data = calibration_store.load_json(TEE_POSITION_FILE)
+    if data is not None:
+        tee_position = tuple(data["tee"])
+    return tee_position
+
+
+def learn_tee_position():
+    """
+    Stores the current ball position as the tee. Only call right after a
+    confirmed reset (see reset_ball). Returns: the tee position (may be the
+    previous one) or None.
+    """
+    global tee_position, tee_candidate
+
+    readings = []
+    for i in range(TEE_LEARN_READINGS):
+        if i:
+            hal.clock.sleep(TEE_LEARN_INTERVAL)
+        ball_pos = vision_system.get_live_ball_position()
+        if ball_pos is None:
+            print("Ball not visible. Tee position not learned.")
+            return tee_position
+        readings.append(vision_system.vision_system_instance.remove_drift(ball_pos))
+
+    if max(math.dist(readings[0], r) for r in readings) > TEE_STILL_PX:
+        print("Ball still moving. Tee position not learned.")
+        return tee_position
+
+    learned = (
+        int(round(statistics.median(r[0] for r in readings))),
+        int(round(statistics.median(r[1] for r in readings))),
+    )
+
+    if tee_position is not None:
+        shift = math.dist(learned, tee_position)
+        if shift > TEE_MAX_SHIFT_PX and (
+            tee_candidate is None or math.dist(learned, tee_candidate) > TEE_RADIUS_PX
+        ):
+            tee_candidate = learned
+            print(
+                f"Tee position {learned} is {shift:.0f}px from {tee_position}; "
+                f"kept until the next reset confirms it."
+            )
+            return tee_position
+        print(f"Tee position moved {shift:.0f}px.")
+
+    tee_position = learned
+    tee_candidate = None
+    calibration_store.save_json(TEE_POSITION_FILE, {"tee": list(tee_position), "saved_at": time.time()})
+    print(f"Tee position learned at: {tee_position}")
+    return tee_position
+
+
+def is_ball_on_tee():
+    """True if the camera sees the ball within TEE_RADIUS_PX of the tee."""
+    ball_pos = vision_system.get_live_ball_position()
+    if ball_pos is None or tee_position is None:
+        return False
+
+    tee = vision_system.vision_system_instance.apply_drift(tee_position)
+    return math.dist(ball_pos, tee) <= TEE_RADIUS_PX
+
+
+def reset_ball():
+    """
+    Runs the ball reset, closed-loop on the tee check once the tee is known.
+    Without a tee, or after TEE_RELEARN_TIMEOUTS timeouts in a row, the fixed
+    full cycle runs and the tee is learned from where the ball ends up.
+    """
+    global tee_timeouts
+
+    if tee_position is None or tee_timeouts >= TEE_RELEARN_TIMEOUTS:
+        if tee_position is not None:
+            print(f"Ball reset timed out {tee_timeouts} times. Learning the tee again.")
+        settled = hardware_controller.reset_ball_actuator()
+        if settled is None:
+            # Full cycle completed: the ball is on the tee
+            tee_timeouts = 0
+            learn_tee_position()
+        return settled
+
+    settled = hardware_controller.reset_ball_actuator(is_ball_on_tee)
+    tee_timeouts = 0 if settled else tee_timeouts + 1
+    return settled
+
+
+def shot_hints(hole_coords):
+    """Measured facts about the course for the prompt (list of lines)."""
+    hints = []
+
+    force_table = shot_calibration.force_table
+    if force_table.available and tee_position is not None:
+        tee, _ = to_feedback_coords(vision_system.vision_system_instance.apply_drift(tee_position))
+        hole, _ = to_feedback_coords(hole_coords)
+        if tee is not None and hole is not None:
+            hints.append(
+                f"Calibration: a strike_force of about {force_table.force_for(math.dist(tee, hole))} "
+                "rolls the ball as far as the hole."
+            )
+
+    hole, units = to_feedback_coords(hole_coords)
+
+    # Inverse model fitted on all logged shots
+    prediction = shot_model.model.predict(hole) if hole is not None else None
+    if prediction is not None:
+        hints.append(
+            f"Shot model (fitted on {prediction['shots']} past shots): aim_degrees about "
+            f"{prediction['aim']:.1f} (±{prediction['aim_std']:.1f}) and strike_force about "
+            f"{prediction['force']:.0f} (±{prediction['force_std']:.0f}) should reach the hole."
+        )
+
+    # Past games: shots that stopped closest to the hole
+    if hole is not None:
+        neighbours = shot_store.shots.nearest(hole)
+        if neighbours:
+            hints.append(
+                "Past shots that stopped nearest the hole: "
+                + "; ".join(
+                    f"aim {n['aim']:.1f}, force {n['force']:.0f} ({n['distance']:.0f}{units} away)"
+                    for n in neighbours
+                )
+                + "."
+            )
+
+    return hints
+
+
+def build_shot_prompt(shot_count, shot_history, hints=()):
+    """Prompt for the golfer's next shot decision (hints: extra lines, see shot_hints)."""
+    history_str = "\n".join(shot_history) if shot_history else "No previous shots."
+    hints_str = "".join(f"{hint}\n" for hint in hints)
+
+    return (
+        f"You are at the tee. Shot #{shot_count}.\n"
+        "The hole location is unknown to you, rely on feedback.\n"
+        f"{hints_str}"
+        f"History:\n{history_str}\n"
+        "Choose your shot:\n"
+        "- aim_degrees (strictly between 45 and 135)\n"
+        "- strike_force (0-100)\n"
+        "- commentary (keep it very short, under 10 words)"
+    )
+
+
+def describe_shot(ball_pos, hole_coords):
+    """Natural language feedback for where the ball stopped."""
+    if ball_pos is None:
+        print("Ball not found. Assuming missed/out of bounds.")
+        return "I lost sight of the ball completely. It might be off the course."
+
+    ball_metric, units = to_feedback_coords(ball_pos)
+    hole_metric, _ = to_feedback_coords(hole_coords)
+
+    return feedback_generator.get_fuzzy_feedback(ball_metric, hole_metric, units)
+
+
+def return_ball_to_tee(hole_coords):
+    """
+    Resets the ball unless it is already on the tee (hole_coords: reference
+    pose). Without a known tee only a ball seen in the hole is reset.
+    """
+    current_hole = vision_system.vision_system_instance.apply_drift(hole_coords)
+    if is_ball_in_hole(vision_system.get_live_ball_position(), current_hole):
+        print("Ball is still in the hole. Resetting...")
+        reset_ball()
+    elif tee_position is not None and not is_ball_on_tee():
+        print("Ball is not on the tee. Resetting...")
+        reset_ball()
+
+
+def save_hole_calibration(hole_coords):
+    """
+    Stores the hole position, the field corners used and a reference thumbnail
+    (taken with the ball on the tee, as seen at the next start).
+    """
+    if tee_position is not None and not is_ball_on_tee():
+        print("Ball is not on the tee. Hole calibration not cached.")
+        return
+
+    reference = vision_system.vision_system_instance.capture_thumbnail()
+    if reference is None:
+        print("Could not capture reference frame. Hole calibration not cached.")
+        return
+
+    calibration_store.save_array(HOLE_REFERENCE_FILE, reference)
+    vision_system.vision_system_instance.set_drift_reference(reference)
+    calibration_store.save_json(
+        HOLE_CACHE_FILE,
+        {
+            "hole": [int(hole_coords[0]), int(hole_coords[1])],
+            "field_corners": vision_system.FIELD_CORNERS.tolist(),
+            "saved_at": time.time(),
+        },
+    )
+    print("Hole calibration cached.")
+
+
+def load_cached_hole_position():
     """
-    Calibrates hole position by detecting ball placed in hole.
-    Returns: tuple (x, y) of hole coordinates
+    Reloads the cached hole position and validates it against a fresh frame.
+    Returns: tuple (x, y) if the cache is still valid, None otherwise.
+    """
+    cache = calibration_store.load_json(HOLE_CACHE_FILE)
+    reference = calibration_store.load_array(HOLE_REFERENCE_FILE)
+    if cache is None or reference is None:
+        return None
+
+    if cache.get("field_corners") != vision_system.FIELD_CORNERS.tolist():
+        print("Field corners changed since hole calibration. Recalibrating.")
+        return None
+
+    vision = vision_system.vision_system_instance
+
+    # A bumped camera shifts everything: correct small drift, recalibrate on large
+    vision.set_drift_reference(reference)
+    if vision.check_camera_drift() == "recalibrate":
+        return None
+
+    thumbnail = vision.capture_thumbnail()
+    similarity = vision.thumbnail_similarity(
+        thumbnail, reference, shift=(vision.drift["dx"], vision.drift["dy"])
+    )
+    if similarity < HOLE_CACHE_MIN_SIMILARITY:
+        print(f"Scene changed since hole calibration (similarity {similarity:.2f}). Recalibrating.")
+        # The lighting may be what changed: the locked exposure would be stale
+        vision.recalibrate_exposure()
+        return None
+
+    hole_coords = tuple(cache["hole"])
+    print(f"Using cached hole position {hole_coords} (similarity {similarity:.2f})")
+    return hole_coords
+
+
+def calibrate_hole_position(use_cache=True):
+    """
+    Returns the cached hole position if it is still valid, otherwise looks for
+    the hole in the image, and only as a last resort asks for the ball to be
+    placed in the hole.
+    Returns: tuple (x, y) of hole coordinates at the reference camera pose
+    (map through vision_system_instance.apply_drift before comparing to the ball)
     """
     print("\nHole Calibration")
 
-    # Detect ball position (which is in the hole)
+    hole_coords = load_cached_hole_position() if use_cache else None
+    if hole_coords is not None:
+        # Last game usually ended with the ball in the hole
+        return_ball_to_tee(hole_coords)
+
+        print("Calibration complete!\n")
+        return hole_coords
+
+    # Measured at the current pose, which becomes the new reference pose
+    vision_system.vision_system_instance.set_drift_reference(None)
+
+    # No human action needed when the hole is visible (ball on the tee)
+    hole_coords = vision_system.vision_system_instance.detect_hole()
+    if hole_coords is not None:
+        # The hole is visible, but the ball may be anywhere on the field
+        return_ball_to_tee(hole_coords)
+        save_hole_calibration(hole_coords)
+        print("Calibration complete!\n")
+        return hole_coords
+
+    # Fallback: detect ball position (which is in the hole)
     print("Waiting for ball in hole...")
     while True:
         hole_coords = vision_system.get_live_ball_position()
@@ -64,7 +402,7 @@ def calibrate_hole_position():
         
         print("Ball not found. Requesting user action.")
         audio_manager.play_speech("I cannot see the ball. Please place the ball in the hole for calibration.")
-        time.sleep(5)
+        hal.clock.sleep(5)
 
     # hole_coords is guaranteed to be set here
 
@@ -72,169 +410,281 @@ def calibrate_hole_position():
 
     # Reset ball to starting position
     print("Running actuator cycle to reset ball...")
-    hardware_controller.reset_ball_actuator()
+    reset_ball()
+
+    # Reference taken with the ball back on the tee, as seen at the next start
+    save_hole_calibration(hole_coords)
 
     print("Calibration complete!\n")
     return hole_coords
 
 
-def run_game():
+def start_systems():
+    """
+    Hardware, camera and calibration data for a session; leaves the ball on the tee.
+    Returns: the hole position at the reference camera pose
+    """
+    hardware_controller.setup_all()
+    # Homing runs on the stepper lane while the camera starts
+    homing = hardware_controller.home_stepper.submit()
 
-    print("Starting Golf Game")
+    print("Initializing Vision System...")
+    vision_system.vision_system_instance.start_camera()
 
-    golfer = AssistantGolfer()
+    # Metric table coordinates (lookup tables are cheap to rebuild), once the
+    # table size has been measured; stale maps are rebuilt
+    if table_calibration.TABLE_SIZE_MEASURED:
+        if not table_calibration.table_mapper.load():
+            table_calibration.build_table_maps()
+            table_calibration.table_mapper.load()
+    else:
+        print("Table size not measured (table_calibration.TABLE_SIZE_MEASURED). Feedback in pixels.")
 
-    golfer.start_new_game()
+    load_tee_position()
 
-    shot_history = []
+    # Measured aim (falls back to the angle formula without a calibration)
+    if shot_calibration.aim_table.load():
+        print("Using aim calibration.")
+    hardware_controller.aim_table = shot_calibration.aim_table
 
-    shot_count = 0
+    # Shots of earlier games, indexed in the units used for feedback and
+    # played with the same aim calibration
+    units = "mm" if table_calibration.table_mapper.available else "px"
+    shot_store.shots.open(units, shot_calibration.aim_calibration_id())
+    shot_model.model.fit(shot_store.shots.rows, units)
 
-    try:
+    if shot_calibration.force_table.load():
+        print("Using force calibration.")
 
-        # 1. Setup
-        hardware_controller.setup_all()
-        hardware_controller.home_stepper()
+    # Hole calibration needs the club at rest
+    homing.result()
+    print(f"Homing took {homing.completed_at - homing.started_at:.2f}s (overlapped with vision setup)")
 
-        print("Initializing Vision System...")
-        vision_system.vision_system_instance.start_camera()
+    # Calibrate hole position at game start
+    reference_hole_coords = calibrate_hole_position()
 
-        # Calibrate hole position at game start
-        hole_coords = calibrate_hole_position()
+    # The tee is learned after a full reset cycle, never from wherever the ball is
+    if tee_position is None:
+        reset_ball()
 
-        while True:
+    return reference_hole_coords
 
-            shot_count += 1
 
-            print(f"\nShot {shot_count}")
+def run_calibration(aim=True, force=True):
+    """Shot calibration mode: measures the aim, then the force (see shot_calibration)."""
+    print("Starting Shot Calibration")
 
+    try:
+        start_systems()
+        if aim:
+            shot_calibration.calibrate_aim(measure_ball_position, reset_ball)
+        if force:
+            # Aimed through the aim calibration when there is one
+            shot_calibration.calibrate_force(measure_ball_position, reset_ball)
 
-            # Construct prompt
+    except KeyboardInterrupt:
+        print("User stopped calibration.")
 
-            history_str = (
-                "\n".join(shot_history) if shot_history else "No previous shots."
-            )
+    finally:
+        print("Shutting down systems...")
+        hardware_controller.cleanup_all()
+        vision_system.vision_system_instance.stop_camera()
+        shot_store.shots.close()
 
-            prompt = (
-                f"You are at the tee. Shot #{shot_count}.\n"
-                "The hole location is unknown to you, rely on feedback.\n"
-                f"History:\n{history_str}\n"
-                "Choose your shot:\n"
-                "- aim_degrees (strictly between 45 and 135)\n"
-                "- strike_force (0-100)\n"
-                "- commentary (keep it very short, under 10 words)"
-            )
 
-            # 3. Get Decision
+def run_table_calibration():
+    """
+    Table calibration mode: lens intrinsics from chessboard views, then the
+    table maps (once the table size is measured, see table_calibration).
+    """
+    print("Starting Table Calibration")
 
-            print("Requesting shot decision...")
+    try:
+        vision_system.vision_system_instance.start_camera()
+        frames = table_calibration.capture_chessboard_views()
+        if table_calibration.calibrate_intrinsics(frames) is None:
+            return
 
-            response = golfer.get_next_shot_decision(prompt)
+        if table_calibration.TABLE_SIZE_MEASURED:
+            table_calibration.build_table_maps()
+        else:
+            print("Table size not measured (table_calibration.TABLE_SIZE_MEASURED): maps not built.")
 
-            if response is None:
+    except KeyboardInterrupt:
+        print("User stopped calibration.")
 
-                print("Network/API Error: Could not get shot decision. Retrying...")
+    finally:
+        vision_system.vision_system_instance.stop_camera()
 
-                continue  # Skip to the start of the loop to try again
 
-            decision = response.get("decision", {})
+def run_game(golfer=None):
+    """
+    Plays one game. golfer: object with the AssistantGolfer methods
+    (default: the LLM golfer; a scripted one can drive simulated runs).
+    """
 
-            tool_id = response.get("tool_call_id", {})
+    print("Starting Golf Game")
 
-            aim = float(decision.get("aim_degrees", 90))
+    if golfer is None:
+        from llm_golfer import AssistantGolfer
 
-            force = int(decision.get("strike_force", 50))
+        golfer = AssistantGolfer()
 
-            comment = decision.get("commentary", "Here we go.")
+    golfer.start_new_game()
 
-            # Play audio immediately
+    shot_history = []
 
-            audio_manager.play_speech(comment)
+    shot_count = 0
 
-            # 4. Execute Shot
+    worker = None
 
-            hardware_controller.set_stepper_angle(aim)
+    try:
 
-            time.sleep(0.5)
+        # 1. Setup
+        reference_hole_coords = start_systems()
+        hole_coords = vision_system.vision_system_instance.apply_drift(reference_hole_coords)
+
+        # First-shot suggestion (also offered to the golfer, see shot_hints)
+        hole_metric, _ = to_feedback_coords(hole_coords)
+        suggestion = shot_model.model.predict(hole_metric) if hole_metric is not None else None
+        if suggestion is not None:
+            print(
+                f"Shot model suggests aim {suggestion['aim']:.1f}° (±{suggestion['aim_std']:.1f}), "
+                f"force {suggestion['force']:.0f}% (±{suggestion['force_std']:.0f})"
+            )
 
-            hardware_controller.swing_club(force)
+        if VISION_WORKER_ENABLED:
+            # The camera can only be opened by one process at a time
+            vision_system.vision_system_instance.stop_camera()
+            worker = vision_worker.VisionWorker()
+            worker.start()
+            vision_system.vision_system_instance.attach_worker(worker)
 
-            # 5. Wait for Settle
+        # Decision for the next shot, requested while the ball is being reset
+        next_response = None
 
-            print("Waiting 3s for ball to settle...")
+        while True:
 
-            time.sleep(3)
+            shot_count += 1
 
-            # Vision and Feedback
-            ball_pos = vision_system.get_live_ball_position()
+            print(f"\nShot {shot_count}")
 
-            if ball_pos is None:
+            # Periodic camera pose check (ball is on the tee here)
+            if shot_count > 1 and shot_count % DRIFT_CHECK_INTERVAL == 0:
+                if vision_system.vision_system_instance.check_camera_drift() == "recalibrate":
+                    reference_hole_coords = calibrate_hole_position(use_cache=False)
+                hole_coords = vision_system.vision_system_instance.apply_drift(
+                    reference_hole_coords
+                )
 
-                print("Ball not found. Assuming missed/out of bounds.")
+            # 3. Get Decision
 
-                nl_feedback = (
-                    "I lost sight of the ball completely. It might be off the course."
+            response = next_response
+            next_response = None
+            if response is None:
+                print("Requesting shot decision...")
+                response = golfer.get_next_shot_decision(
+                    build_shot_prompt(shot_count, shot_history, shot_hints(hole_coords))
                 )
 
-                distance = 9999
-
-            else:
+            if response is None:
 
-                # Calculate distance and generate feedback...
+                print("Network/API Error: Could not get shot decision. Retrying...")
 
-                distance = math.dist(ball_pos, hole_coords)
+                continue  # Skip to the start of the loop to try again
 
-                nl_feedback = feedback_generator.get_fuzzy_feedback(
-                    ball_pos, hole_coords
-                )
+            decision = response.get("decision", {})
 
-                print(f"Feedback: {nl_feedback}")
+            tool_id = response.get("tool_call_id", {})
 
-            shot_result = (
-                f"Shot {shot_count}: Aim {aim}, Force {force}. Result: {nl_feedback}"
-            )
+            aim = float(decision.get("aim_degrees", 90))
 
-            shot_history.append(shot_result)
+            force = int(decision.get("strike_force", 50))
 
-            golfer.add_tool_response_to_history(tool_id, shot_result)
+            comment = decision.get("commentary", "Here we go.")
 
-            # 7. Check Win Condition
+            # 4-8. Shot cycle: independent phases overlap (see shot_scheduler)
+            outcome = {}
 
-            if is_ball_in_hole(ball_pos, hole_coords):
+            def strike():
+                # Step position actually played (after the aim phase)
+                outcome["steps"] = hardware_controller.current_stepper_position
+                hal.clock.sleep(0.5)
+                hardware_controller.swing_club(force)
 
-                print("HOLE IN ONE!")
+            def settle():
+                print("Waiting 3s for ball to settle...")
+                hal.clock.sleep(3)
 
-                # Ask for celebration
+            def evaluate():
+                ball_pos = vision_system.get_live_ball_position()
+                nl_feedback = describe_shot(ball_pos, hole_coords)
+                print(f"Feedback: {nl_feedback}")
 
-                celebration_prompt = (
-                    "You just sank the ball! Give me a loud, short celebration line!"
+                shot_result = (
+                    f"Shot {shot_count}: Aim {aim}, Force {force}. Result: {nl_feedback}"
+                )
+                shot_history.append(shot_result)
+                golfer.add_tool_response_to_history(tool_id, shot_result)
+
+                ball_metric, units = to_feedback_coords(ball_pos)
+                hole_metric, _ = to_feedback_coords(hole_coords)
+                shot_store.shots.record(
+                    aim, force, ball_metric, hole_metric, units,
+                    outcome["steps"], shot_calibration.aim_calibration_id(),
+                )
+                if ball_metric is not None and units == shot_model.model.units:
+                    shot_model.model.update(ball_metric, aim, force)
+
+                outcome["feedback"] = nl_feedback
+                outcome["won"] = is_ball_in_hole(ball_pos, hole_coords)
+
+            def react():
+                # Must reach the golfer history before the next decision request
+                if outcome["won"]:
+                    print("HOLE IN ONE!")
+                    prompt = "You just sank the ball! Give me a loud, short celebration line!"
+                else:
+                    print("Missed. Preparing for next shot...")
+                    prompt = f"You missed. Feedback was: {outcome['feedback']}. Give a 5-word regretful comment."
+                return golfer.get_simple_text_response(prompt)
+
+            def reset():
+                if not outcome["won"]:
+                    reset_ball()
+
+            def request_next_decision():
+                if outcome["won"]:
+                    return None
+                print("Requesting shot decision...")
+                return golfer.get_next_shot_decision(
+                    build_shot_prompt(shot_count + 1, shot_history, shot_hints(hole_coords))
                 )
 
-                cel_resp = golfer.get_simple_text_response(celebration_prompt)
+            scheduler = shot_scheduler.ShotScheduler()
+            scheduler.add("commentary", audio_manager.play_speech, comment)
+            # Pre-aim while the commentary plays
+            scheduler.add("aim", hardware_controller.set_stepper_angle, aim)
+            scheduler.add("swing", strike, after=["commentary", "aim"])
+            scheduler.add("settle", settle, after=["swing"])
+            scheduler.add("vision", evaluate, after=["settle"])
+            scheduler.add("reaction", react, after=["vision"])
+            scheduler.add(
+                "reaction_speech",
+                lambda: audio_manager.play_speech(scheduler.result("reaction")),
+                after=["reaction"],
+            )
+            scheduler.add("reset", reset, after=["vision"])
+            scheduler.add("next_decision", request_next_decision, after=["reaction"])
 
-                audio_manager.play_speech(cel_resp)
+            results = scheduler.run()
+            print(f"Shot {shot_count} timing: {scheduler.format_report()}")
 
+            if outcome["won"]:
                 print("Game Over. Winning.")
-
                 break
 
-            else:
-
-                # 8. Continuation Loop
-
-                print("Missed. Preparing for next shot...")
-
-                # Ask for reaction to the miss
-
-                reaction_prompt = f"You missed. Feedback was: {nl_feedback}. Give a 5-word regretful comment."
-
-                react_resp = golfer.get_simple_text_response(reaction_prompt)
-
-                audio_manager.play_speech(react_resp)
-
-                # Reset Ball
-
-                hardware_controller.reset_ball_actuator()
+            next_response = results["next_decision"]
 
     except KeyboardInterrupt:
 
@@ -249,7 +699,17 @@ def run_game():
         print("Shutting down systems...")
         hardware_controller.cleanup_all()
 
+        print(f"Shot store lookups: {shot_store.shots.query_stats}")
+        print(
+            f"Shot model: {shot_model.model.shots} shots, prediction errors "
+            f"{shot_model.model.error_stats}, latency {shot_model.model.latency_stats}"
+        )
+        shot_store.shots.close()
+
         # Cleanup Camera
+        if worker is not None:
+            vision_system.vision_system_instance.attach_worker(None)
+            worker.stop()
         vision_system.vision_system_instance.stop_camera()
 
         sys.exit()
@@ -257,4 +717,12 @@ def run_game():
 
 if __name__ == "__main__":
 
-    run_game()
+    if "--calibrate" in sys.argv[1:]:
+        # Optional: --calibrate aim | --calibrate force | --calibrate table
+        mode = sys.argv[sys.argv.index("--calibrate") + 1:][:1]
+        if mode == ["table"]:
+            run_table_calibration()
+        else:
+            run_calibration(aim=mode != ["force"], force=mode != ["aim"])
+    else:
+        run_game()
@@ -0,0 +1,184 @@
+from functools import lru_cache
+
+import numpy as np
+
+import hal
+
+
+# Stepper motion planning.
+# A constant pulse rate has to be slow enough for the NEMA 17 to start from
+# standstill without stalling. Ramping the rate up and down lets it cruise much
+# faster. Each move is turned into an array of step intervals (seconds between
+# consecutive rising edges), cached per (steps, profile).
+
+# Profiles, rates in steps per second:
+# - start_rate: rate the motor can start/stop at without ramping
+# - max_rate: cruise rate
+# - accel: acceleration (steps/s^2)
+# - s_curve: cosine-shaped ramp (limited jerk) instead of constant acceleration
+PROFILES = {
+    # Legacy behaviour: 1ms half-period, no ramp
+    "constant": {"start_rate": 500.0, "max_rate": 500.0, "accel": 1.0, "s_curve": False},
+    "trapezoid": {"start_rate": 500.0, "max_rate": 1500.0, "accel": 4000.0, "s_curve": False},
+    "s_curve": {"start_rate": 500.0, "max_rate": 1500.0, "accel": 4000.0, "s_curve": True},
+}
+
+
+# Executor timing: sleep until this close to an edge, then spin on the clock.
+# time.sleep overshoots by tens of microseconds or more; spinning does not.
+SPIN_THRESHOLD_NS = 200_000
+
+# Stats of the most recent run_schedule call
+last_move_stats = {}
+
+
+def _ramp_rates(positions, start_rate, max_rate, accel, s_curve):
+    """Rate reached after `positions` steps of acceleration from start_rate."""
+    if max_rate <= start_rate:
+        return np.full(positions.shape, start_rate)
+
+    if not s_curve:
+        # v^2 = v0^2 + 2*a*s
+        return np.minimum(np.sqrt(start_rate ** 2 + 2.0 * accel * positions), max_rate)
+
+    # Cosine ramp over twice the trapezoid's ramp distance: similar average
+    # acceleration, but it fades in and out smoothly (no jerk spikes)
+    ramp_steps = (max_rate ** 2 - start_rate ** 2) / accel
+    fraction = np.clip(positions / ramp_steps, 0.0, 1.0)
+    return start_rate + (max_rate - start_rate) * (0.5 - 0.5 * np.cos(np.pi * fraction))
+
+
+@lru_cache(maxsize=512)
+def plan_move(steps, profile="trapezoid"):
+    """
+    Builds the step schedule for a move of `steps` steps.
+    Returns: read-only float64 array of `steps` intervals in seconds
+    (accel, cruise and decel phases; short moves never reach cruise).
+    """
+    params = PROFILES[profile]
+    if steps <= 0:
+        schedule = np.zeros(0)
+        schedule.setflags(write=False)
+        return schedule
+
+    # Rate at the middle of each step, limited by the distance both from the
+    # start (acceleration) and from the end (deceleration)
+    index = np.arange(steps, dtype=np.float64) + 0.5
+    from_start = _ramp_rates(
+        index, params["start_rate"], params["max_rate"], params["accel"], params["s_curve"]
+    )
+    from_end = _ramp_rates(
+        steps - index, params["start_rate"], params["max_rate"], params["accel"], params["s_curve"]
+    )
+    schedule = 1.0 / np.minimum(from_start, from_end)
+    schedule.setflags(write=False)
+    return schedule
+
+
+def move_duration(steps, profile="trapezoid"):
+    """Planned duration of a move in seconds."""
+    return float(plan_move(steps, profile).sum())
+
+
+@lru_cache(maxsize=64)
+def constant_schedule(steps, interval):
+    """Schedule of `steps` identical intervals (seconds), e.g. for homing."""
+    schedule = np.full(max(steps, 0), float(interval))
+    schedule.setflags(write=False)
+    return schedule
+
+
+def wait_until(deadline_ns):
+    """Sleeps until SPIN_THRESHOLD_NS before the deadline, then spins on the clock."""
+    clock = hal.clock
+    if clock.virtual:
+        clock.advance_to(deadline_ns)
+        return
+
+    remaining = deadline_ns - clock.perf_counter_ns()
+    if remaining > SPIN_THRESHOLD_NS:
+        clock.sleep((remaining - SPIN_THRESHOLD_NS) / 1e9)
+    while clock.perf_counter_ns() < deadline_ns:
+        pass
+
+
+def _edge_offsets_ns(schedule):
+    """Planned offset of every edge from the start of the move (high, low, high, ...)."""
+    starts = np.cumsum(schedule) - schedule
+    offsets = np.empty(2 * len(schedule))
+    offsets[0::2] = starts
+    offsets[1::2] = starts + schedule / 2.0
+    return (offsets * 1e9).astype(np.int64)
+
+
+def run_schedule(schedule, pulse_high, pulse_low, should_stop=None):
+    """
+    Replays a step schedule with every edge scheduled against an absolute
+    perf_counter_ns deadline measured from the start of the move, so time spent
+    in the GPIO calls does not accumulate. Sleeps for most of each wait and
+    spins for the last SPIN_THRESHOLD_NS. The pulse is high for the first half
+    of each interval. should_stop() is checked before every step.
+    Returns: stats dict (also kept in last_move_stats).
+    """
+    global last_move_stats
+
+    offsets = _edge_offsets_ns(schedule)
+    actual = np.empty(len(offsets), np.int64)
+    planned_end_ns = int(float(np.sum(schedule)) * 1e9)
+
+    edges = 0
+    stopped = False
+    start_ns = hal.clock.perf_counter_ns()
+    for i, offset in enumerate(offsets.tolist()):
+        high = i % 2 == 0
+        if high and should_stop is not None and should_stop():
+            stopped = True
+            break
+
+        wait_until(start_ns + offset)
+        actual[i] = hal.clock.perf_counter_ns()
+        if high:
+            pulse_high()
+        else:
+            pulse_low()
+        edges += 1
+
+    # Keep the full low time of the last step before the next move starts
+    if not stopped:
+        wait_until(start_ns + planned_end_ns)
+
+    last_move_stats = _move_stats(offsets[:edges], actual[:edges] - start_ns, edges // 2, stopped)
+    return last_move_stats
+
+
+def _move_stats(planned, actual, steps, stopped):
+    """Duration and edge timing error (actual - planned) of a move."""
+    if len(planned) == 0:
+        return {"steps": 0, "stopped": stopped}
+
+    error_us = (actual - planned) / 1000.0
+    planned_intervals = np.diff(planned)
+    actual_intervals = np.diff(actual)
+    jitter = actual_intervals - planned_intervals
+    return {
+        "steps": steps,
+        "stopped": stopped,
+        "planned_s": float(planned[-1]) / 1e9,
+        "actual_s": float(actual[-1]) / 1e9,
+        "mean_error_us": float(np.mean(error_us)),
+        "max_error_us": float(np.max(np.abs(error_us))),
+        "p99_error_us": float(np.percentile(np.abs(error_us), 99)),
+        "jitter_us": float(np.std(jitter) / 1000.0) if len(jitter) else 0.0,
+    }
+
+
+def format_stats(stats):
+    """One-line summary of a stats dict from run_schedule."""
+    if not stats.get("steps"):
+        return "no steps"
+    return (
+        f"{stats['steps']} steps in {stats['actual_s']:.3f}s "
+        f"(planned {stats['planned_s']:.3f}s), edge error mean "
+        f"{stats['mean_error_us']:.0f}us max {stats['max_error_us']:.0f}us, "
+        f"jitter {stats['jitter_us']:.0f}us"
+    )
@@ -0,0 +1,186 @@
+import gc
+
+import os
+
+import queue
+
+import threading
+
+import ctypes
+
+import ctypes.util
+
+from concurrent.futures import Future
+
+import hal
+
+
+# Dedicated thread for timing-sensitive motion (stepper pulses, servo sweeps).
+# Moves are submitted as callables and run one at a time; callers get a
+# Future back, stamped with submitted_at/started_at/completed_at (hal.clock
+# seconds). Real-time settings are best effort: each one that the OS or
+# our privileges refuse is reported and skipped. mlockall and the garbage
+# collector are process-wide, so they are handled once for all motion threads.
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+_process_lock = threading.Lock()
+_memory_locked = None  # None = not tried yet, else whether mlockall succeeded
+_gc_holds = 0  # Moves currently running with the GC suspended
+_gc_was_enabled = False
+
+
+def lock_process_memory():
+    """mlockall() for the whole process, attempted once. Returns True if memory is locked."""
+    global _memory_locked
+
+    with _process_lock:
+        if _memory_locked is None:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+                    raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+                _memory_locked = True
+            except (AttributeError, OSError) as e:
+                print(f"Motion Warning: mlockall unavailable ({e})")
+                _memory_locked = False
+        return _memory_locked
+
+
+def _hold_gc():
+    """Suspends the GC until every holder has released it (moves may overlap)."""
+    global _gc_holds, _gc_was_enabled
+
+    with _process_lock:
+        if _gc_holds == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_holds += 1
+
+
+def _release_gc():
+    global _gc_holds
+
+    with _process_lock:
+        _gc_holds -= 1
+        if _gc_holds == 0 and _gc_was_enabled:
+            gc.enable()
+
+
+class MotionThread(threading.Thread):
+    """
+    Runs submitted moves in order on one thread.
+    cpu: CPU index to pin the thread to (None = no pinning)
+    fifo_priority: SCHED_FIFO priority 1-99 (None = normal scheduling)
+    lock_memory: mlockall() so moves never page-fault (once per process)
+    disable_gc: suspend the garbage collector while a move runs (shared
+    with the other motion threads: it resumes when none is moving)
+    """
+
+    def __init__(self, cpu=None, fifo_priority=None, lock_memory=False, disable_gc=False, name="motion"):
+        super().__init__(name=name, daemon=True)
+        self.cpu = cpu
+        self.fifo_priority = fifo_priority
+        self.lock_memory = lock_memory
+        self.disable_gc = disable_gc
+
+        self.queue = queue.Queue()
+        self.applied = {}
+        self._ready = threading.Event()
+
+    def start(self):
+        super().start()
+        # Settings are applied from inside the thread; wait so they can be reported
+        self._ready.wait(timeout=2.0)
+
+    def _apply_realtime_settings(self):
+        """Applies the requested settings to this thread. Records what took effect."""
+        if self.cpu is not None:
+            try:
+                # pid 0 = calling thread on Linux
+                os.sched_setaffinity(0, {self.cpu})
+                self.applied["cpu"] = self.cpu
+            except (AttributeError, OSError, ValueError) as e:
+                print(f"Motion Warning: CPU pinning unavailable ({e})")
+
+        if self.fifo_priority is not None:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.fifo_priority))
+                self.applied["fifo_priority"] = self.fifo_priority
+            except (AttributeError, OSError) as e:
+                print(f"Motion Warning: SCHED_FIFO unavailable ({e})")
+
+        if self.lock_memory and lock_process_memory():
+            self.applied["lock_memory"] = True
+
+        if self.disable_gc:
+            self.applied["disable_gc"] = True
+
+        print(f"Motion thread {self.name} settings: {self.applied or 'none'}")
+
+    def run(self):
+        self._apply_realtime_settings()
+        self._ready.set()
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            future, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            if self.disable_gc:
+                _hold_gc()
+            future.started_at = hal.clock.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.completed_at = hal.clock.monotonic()
+                future.set_exception(e)
+            else:
+                future.completed_at = hal.clock.monotonic()
+                future.set_result(result)
+            finally:
+                if self.disable_gc:
+                    _release_gc()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(*args, **kwargs). Returns a concurrent.futures.Future."""
+        future = Future()
+        future.submitted_at = hal.clock.monotonic()
+        future.started_at = future.completed_at = None
+        self.queue.put((future, fn, args, kwargs))
+        return future
+
+    def is_current(self):
+        """True when called from the motion thread itself."""
+        return threading.current_thread() is self
+
+    def cancel_pending(self):
+        """Cancels the queued moves that have not started. Returns how many."""
+        cancelled = 0
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return cancelled
+            if item is not None:
+                item[0].cancel()
+                cancelled += 1
+
+    def stop(self, timeout=5.0, cancel_pending=False):
+        """
+        Ends the thread after the queued moves, or with cancel_pending right
+        after the running one (queued futures are cancelled).
+        """
+        if cancel_pending:
+            cancelled = self.cancel_pending()
+            if cancelled:
+                print(f"Motion thread {self.name}: {cancelled} queued commands cancelled")
+        self.queue.put(None)
+        self.join(timeout)
+        if self.is_alive():
+            print(f"Motion Warning: {self.name} still running after {timeout}s")
@@ -0,0 +1,139 @@
+import os
+
+import time
+
+
+PWM_SYSFS_ROOT = "/sys/class/pwm"
+
+# Attribute files kept open for the lifetime of the channel
+ATTRIBUTES = ("period", "duty_cycle", "enable")
+
+
+class PwmChannel:
+    """
+    A sysfs PWM channel with its attribute files kept open.
+    Each update is a single pwrite() on a cached descriptor (no path lookup,
+    open or close), and writes of an unchanged value are skipped.
+    root can point at a fake sysfs tree (e.g. a temp directory) for testing.
+    """
+
+    def __init__(self, chip, channel, root=PWM_SYSFS_ROOT):
+        self.chip = chip
+        self.channel = channel
+        self.root = root
+        self.chip_dir = os.path.join(root, f"pwmchip{chip}")
+        self.channel_dir = os.path.join(self.chip_dir, f"pwm{channel}")
+
+        self.fds = {}
+        self.values = {}
+
+        # Update latency statistics (nanoseconds)
+        self.writes = 0
+        self.skipped = 0
+        self.errors = 0
+        self.total_write_ns = 0
+        self.max_write_ns = 0
+
+    def export(self):
+        """Exports the channel if needed, waits for its files and opens them."""
+        if not os.path.exists(self.channel_dir):
+            try:
+                with open(os.path.join(self.chip_dir, "export"), "w") as f:
+                    f.write(str(self.channel))
+            except (IOError, OSError):
+                # Device likely busy or already exported
+                pass
+
+            # Wait for OS to create the PWM files
+            for _ in range(10):
+                if os.path.exists(self.channel_dir):
+                    break
+                time.sleep(0.1)
+            else:
+                print(f"PWM Export warning: {self.channel_dir} did not appear quickly.")
+
+        self.open()
+
+    def open(self):
+        """Opens the attribute files (missing ones are left closed and writes to them ignored)."""
+        for name in ATTRIBUTES:
+            if name in self.fds:
+                continue
+            try:
+                self.fds[name] = os.open(os.path.join(self.channel_dir, name), os.O_WRONLY)
+            except OSError as e:
+                print(f"PWM Warning: cannot open {name} of pwm{self.channel}: {e}")
+
+    def write(self, name, value):
+        """
+        Writes an attribute. Returns True if written, False if skipped
+        (unchanged value) or failed; errors are counted, not raised.
+        """
+        if self.values.get(name) == value:
+            self.skipped += 1
+            return False
+
+        fd = self.fds.get(name)
+        if fd is None:
+            self.errors += 1
+            return False
+
+        data = str(value).encode()
+        start_ns = time.perf_counter_ns()
+        try:
+            os.pwrite(fd, data, 0)
+        except OSError:
+            # e.g. duty_cycle > period; the kernel keeps the old value
+            self.errors += 1
+            self.values.pop(name, None)
+            return False
+
+        elapsed = time.perf_counter_ns() - start_ns
+        self.writes += 1
+        self.total_write_ns += elapsed
+        if elapsed > self.max_write_ns:
+            self.max_write_ns = elapsed
+
+        self.values[name] = value
+        return True
+
+    def set_period(self, period_ns):
+        return self.write("period", int(period_ns))
+
+    def set_duty(self, duty_ns):
+        return self.write("duty_cycle", int(duty_ns))
+
+    def enable(self):
+        return self.write("enable", 1)
+
+    def disable(self):
+        return self.write("enable", 0)
+
+    def latency_stats(self):
+        """Update latency achieved so far."""
+        return {
+            "writes": self.writes,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "mean_us": self.total_write_ns / self.writes / 1000.0 if self.writes else 0.0,
+            "max_us": self.max_write_ns / 1000.0,
+        }
+
+    def close(self):
+        """Closes the cached descriptors."""
+        for fd in self.fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fds = {}
+        self.values = {}
+
+    def unexport(self):
+        """Closes the descriptors and unexports the channel."""
+        self.close()
+        try:
+            with open(os.path.join(self.chip_dir, "unexport"), "w") as f:
+                f.write(str(self.channel))
+        except (IOError, OSError):
+            pass
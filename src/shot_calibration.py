@@ -0,0 +1,332 @@
+import math
+
+import time
+
+import numpy as np
+
+import calibration_store
+
+import hal
+
+import hardware_controller
+
+import table_calibration
+
+
+# Shot calibration measured by the camera.
+# The aim sweep fires shots across the stepper range and measures the
+# direction the ball leaves the tee, so an "aim_degrees" from the golfer is
+# turned into the step position that actually sends the ball that way.
+# Angles follow the feedback coordinates (image axes): 90 deg rolls straight
+# up the image (toward smaller y), 45 deg to the left (smaller x).
+# The force sweep measures how far each strike_force rolls the ball (through
+# swing_club's power boost and swing speed curve), so a wanted distance can
+# be turned into a force.
+# Both files record the feedback frame (units and table size) they were
+# measured in, and are not loaded in another one.
+
+AIM_TABLE_FILE = "aim_calibration.json"
+
+# Step positions fired during the sweep, and shots per position
+AIM_SWEEP_STEPS = tuple(range(60, 241, 20))
+AIM_SWEEP_REPEATS = 1
+# Strike force for the aim sweep: far enough for a clean direction, short
+# enough to stay on the table
+AIM_SWEEP_FORCE = 30
+# Shorter rolls are too noisy to give a direction (feedback units: mm or px)
+AIM_MIN_TRAVEL = 15.0
+
+# Lookup resolution (entries per degree)
+AIM_TABLE_RESOLUTION = 10
+
+FORCE_TABLE_FILE = "force_calibration.json"
+
+# Force levels fired during the sweep, shots per level, and the aim used
+FORCE_SWEEP_LEVELS = tuple(range(10, 101, 10))
+FORCE_SWEEP_REPEATS = 3
+FORCE_SWEEP_AIM = 90.0
+
+# Inverse lookup resolution (entries per feedback unit: mm, or px without table maps)
+FORCE_TABLE_RESOLUTION = 1
+
+# Wait after a swing before the ball is measured (s)
+SETTLE_TIME = 3.0
+
+
+def load_calibration(filename):
+    """Saved calibration data, or None if missing or measured in another feedback frame."""
+    data = calibration_store.load_json(filename)
+    if data is None:
+        return None
+
+    frame = table_calibration.feedback_frame()
+    if data.get("frame") != frame:
+        print(
+            f"{filename} was measured in {data.get('frame')}, feedback is in {frame}: "
+            f"not used (run --calibrate again)."
+        )
+        return None
+    return data
+
+
+def exit_angle(start, end):
+    """Direction from start to end in degrees (see the convention above)."""
+    return math.degrees(math.atan2(start[1] - end[1], start[0] - end[0]))
+
+
+def measure_shot(ball_position, force):
+    """
+    Fires one shot from the tee and measures it.
+    ball_position: callable returning the ball position (feedback coordinates) or None
+    Returns: (start, end) positions, end None if the ball was lost
+    """
+    start = ball_position()
+    if start is None:
+        return None, None
+
+    hardware_controller.swing_club(force)
+    hal.clock.sleep(SETTLE_TIME)
+    return start, ball_position()
+
+
+class AimTable:
+    """Aim angle -> stepper position, by lookup in a dense monotonic table."""
+
+    def __init__(self):
+        self.table = None
+        self.min_angle = None
+        self.max_angle = None
+        # Identifies the saved calibration (see aim_calibration_id)
+        self.calibration_id = None
+
+    @property
+    def available(self):
+        return self.table is not None
+
+    def build(self, steps, angles):
+        """
+        Builds the lookup from measured (step position, exit angle) samples.
+        Repeated positions are reduced to their median, and the angles are made
+        monotonic along the step range before interpolation.
+        """
+        steps = np.asarray(steps, np.float64)
+        angles = np.asarray(angles, np.float64)
+
+        positions = np.unique(steps)
+        if len(positions) < 2:
+            self.table = None
+            return False
+        medians = np.array([np.median(angles[steps == p]) for p in positions])
+
+        # Stepping away from the switch turns the aim one way: drop outliers
+        # that turn it back (running extremum in the dominant direction)
+        direction = 1.0 if medians[-1] >= medians[0] else -1.0
+        medians = np.maximum.accumulate(medians * direction) * direction
+
+        # np.interp needs increasing angles without repeats
+        order = np.argsort(medians, kind="stable")
+        unique_angles, first = np.unique(medians[order], return_index=True)
+        if len(unique_angles) < 2:
+            self.table = None
+            return False
+        unique_steps = positions[order][first]
+
+        self.min_angle = float(unique_angles[0])
+        self.max_angle = float(unique_angles[-1])
+        count = int(round((self.max_angle - self.min_angle) * AIM_TABLE_RESOLUTION)) + 1
+        grid = self.min_angle + np.arange(count) / AIM_TABLE_RESOLUTION
+        # Plain ints: a lookup is one list index, no NumPy scalar per aim
+        self.table = np.rint(np.interp(grid, unique_angles, unique_steps)).astype(int).tolist()
+        return True
+
+    def load(self):
+        """Loads the saved calibration. Returns True if the lookup is available."""
+        data = load_calibration(AIM_TABLE_FILE)
+        if data is None:
+            self.table = None
+            return False
+        self.calibration_id = f"aim-{data['saved_at']:.0f}"
+        return self.build(data["steps"], data["angles"])
+
+    def steps_for(self, angle):
+        """Step position for an aim angle (clamped to the measured range)."""
+        index = int(round((angle - self.min_angle) * AIM_TABLE_RESOLUTION))
+        return self.table[min(max(index, 0), len(self.table) - 1)]
+
+
+class ForceTable:
+    """Wanted roll distance -> strike force, by lookup in a dense table."""
+
+    def __init__(self):
+        self.table = None
+        self.levels = None
+
+    @property
+    def available(self):
+        return self.table is not None
+
+    def build(self, levels):
+        """
+        Builds the inverse lookup from per-level statistics (dicts with force
+        and the mean, variance and std of the distance, see calibrate_force). Mean distances are
+        made non-decreasing in force before interpolation. Censored levels
+        (some shots lost) are left out: their mean is biased low.
+        """
+        levels = sorted(
+            (l for l in levels if l["mean"] is not None and not l.get("censored")),
+            key=lambda l: l["force"],
+        )
+        if len(levels) < 2:
+            self.table = None
+            return False
+
+        forces = np.array([l["force"] for l in levels], np.float64)
+        distances = np.maximum.accumulate(np.array([l["mean"] for l in levels], np.float64))
+
+        # np.interp needs increasing distances: a plateau keeps its weakest force
+        distances, first = np.unique(distances, return_index=True)
+        forces = forces[first]
+        if len(distances) < 2:
+            self.table = None
+            return False
+
+        count = int(math.ceil(distances[-1] * FORCE_TABLE_RESOLUTION)) + 1
+        grid = np.arange(count) / FORCE_TABLE_RESOLUTION
+        # Below the weakest measured level np.interp clamps to its force
+        self.table = np.rint(np.interp(grid, distances, forces)).astype(int).tolist()
+        self.levels = levels
+        return True
+
+    def load(self):
+        """Loads the saved calibration. Returns True if the lookup is available."""
+        data = load_calibration(FORCE_TABLE_FILE)
+        if data is None:
+            self.table = None
+            return False
+        return self.build(data["levels"])
+
+    @property
+    def max_distance(self):
+        return (len(self.table) - 1) / FORCE_TABLE_RESOLUTION
+
+    def force_for(self, distance):
+        """Strike force rolling the ball about distance (clamped to the measured range)."""
+        index = int(round(distance * FORCE_TABLE_RESOLUTION))
+        return self.table[min(max(index, 0), len(self.table) - 1)]
+
+
+def aim_calibration_id():
+    """
+    What turns aim_degrees into stepper steps right now: the saved aim
+    calibration, or "formula" (hardware_controller.map_angle_to_steps_non_linear).
+    """
+    return aim_table.calibration_id if aim_table.available else "formula"
+
+
+def calibrate_aim(ball_position, reset_ball, steps=AIM_SWEEP_STEPS, repeats=AIM_SWEEP_REPEATS):
+    """
+    Fires AIM_SWEEP_FORCE shots at each step position, measures the exit
+    angle, saves the samples and rebuilds aim_table.
+    ball_position: callable returning the ball position (feedback coordinates) or None
+    reset_ball: callable returning the ball to the tee
+    Returns: True if a usable table was built
+    """
+    print(f"\nAim calibration: {len(steps)} positions x {repeats} shots")
+
+    samples = {"steps": [], "angles": []}
+    for step in steps:
+        for _ in range(repeats):
+            hardware_controller.move_stepper_to(step)
+            start, end = measure_shot(ball_position, AIM_SWEEP_FORCE)
+
+            if start is None or end is None or math.dist(start, end) < AIM_MIN_TRAVEL:
+                print(f"Aim calibration: step {step} gave no usable direction, skipped.")
+            else:
+                angle = exit_angle(start, end)
+                samples["steps"].append(step)
+                samples["angles"].append(angle)
+                print(f"Aim calibration: step {step} -> {angle:.1f}°")
+
+            reset_ball()
+
+    if not aim_table.build(samples["steps"], samples["angles"]):
+        print("Aim calibration failed: not enough usable shots.")
+        return False
+
+    samples["force"] = AIM_SWEEP_FORCE
+    samples["frame"] = table_calibration.feedback_frame()
+    samples["saved_at"] = time.time()
+    calibration_store.save_json(AIM_TABLE_FILE, samples)
+    aim_table.calibration_id = f"aim-{samples['saved_at']:.0f}"
+    print(
+        f"Aim calibration saved: {aim_table.min_angle:.1f}° to {aim_table.max_angle:.1f}° "
+        f"from {len(samples['steps'])} shots."
+    )
+    return True
+
+
+def calibrate_force(ball_position, reset_ball, levels=FORCE_SWEEP_LEVELS, repeats=FORCE_SWEEP_REPEATS):
+    """
+    Fires repeats shots at each force level (aimed at FORCE_SWEEP_AIM),
+    measures the settled roll distance, saves mean and spread per level and
+    rebuilds force_table.
+    ball_position: callable returning the ball position (feedback coordinates) or None
+    reset_ball: callable returning the ball to the tee
+    Returns: True if a usable table was built
+    """
+    print(f"\nForce calibration: {len(levels)} levels x {repeats} shots")
+
+    hardware_controller.set_stepper_angle(FORCE_SWEEP_AIM)
+
+    results = []
+    for force in levels:
+        distances = []
+        lost = 0
+        for _ in range(repeats):
+            start, end = measure_shot(ball_position, force)
+            if start is None:
+                print(f"Force calibration: ball not on the tee at {force}%, shot skipped.")
+            elif end is None:
+                lost += 1  # Usually rolled off the far end
+            else:
+                distances.append(math.dist(start, end))
+            reset_ball()
+
+        # Lost shots rolled further than the table measures: dropping them
+        # would bias the mean low, so the whole level is censored
+        level = {
+            "force": force, "shots": len(distances), "lost": lost, "censored": lost > 0,
+            "mean": None, "var": None, "std": None,
+        }
+        if distances:
+            level["mean"] = float(np.mean(distances))
+            level["var"] = float(np.var(distances))
+            level["std"] = math.sqrt(level["var"])
+            print(
+                f"Force calibration: {force}% -> {level['mean']:.0f} "
+                f"± {level['std']:.0f} ({len(distances)} shots, {lost} lost"
+                f"{', censored' if lost else ''})"
+            )
+        else:
+            print(f"Force calibration: {force}% -> no measurement ({lost} lost)")
+        results.append(level)
+
+    if not force_table.build(results):
+        print("Force calibration failed: not enough usable levels.")
+        return False
+
+    calibration_store.save_json(
+        FORCE_TABLE_FILE,
+        {
+            "levels": results, "aim": FORCE_SWEEP_AIM,
+            "frame": table_calibration.feedback_frame(), "saved_at": time.time(),
+        },
+    )
+    print(f"Force calibration saved: distances up to {force_table.max_distance:.0f}.")
+    return True
+
+
+# global instances for easy import
+aim_table = AimTable()
+
+force_table = ForceTable()
@@ -0,0 +1,147 @@
+import threading
+
+import time
+
+import numpy as np
+
+
+# Inverse shot model: where the ball should stop -> (aim, force).
+# A low-order polynomial in the stopping position, fitted by ridge regression
+# on the logged shots (see shot_store). The normal equations are accumulated
+# shot by shot, so a refit after each shot is one small solve whatever the
+# history size. Each prediction comes with a standard deviation from the
+# residual spread and the target's leverage (large away from past shots).
+
+# Polynomial degree in (x, y)
+MODEL_DEGREE = 2
+# Ridge penalty on the (scaled) features
+MODEL_RIDGE = 1e-3
+# Shots needed before the model predicts
+MODEL_MIN_SHOTS = 8
+# Positions are divided by this before the polynomial (feedback units)
+MODEL_SCALE = {"mm": 1000.0, "px": 640.0}
+
+# Range of the golfer's decisions (see main_controller.build_shot_prompt)
+AIM_RANGE = (45.0, 135.0)
+FORCE_RANGE = (0.0, 100.0)
+
+
+def features(point, scale):
+    """Polynomial terms x^i * y^j (i + j <= MODEL_DEGREE) of a scaled position."""
+    x, y = point[0] / scale, point[1] / scale
+    return np.array(
+        [x ** i * y ** (d - i) for d in range(MODEL_DEGREE + 1) for i in range(d + 1)]
+    )
+
+
+class ShotModel:
+    """Incrementally refitted ridge regression: stopping position -> (aim, force)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset("px")
+
+    def reset(self, units):
+        """Forgets all shots; positions are in units ("mm" or "px") from now on."""
+        with self.lock:
+            self.units = units
+            self.scale = MODEL_SCALE[units]
+            terms = len(features((0.0, 0.0), 1.0))
+
+            # Normal equations: sum(phi phi^T), sum(phi y^T), sum(y^2) per output
+            self.gram = np.zeros((terms, terms))
+            self.moments = np.zeros((terms, 2))
+            self.squares = np.zeros(2)
+            self.shots = 0
+
+            self.weights = None
+            self.inverse = None
+            self.sigma = None
+
+            # Errors of each prediction made before the shot was added,
+            # and prediction latency (microseconds, wall clock)
+            self.error_stats = {"checked": 0, "aim_mae": 0.0, "force_mae": 0.0}
+            self.latency_stats = {"predictions": 0, "mean_us": 0.0, "max_us": 0.0}
+
+    @property
+    def ready(self):
+        return self.weights is not None
+
+    def fit(self, rows, units):
+        """Refits from scratch on shot_store rows (dicts with aim, force, ball)."""
+        self.reset(units)
+        with self.lock:
+            for row in rows:
+                self._add(row["ball"], row["aim"], row["force"])
+            self._solve()
+
+    def update(self, ball, aim, force):
+        """Adds one shot (ball: stopping position) and refits."""
+        with self.lock:
+            if self.ready:
+                predicted = (self.weights.T @ features(ball, self.scale)).tolist()
+                stats = self.error_stats
+                stats["checked"] += 1
+                stats["aim_mae"] += (abs(predicted[0] - aim) - stats["aim_mae"]) / stats["checked"]
+                stats["force_mae"] += (abs(predicted[1] - force) - stats["force_mae"]) / stats["checked"]
+
+            self._add(ball, aim, force)
+            self._solve()
+
+    def _add(self, ball, aim, force):
+        phi = features(ball, self.scale)
+        y = np.array([aim, force], np.float64)
+        self.gram += np.outer(phi, phi)
+        self.moments += np.outer(phi, y)
+        self.squares += y * y
+        self.shots += 1
+
+    def _solve(self):
+        terms = len(self.gram)
+        if self.shots < max(MODEL_MIN_SHOTS, terms + 1):
+            return
+
+        self.inverse = np.linalg.inv(self.gram + MODEL_RIDGE * np.eye(terms))
+        self.weights = self.inverse @ self.moments
+
+        # Residual sum of squares from the accumulated sums
+        residual = (
+            self.squares
+            - 2 * np.sum(self.weights * self.moments, axis=0)
+            + np.sum(self.weights * (self.gram @ self.weights), axis=0)
+        )
+        self.sigma = np.sqrt(np.maximum(residual, 0.0) / (self.shots - terms))
+
+    def predict(self, target):
+        """
+        Aim and force expected to stop the ball at target (feedback coordinates).
+        Returns: dict with aim, force, aim_std, force_std and shots, or None
+        """
+        start = time.perf_counter_ns()
+
+        with self.lock:
+            if not self.ready:
+                return None
+
+            phi = features(target, self.scale)
+            aim, force = self.weights.T @ phi
+            leverage = float(phi @ self.inverse @ phi)
+            aim_std, force_std = self.sigma * np.sqrt(1.0 + leverage)
+            prediction = {
+                "aim": float(min(max(aim, AIM_RANGE[0]), AIM_RANGE[1])),
+                "force": float(min(max(force, FORCE_RANGE[0]), FORCE_RANGE[1])),
+                "aim_std": float(aim_std),
+                "force_std": float(force_std),
+                "shots": self.shots,
+            }
+
+        elapsed_us = (time.perf_counter_ns() - start) / 1000
+        stats = self.latency_stats
+        stats["predictions"] += 1
+        stats["mean_us"] += (elapsed_us - stats["mean_us"]) / stats["predictions"]
+        stats["max_us"] = max(stats["max_us"], elapsed_us)
+        return prediction
+
+
+# global instance for easy import
+model = ShotModel()
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import hal
+
+
+# Dependency-aware phase scheduler for the shot cycle.
+# Phases are callables with a list of phases they must wait for; every phase
+# whose dependencies are done runs right away on a worker thread, so
+# independent phases (e.g. the reaction speech and the ball reset) overlap.
+# After a run, the critical path shows which chain of phases set the cycle time.
+
+
+class Phase:
+    """A named step of the cycle and its timing (seconds from the run start)."""
+
+    def __init__(self, name, fn, args, kwargs, after):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.after = list(after)
+
+        self.result = None
+        self.error = None
+        self.start = None
+        self.end = None
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+class ShotScheduler:
+    """
+    Usage:
+        s = ShotScheduler()
+        s.add("aim", set_stepper_angle, 90)
+        s.add("speech", play_speech, "Here we go")
+        s.add("swing", swing_club, 50, after=["aim", "speech"])
+        results = s.run()
+        print(s.format_report())
+    A phase whose dependency failed is skipped; run() raises the first error
+    once everything that could run has finished. On KeyboardInterrupt run()
+    re-raises at once: queued phases are dropped and running ones are left to
+    finish in the background (hardware_controller.cleanup_all aborts the
+    hardware ones).
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.phases = {}
+
+    def add(self, name, fn, *args, after=(), **kwargs):
+        """Adds a phase running fn(*args, **kwargs) once all phases in after are done."""
+        if name in self.phases:
+            raise ValueError(f"Duplicate phase: {name}")
+        for dep in after:
+            if dep not in self.phases:
+                raise ValueError(f"Phase {name} depends on unknown phase {dep}")
+        self.phases[name] = Phase(name, fn, args, kwargs, after)
+        return name
+
+    def result(self, name):
+        """Result of a finished phase (for phases that consume another's output)."""
+        return self.phases[name].result
+
+    def _run_phase(self, phase, t0):
+        phase.start = hal.clock.monotonic() - t0
+        try:
+            phase.result = phase.fn(*phase.args, **phase.kwargs)
+        except Exception as e:
+            phase.error = e
+        finally:
+            phase.end = hal.clock.monotonic() - t0
+        return phase
+
+    def run(self):
+        """Runs all phases. Returns: dict phase name -> result."""
+        t0 = hal.clock.monotonic()
+        pending = dict(self.phases)
+        done = set()
+        failed = set()
+        running = set()
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="phase")
+        try:
+            while pending or running:
+                for name, phase in list(pending.items()):
+                    if any(dep in failed for dep in phase.after):
+                        # Skipped: counts as failed for its own dependents
+                        failed.add(name)
+                        del pending[name]
+                    elif all(dep in done for dep in phase.after):
+                        running.add(pool.submit(self._run_phase, phase, t0))
+                        del pending[name]
+
+                if not running:
+                    continue
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    phase = future.result()
+                    if phase.error is None:
+                        done.add(phase.name)
+                    else:
+                        print(f"Phase {phase.name} failed: {phase.error}")
+                        failed.add(phase.name)
+        except BaseException:
+            # Ctrl+C: return now instead of waiting for running phases (a ball
+            # reset can take half a minute), so the caller reaches its cleanup
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+        for phase in self.phases.values():
+            if phase.error is not None:
+                raise phase.error
+
+        return {name: phase.result for name, phase in self.phases.items()}
+
+    def critical_path(self):
+        """
+        The chain of phases that determined the total time: starting from the
+        phase that finished last, follows the dependency that finished last.
+        Returns: list of Phase, first to last.
+        """
+        ran = [p for p in self.phases.values() if p.end is not None]
+        if not ran:
+            return []
+
+        phase = max(ran, key=lambda p: p.end)
+        path = [phase]
+        while phase.after:
+            phase = max((self.phases[dep] for dep in phase.after), key=lambda p: p.end or 0.0)
+            path.append(phase)
+        return path[::-1]
+
+    def wall_time(self):
+        ends = [p.end for p in self.phases.values() if p.end is not None]
+        return max(ends) if ends else 0.0
+
+    def serial_time(self):
+        """Time the same phases would have taken one after the other."""
+        return sum(p.duration for p in self.phases.values())
+
+    def format_report(self):
+        path = " -> ".join(f"{p.name} {p.duration:.1f}s" for p in self.critical_path())
+        return (
+            f"{self.wall_time():.1f}s wall ({self.serial_time():.1f}s if sequential). "
+            f"Critical path: {path}"
+        )
@@ -0,0 +1,240 @@
+import heapq
+
+import os
+
+import sqlite3
+
+import threading
+
+import time
+
+import numpy as np
+
+import calibration_store
+
+
+# Persistent shot outcomes.
+# Every shot (aim, force, where the ball stopped, where the hole was) is
+# written to a SQLite file in the data directory, so later games start from
+# what earlier games learned. Stopping positions are indexed in a 2-D KD-tree
+# to answer "which past shots stopped nearest this point?" without scanning
+# the whole history. Positions are feedback coordinates (table mm, or pixels
+# without table maps). Each shot also stores the stepper position it was
+# played from and the aim calibration that turned aim_degrees into it; only
+# shots recorded in the current units and with the current aim calibration
+# are indexed (the same aim_degrees means another direction under another one).
+
+SHOT_DB_FILE = "shots.sqlite3"
+
+# New shots are searched linearly until there are this many (or sqrt(n))
+# of them, then the tree is rebuilt with them included
+REBUILD_MIN_PENDING = 32
+
+# Past shots listed in the prompt hints
+HINT_NEIGHBOURS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shots (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    session REAL NOT NULL,
+    aim REAL NOT NULL,
+    force REAL NOT NULL,
+    ball_x REAL,
+    ball_y REAL,
+    hole_x REAL,
+    hole_y REAL,
+    units TEXT NOT NULL,
+    steps INTEGER,
+    aim_calibration TEXT
+)
+"""
+
+
+class KDTree:
+    """Static, balanced 2-D tree over an (n, 2) array, built by median splits."""
+
+    def __init__(self, points):
+        self.points = np.asarray(points, np.float64).reshape(-1, 2)
+        # Node i: point index, split axis, left and right child (-1 = none)
+        self.index, self.axis, self.left, self.right = [], [], [], []
+        self.root = self._build(np.arange(len(self.points)), 0)
+        # Plain floats for the query loop
+        self.coords = self.points.tolist()
+
+    def _build(self, indices, depth):
+        if len(indices) == 0:
+            return -1
+
+        axis = depth % 2
+        middle = len(indices) // 2
+        order = indices[np.argpartition(self.points[indices, axis], middle)]
+
+        node = len(self.index)
+        self.index.append(int(order[middle]))
+        self.axis.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.left[node] = self._build(order[:middle], depth + 1)
+        self.right[node] = self._build(order[middle + 1:], depth + 1)
+        return node
+
+    def nearest(self, target, k, heap):
+        """
+        Adds the k nearest points to heap, a max-heap of (-squared distance,
+        point index) shared with the caller (at most k entries).
+        """
+        tx, ty = target
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+
+            x, y = self.coords[self.index[node]]
+            d2 = (x - tx) ** 2 + (y - ty) ** 2
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, self.index[node]))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, self.index[node]))
+
+            delta = (tx - x) if self.axis[node] == 0 else (ty - y)
+            near, far = (self.right[node], self.left[node]) if delta >= 0 else (self.left[node], self.right[node])
+            # The far side can only help if the splitting line is closer than the k-th best
+            if len(heap) < k or delta * delta < -heap[0][0]:
+                stack.append(far)
+            stack.append(near)
+
+
+class ShotStore:
+    """SQLite shot log with a nearest-neighbour index on stopping positions."""
+
+    def __init__(self):
+        self.conn = None
+        self.units = None
+        self.aim_calibration = None
+        self.session = None
+        self.lock = threading.Lock()
+
+        # Indexed shots (rows as dicts) and their stopping positions
+        self.rows = []
+        self.tree = None
+        self.indexed = 0  # rows[:indexed] are in the tree, the rest are pending
+
+        # Nearest-neighbour query latency (microseconds, wall clock)
+        self.query_stats = {"queries": 0, "mean_us": 0.0, "max_us": 0.0}
+
+    def open(self, units, aim_calibration):
+        """
+        Opens (or creates) the shot file and indexes past shots recorded in
+        units with the aim calibration aim_calibration (see shot_calibration.aim_calibration_id).
+        """
+        self.close()
+
+        path = calibration_store.data_path(SHOT_DB_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shots are recorded from the shot scheduler's worker threads
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+        self.units = units
+        self.aim_calibration = aim_calibration
+        self.session = time.time()
+
+        cursor = self.conn.execute(
+            "SELECT aim, force, ball_x, ball_y, steps FROM shots "
+            "WHERE units = ? AND aim_calibration = ? AND ball_x IS NOT NULL ORDER BY id",
+            (units, aim_calibration),
+        )
+        self.rows = [
+            {"aim": aim, "force": force, "ball": (x, y), "steps": steps}
+            for aim, force, x, y, steps in cursor
+        ]
+        self._rebuild()
+        print(f"Shot store: {len(self.rows)} past shots indexed ({units}, aim calibration {aim_calibration}).")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def record(self, aim, force, ball, hole, units, steps=None, aim_calibration=None):
+        """
+        Stores one shot. ball/hole: feedback coordinates (ball None if lost).
+        steps: stepper position the shot was played from; aim_calibration:
+        the aim calibration in use (see open).
+        """
+        with self.lock:
+            if self.conn is None:
+                return
+
+            self.conn.execute(
+                "INSERT INTO shots (recorded_at, session, aim, force, ball_x, ball_y, hole_x, hole_y, "
+                "units, steps, aim_calibration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), self.session, float(aim), float(force),
+                    None if ball is None else float(ball[0]),
+                    None if ball is None else float(ball[1]),
+                    None if hole is None else float(hole[0]),
+                    None if hole is None else float(hole[1]),
+                    units,
+                    None if steps is None else int(steps),
+                    aim_calibration,
+                ),
+            )
+            self.conn.commit()
+
+            if ball is None or units != self.units or aim_calibration != self.aim_calibration:
+                return
+
+            self.rows.append({
+                "aim": float(aim), "force": float(force),
+                "ball": (float(ball[0]), float(ball[1])),
+                "steps": None if steps is None else int(steps),
+            })
+            pending = len(self.rows) - self.indexed
+            if pending >= max(REBUILD_MIN_PENDING, int(len(self.rows) ** 0.5)):
+                self._rebuild()
+
+    def _rebuild(self):
+        self.tree = KDTree([row["ball"] for row in self.rows]) if self.rows else None
+        self.indexed = len(self.rows)
+
+    def nearest(self, target, k=HINT_NEIGHBOURS):
+        """
+        Past shots that stopped nearest target (feedback coordinates).
+        Returns: list of dicts (aim, force, ball, distance), nearest first
+        """
+        start = time.perf_counter_ns()
+
+        with self.lock:
+            heap = []
+            if self.tree is not None:
+                self.tree.nearest(target, k, heap)
+
+            # Shots recorded since the last rebuild
+            for i in range(self.indexed, len(self.rows)):
+                x, y = self.rows[i]["ball"]
+                d2 = (x - target[0]) ** 2 + (y - target[1]) ** 2
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, i))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, i))
+
+            result = [
+                dict(self.rows[i], distance=(-neg_d2) ** 0.5)
+                for neg_d2, i in sorted(heap, reverse=True)
+            ]
+
+        elapsed_us = (time.perf_counter_ns() - start) / 1000
+        stats = self.query_stats
+        stats["queries"] += 1
+        stats["mean_us"] += (elapsed_us - stats["mean_us"]) / stats["queries"]
+        stats["max_us"] = max(stats["max_us"], elapsed_us)
+        return result
+
+
+# global instance for easy import
+shots = ShotStore()
@@ -0,0 +1,83 @@
+from functools import lru_cache
+
+import numpy as np
+
+import hal
+
+import motion_planner
+
+
+# Servo swing profiles.
+# A swing is a precomputed array of duty-cycle values sampled at a fixed update
+# rate, played back against absolute deadlines so write latency does not
+# stretch the swing. Same power -> same trajectory -> same strike energy.
+
+# Default update rate (Hz). The servo PWM period is 20 ms, so rates far above
+# 50-100 Hz only add writes the servo never sees.
+DEFAULT_RATE = 100
+
+# Steepness of the exponential curve (fast start, slow arrival)
+EXPONENTIAL_K = 5.0
+
+
+def _linear(t):
+    return t
+
+
+def _minimum_jerk(t):
+    # Zero velocity and acceleration at both ends
+    return t ** 3 * (10.0 - 15.0 * t + 6.0 * t ** 2)
+
+
+def _exponential(t):
+    return (1.0 - np.exp(-EXPONENTIAL_K * t)) / (1.0 - np.exp(-EXPONENTIAL_K))
+
+
+CURVES = {
+    "linear": _linear,
+    "minimum_jerk": _minimum_jerk,
+    "exponential": _exponential,
+}
+
+
+@lru_cache(maxsize=256)
+def trajectory(start_ns, end_ns, duration, curve="linear", rate=DEFAULT_RATE):
+    """
+    Duty-cycle samples (int64 ns) from start to end over duration seconds.
+    Samples are one update (1 / rate) apart; the last one is always end_ns.
+    A duration shorter than one update is a single direct write.
+    Returns a read-only array.
+    """
+    samples = max(int(round(duration * rate)), 1)
+    t = np.arange(1, samples + 1, dtype=np.float64) / samples
+    values = start_ns + (end_ns - start_ns) * CURVES[curve](t)
+    values = np.round(values).astype(np.int64)
+    values[-1] = end_ns
+    values.setflags(write=False)
+    return values
+
+
+def play(values, write_duty, rate=DEFAULT_RATE):
+    """
+    Writes the samples on absolute perf_counter_ns deadlines (the first one
+    immediately). Returns: dict with requested and achieved duration and the
+    lateness of the writes.
+    """
+    period_ns = int(1e9 / rate)
+    lateness = np.empty(len(values), np.int64)
+
+    start_ns = hal.clock.perf_counter_ns()
+    for i, value in enumerate(values.tolist()):
+        deadline = start_ns + i * period_ns
+        motion_planner.wait_until(deadline)
+        lateness[i] = hal.clock.perf_counter_ns() - deadline
+        write_duty(value)
+    end_ns = hal.clock.perf_counter_ns()
+
+    return {
+        "samples": len(values),
+        "requested_s": (len(values) - 1) / rate,
+        "achieved_s": (end_ns - start_ns) / 1e9,
+        "mean_late_us": float(np.mean(lateness)) / 1000.0,
+        "max_late_us": float(np.max(lateness)) / 1000.0,
+    }
@@ -0,0 +1,262 @@
+import hashlib
+
+import json
+
+import numpy as np
+
+import cv2
+
+import calibration_store
+
+import hal
+
+import vision_system
+
+
+# Metric table coordinates.
+# Positions from the vision system are distorted pixel coordinates, so a pixel
+# threshold means a different physical distance at each spot of the field.
+# This module bakes lens undistortion and the FIELD_CORNERS -> table homography
+# into lookup tables once; at runtime a centroid is converted with one lookup.
+
+# Playing field size in millimetres (inner edges of the wooden borders).
+# Measure on the rig: the width runs along the image X axis, the depth along Y.
+TABLE_WIDTH_MM = 1000.0
+TABLE_DEPTH_MM = 500.0
+# Set once the size above has been measured: until then feedback stays in
+# pixels rather than millimetres of a placeholder table
+TABLE_SIZE_MEASURED = False
+
+# Chessboard used for the intrinsic calibration (inner corners, square size)
+CHESSBOARD_SIZE = (9, 6)
+CHESSBOARD_SQUARE_MM = 25.0
+# Views captured by capture_chessboard_views (move the board between them)
+CHESSBOARD_VIEWS = 15
+CHESSBOARD_VIEW_INTERVAL = 2.0
+
+# Resolution of the rectified top-down view (pixels per millimetre)
+RECTIFIED_PX_PER_MM = 0.5
+
+INTRINSICS_FILE = "camera_intrinsics.json"
+POINT_MAP_FILE = "table_point_map.npy"
+REMAP_FILE = "table_remap.npy"
+# What the maps were built from (corners, size, intrinsics): stale maps are rebuilt
+MAPS_INFO_FILE = "table_maps.json"
+
+
+def _field_corners_mm():
+    """
+    Table corners matching FIELD_CORNERS order (Bottom Left, Top Left, Top Right,
+    Bottom Right). The axes follow the image: X grows to the image right and Y
+    grows to the image bottom, so the "right/left" and "short/long" semantics of
+    the pixel feedback are preserved.
+    """
+    return np.float32([
+        [TABLE_WIDTH_MM, 0],
+        [TABLE_WIDTH_MM, TABLE_DEPTH_MM],
+        [0, TABLE_DEPTH_MM],
+        [0, 0],
+    ])
+
+
+def capture_chessboard_views(count=CHESSBOARD_VIEWS, interval=CHESSBOARD_VIEW_INTERVAL):
+    """
+    Captures count frames from the running camera, interval seconds apart,
+    while the chessboard is moved around the field (tilted, near the edges).
+    """
+    frames = []
+    for i in range(count):
+        print(f"Chessboard view {i + 1}/{count}: hold the board still...")
+        hal.clock.sleep(interval)
+        frames.append(vision_system.vision_system_instance.capture_frame())
+    return frames
+
+
+def calibrate_intrinsics(frames):
+    """
+    Computes camera matrix and distortion coefficients from chessboard frames
+    (any capture resolution; stored in reference coordinates) and saves them.
+    Returns: dict with camera_matrix, dist_coeffs and rms error, or None.
+    """
+    pattern = np.zeros((CHESSBOARD_SIZE[0] * CHESSBOARD_SIZE[1], 3), np.float32)
+    pattern[:, :2] = np.mgrid[0:CHESSBOARD_SIZE[0], 0:CHESSBOARD_SIZE[1]].T.reshape(-1, 2)
+    pattern *= CHESSBOARD_SQUARE_MM
+
+    object_points, image_points = [], []
+    for frame in frames:
+        frame = cv2.resize(
+            frame, (vision_system.REFERENCE_WIDTH, vision_system.REFERENCE_HEIGHT)
+        )
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        found, corners = cv2.findChessboardCorners(gray, CHESSBOARD_SIZE)
+        if not found:
+            continue
+
+        corners = cv2.cornerSubPix(
+            gray, corners, (5, 5), (-1, -1),
+            (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01),
+        )
+        object_points.append(pattern)
+        image_points.append(corners)
+
+    print(f"Chessboard found in {len(image_points)}/{len(frames)} frames.")
+    if len(image_points) < 5:
+        print("Not enough chessboard views for intrinsic calibration.")
+        return None
+
+    rms, camera_matrix, dist_coeffs, _, _ = cv2.calibrateCamera(
+        object_points,
+        image_points,
+        (vision_system.REFERENCE_WIDTH, vision_system.REFERENCE_HEIGHT),
+        None,
+        None,
+    )
+
+    intrinsics = {
+        "camera_matrix": camera_matrix.tolist(),
+        "dist_coeffs": dist_coeffs.ravel().tolist(),
+        "rms": float(rms),
+    }
+    calibration_store.save_json(INTRINSICS_FILE, intrinsics)
+    print(f"Intrinsics calibrated (RMS reprojection error {rms:.3f}px).")
+    return intrinsics
+
+
+def load_intrinsics():
+    """Returns (camera_matrix, dist_coeffs). Without a calibration: pinhole, no distortion."""
+    intrinsics = calibration_store.load_json(INTRINSICS_FILE)
+    if intrinsics is None:
+        w, h = vision_system.REFERENCE_WIDTH, vision_system.REFERENCE_HEIGHT
+        camera_matrix = np.array([[w, 0, w / 2], [0, w, h / 2], [0, 0, 1]], np.float64)
+        return camera_matrix, np.zeros(5)
+
+    return (
+        np.array(intrinsics["camera_matrix"], np.float64),
+        np.array(intrinsics["dist_coeffs"], np.float64),
+    )
+
+
+def maps_info(field_corners=vision_system.FIELD_CORNERS):
+    """Inputs the table maps depend on, stored with them to detect stale maps."""
+    intrinsics = calibration_store.load_json(INTRINSICS_FILE)
+    intrinsics_hash = hashlib.sha1(
+        json.dumps(intrinsics, sort_keys=True).encode()
+    ).hexdigest()
+    return {
+        "field_corners": np.asarray(field_corners).tolist(),
+        "table_mm": [TABLE_WIDTH_MM, TABLE_DEPTH_MM],
+        "rectified_px_per_mm": RECTIFIED_PX_PER_MM,
+        "intrinsics": intrinsics_hash,
+    }
+
+
+def build_table_maps(field_corners=vision_system.FIELD_CORNERS):
+    """
+    Solves undistortion and the field homography once and saves:
+    - a point map: (REFERENCE_HEIGHT, REFERENCE_WIDTH, 2) float32 giving the
+      table position in mm of every reference pixel;
+    - remap tables producing a rectified top-down view of the table.
+    """
+    camera_matrix, dist_coeffs = load_intrinsics()
+    w, h = vision_system.REFERENCE_WIDTH, vision_system.REFERENCE_HEIGHT
+
+    # Homography between undistorted pixel coordinates and the table
+    undistorted_corners = cv2.undistortPoints(
+        field_corners.reshape(-1, 1, 2).astype(np.float32),
+        camera_matrix, dist_coeffs, P=camera_matrix,
+    )
+    homography = cv2.getPerspectiveTransform(undistorted_corners, _field_corners_mm())
+
+    # Point map: every pixel -> undistort -> homography
+    grid = np.mgrid[0:h, 0:w][::-1].transpose(1, 2, 0).reshape(-1, 1, 2).astype(np.float32)
+    undistorted = cv2.undistortPoints(grid, camera_matrix, dist_coeffs, P=camera_matrix)
+    point_map = cv2.perspectiveTransform(undistorted, homography).reshape(h, w, 2)
+    calibration_store.save_array(POINT_MAP_FILE, point_map.astype(np.float32))
+
+    # Remap tables: every rectified pixel -> table mm -> undistorted pixel -> distorted pixel
+    out_w = int(TABLE_WIDTH_MM * RECTIFIED_PX_PER_MM)
+    out_h = int(TABLE_DEPTH_MM * RECTIFIED_PX_PER_MM)
+    table_grid = (
+        np.mgrid[0:out_h, 0:out_w][::-1].transpose(1, 2, 0).reshape(-1, 1, 2).astype(np.float32)
+        / RECTIFIED_PX_PER_MM
+    )
+    undistorted = cv2.perspectiveTransform(table_grid, np.linalg.inv(homography))
+    rays = cv2.undistortPoints(undistorted, camera_matrix, None, P=None)
+    rays = np.concatenate([rays.reshape(-1, 2), np.ones((rays.shape[0], 1))], axis=1)
+    distorted, _ = cv2.projectPoints(
+        rays.astype(np.float64), np.zeros(3), np.zeros(3), camera_matrix, dist_coeffs
+    )
+    remap = distorted.reshape(out_h, out_w, 2).astype(np.float32)
+    calibration_store.save_array(REMAP_FILE, remap)
+    calibration_store.save_json(MAPS_INFO_FILE, maps_info(field_corners))
+
+    print(f"Table maps built ({TABLE_WIDTH_MM:.0f}x{TABLE_DEPTH_MM:.0f}mm).")
+    return point_map, remap
+
+
+class TableMapper:
+    """Converts vision reference coordinates to table millimetres by lookup."""
+
+    def __init__(self):
+        self.point_map = None
+        self.remap = None
+
+    def load(self):
+        """
+        Loads the baked maps. Returns True if metric coordinates are available
+        (False for maps built from other corners, table size or intrinsics).
+        """
+        self.point_map = None
+        if calibration_store.load_json(MAPS_INFO_FILE) != maps_info():
+            return False
+
+        point_map = calibration_store.load_array(POINT_MAP_FILE)
+        expected = (vision_system.REFERENCE_HEIGHT, vision_system.REFERENCE_WIDTH, 2)
+        if point_map is None or point_map.shape != expected:
+            self.point_map = None
+            return False
+
+        self.point_map = point_map
+        self.remap = calibration_store.load_array(REMAP_FILE)
+        return True
+
+    @property
+    def available(self):
+        return self.point_map is not None
+
+    def to_table(self, point):
+        """Returns (x_mm, y_mm) for a reference-coordinate point, or None."""
+        if point is None or self.point_map is None:
+            return None
+
+        h, w = self.point_map.shape[:2]
+        x = min(max(int(point[0]), 0), w - 1)
+        y = min(max(int(point[1]), 0), h - 1)
+        x_mm, y_mm = self.point_map[y, x]
+        return (float(x_mm), float(y_mm))
+
+    def rectify(self, frame):
+        """Top-down view of the table (RECTIFIED_PX_PER_MM), for debugging."""
+        if self.remap is None:
+            return None
+
+        frame = cv2.resize(
+            frame, (vision_system.REFERENCE_WIDTH, vision_system.REFERENCE_HEIGHT)
+        )
+        return cv2.remap(
+            frame, self.remap[:, :, 0], self.remap[:, :, 1], cv2.INTER_LINEAR
+        )
+
+
+# global instance for easy import
+table_mapper = TableMapper()
+
+
+def feedback_frame():
+    """
+    Units and table size of the feedback coordinates (mm with the maps, else
+    vision reference pixels), stored with measurements made in them.
+    """
+    if table_mapper.available:
+        return {"units": "mm", "table_mm": [TABLE_WIDTH_MM, TABLE_DEPTH_MM]}
+    return {"units": "px", "table_mm": None}
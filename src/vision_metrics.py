@@ -0,0 +1,131 @@
+import time
+
+import calibration_store
+
+
+# Lightweight always-on instrumentation for the vision pipeline: per-stage
+# latency histograms and per-reason frame counters, in fixed memory.
+
+# Log-linear buckets: 2**SUB_BUCKET_BITS buckets per power of two, i.e. about
+# 12% relative precision, covering 1ns to ~2**62ns in a fixed-size list
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+NUM_BUCKETS = (63 - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+# Write a snapshot to the metrics file at most this often (seconds)
+DUMP_INTERVAL = 30.0
+METRICS_FILE = "vision_metrics.json"
+
+
+def _bucket_index(value):
+    if value < SUB_BUCKETS:
+        return value
+    exponent = value.bit_length() - 1
+    shift = exponent - SUB_BUCKET_BITS
+    return (shift + 1) * SUB_BUCKETS + ((value >> shift) & (SUB_BUCKETS - 1))
+
+
+def _bucket_lower_bound(index):
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+
+
+class Histogram:
+    """HDR-style histogram of nanosecond durations with O(1) record."""
+
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = max(int(value), 0)
+        self.counts[_bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Lower bound of the bucket holding the given fraction (0-1) of samples."""
+        if self.count == 0:
+            return 0
+
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count and seen >= target:
+                return _bucket_lower_bound(index)
+        return self.max
+
+    def summary(self):
+        """Summary in microseconds."""
+        if self.count == 0:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000.0,
+            "p50_us": self.percentile(0.50) / 1000.0,
+            "p90_us": self.percentile(0.90) / 1000.0,
+            "p99_us": self.percentile(0.99) / 1000.0,
+            "max_us": self.max / 1000.0,
+        }
+
+
+class VisionMetrics:
+    """
+    Stage timings and frame outcome counters.
+    Usage: t0 = metrics.now(); ...; metrics.record_stage("detect", t0)
+    """
+
+    def __init__(self, dump_file=METRICS_FILE, dump_interval=DUMP_INTERVAL):
+        self.stages = {}
+        self.counters = {}
+        self.dump_file = dump_file
+        self.dump_interval = dump_interval
+        self.started_at = time.monotonic()
+        self.last_dump = self.started_at
+
+    @staticmethod
+    def now():
+        return time.perf_counter_ns()
+
+    def record_stage(self, name, start_ns):
+        """Records the time elapsed since start_ns for a stage. Returns the current time."""
+        end_ns = time.perf_counter_ns()
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        histogram.record(end_ns - start_ns)
+        return end_ns
+
+    def count(self, reason):
+        self.counters[reason] = self.counters.get(reason, 0) + 1
+
+    def snapshot(self):
+        """Returns all stage summaries and counters as a dict."""
+        return {
+            "uptime_s": time.monotonic() - self.started_at,
+            "stages": {name: h.summary() for name, h in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def maybe_dump(self):
+        """Writes a snapshot to the metrics file if DUMP_INTERVAL has elapsed."""
+        now = time.monotonic()
+        if now - self.last_dump < self.dump_interval:
+            return
+        self.last_dump = now
+        self.dump()
+
+    def dump(self):
+        calibration_store.save_json(self.dump_file, self.snapshot())
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
@@ -1,7 +1,11 @@
-import time
 import numpy as np
 import cv2
-from picamera2 import Picamera2
+
+import hal
+
+import calibration_store
+
+import vision_metrics
 
 # vision tuning parameters
 
@@ -9,7 +13,47 @@ from picamera2 import Picamera2
 CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 
-# Minimum ball detection area (pixels)
+# Camera warmup: poll frame metadata until exposure and gain stop changing
+# instead of sleeping a fixed 2 seconds
+WARMUP_TIMEOUT = 3.0  # Give up and lock whatever we have after this (seconds)
+WARMUP_TOLERANCE = 0.02  # Max relative change between frames to count as stable
+WARMUP_STABLE_FRAMES = 4  # Consecutive stable frames required
+
+# Lock auto-exposure/white balance after warmup so HSV margins don't drift
+LOCK_EXPOSURE = True
+# Lock the previous start's values again (same colours as the saved background
+# and hole reference) as long as live auto-exposure still agrees with them:
+# exposure time x gain within this relative difference. Otherwise the new
+# values are locked and saved.
+REUSE_SAVED_EXPOSURE = True
+EXPOSURE_REUSE_TOLERANCE = 0.15
+CAMERA_SETTINGS_FILE = "camera_settings.json"
+
+# All positions (FIELD_CORNERS, ball, hole) are expressed in this reference
+# frame, so the capture resolution can change without retuning thresholds
+REFERENCE_WIDTH = 640
+REFERENCE_HEIGHT = 480
+
+# Ball search: coarse pass on a 1/PYRAMID_SCALE image, then refinement in a
+# full-resolution window padded by REFINE_MARGIN pixels around the coarse blob
+PYRAMID_SCALE = 4
+REFINE_MARGIN = 12
+
+# Ball detector: "threshold" (white HSV range) or "background" (foreground
+# blob against a per-pixel model of the empty field, robust to static glare)
+BALL_DETECTOR = "threshold"
+
+# Background model
+BACKGROUND_FILE = "background_model.npy"
+BACKGROUND_BUILD_FRAMES = 15  # Frames in the median stack
+BACKGROUND_FG_THRESHOLD = 40  # Min brightening of every channel to be foreground
+BACKGROUND_UPDATE_STEP = 2  # Per-update step of the approximate running median
+BACKGROUND_EXCLUDE_RADIUS = 30  # Pixels around the ball kept out of updates
+# A saved model is rebuilt when the median field difference to a fresh frame
+# exceeds this (lighting changed; the ball alone barely moves the median)
+BACKGROUND_STALE_DIFF = 15
+
+# Minimum ball detection area (reference pixels)
 MIN_BALL_AREA = 100
 MAX_BALL_AREA = 4000
 
@@ -18,6 +62,30 @@ MAX_BALL_AREA = 4000
 LOWER_WHITE = np.array([0, 0, 200])
 UPPER_WHITE = np.array([180, 25, 255])
 
+# Reference thumbnail (grayscale, downscaled) used to check that the
+# scene still matches a cached calibration
+THUMBNAIL_SIZE = (320, 240)
+
+# Camera pose drift check (phase correlation of the field ROI against the
+# reference thumbnail saved at calibration time)
+DRIFT_MAX_AUTO_CORRECT = 20.0  # Larger shifts (reference pixels) need recalibration
+DRIFT_MAX_AUTO_ROTATION = 2.0  # Larger rotations (degrees) need recalibration
+DRIFT_MIN_RESPONSE = 0.05  # Below this the correlation peak is not trustworthy
+DRIFT_ESTIMATE_ROTATION = False  # Log-polar rotation estimate (costs a few ms)
+# Bright blobs (the ball) are blanked before correlating, so a ball that moved
+# since the reference does not read as camera motion
+DRIFT_MASK_BRIGHTNESS = 200  # Grayscale level, like the V floor of LOWER_WHITE
+DRIFT_MASK_GROW = 3  # Thumbnail pixels added around each blob (blur halo)
+
+# Hole detection: the hole is a dark, roughly circular region on the cloth
+HOLE_MIN_AREA = 80
+HOLE_MAX_AREA = 3000
+HOLE_DARK_RATIO = 0.45  # Darker than this fraction of the median cloth brightness
+HOLE_MIN_CIRCULARITY = 0.6  # 4*pi*area/perimeter^2, 1.0 = perfect circle
+HOLE_FIELD_MARGIN = 15  # Ignore the dark wooden border near the field edges
+HOLE_CONFIRM_FRAMES = 5
+HOLE_CONFIRM_TOLERANCE = 6  # Max distance (pixels) of each detection from the median
+
 # Field Coordinates (Bottom Left, Top Left, Top Right, Bottom Right)
 FIELD_CORNERS = np.array([
     [570, 90],   # Bottom Left
@@ -27,11 +95,44 @@ FIELD_CORNERS = np.array([
 ], dtype=np.int32)
 
 
+def _even_dft_size(n):
+    """Largest even size <= n that cv2.getOptimalDFTSize leaves unpadded."""
+    n -= n % 2
+    while n > 2 and cv2.getOptimalDFTSize(n) != n:
+        n -= 2
+    return n
+
+
+def exposure_matches(a, b):
+    """True if two exposure settings give about the same brightness (EXPOSURE_REUSE_TOLERANCE)."""
+    brightness_a = a["ExposureTime"] * a["AnalogueGain"]
+    brightness_b = b["ExposureTime"] * b["AnalogueGain"]
+    return abs(brightness_a - brightness_b) <= EXPOSURE_REUSE_TOLERANCE * max(brightness_b, 1e-6)
+
+
 class VisionSystem:
     def __init__(self):
         self.picam2 = None
         self.is_running = False
 
+        # Optional vision_worker.VisionWorker owning the camera in another process
+        self.worker = None
+
+        # Per-pixel BGR model of the empty field (uint8, capture resolution),
+        # plus a mask of pixels not observed empty yet
+        self.background = None
+        self.background_unknown = None
+
+        # Stage timings and frame outcome counters
+        self.metrics = vision_metrics.VisionMetrics()
+        self._background_coarse = None
+        self._field_mask_cache = None
+
+        # Field polygon after drift correction (FIELD_CORNERS at the reference pose)
+        self.field_corners = FIELD_CORNERS.copy()
+        self.drift_reference = None
+        self.drift = {"dx": 0.0, "dy": 0.0, "angle": 0.0}
+
     def start_camera(self):
         """Initializes and starts the camera preview."""
         if self.is_running:
@@ -39,20 +140,122 @@ class VisionSystem:
 
         print("Initializing camera...")
         try:
-            self.picam2 = Picamera2()
+            self.picam2 = hal.backend.open_camera()
             config = self.picam2.create_preview_configuration(
                 main={"size": (CAMERA_WIDTH, CAMERA_HEIGHT)}
             )
             self.picam2.configure(config)
             self.picam2.start()
 
-            # Camera warmup for auto-exposure and white balance
-            time.sleep(2.0)
+            # Auto-exposure always runs first, so a lighting change is noticed
+            settings = self.wait_for_exposure_convergence()
+            if LOCK_EXPOSURE:
+                saved = calibration_store.load_json(CAMERA_SETTINGS_FILE) if REUSE_SAVED_EXPOSURE else None
+                if saved and (settings is None or exposure_matches(saved, settings)):
+                    print(f"Applying saved exposure settings: {saved}")
+                    self.lock_exposure(saved)
+                elif settings:
+                    if saved:
+                        print(f"Lighting changed since the saved exposure {saved}. Locking new values.")
+                    self.lock_exposure(settings)
+                    calibration_store.save_json(CAMERA_SETTINGS_FILE, settings)
+
             self.is_running = True
+
+            if BALL_DETECTOR == "background":
+                self.load_or_build_background()
+
             print("Camera started and ready.")
         except Exception as e:
             print(f"VISION ERROR: Could not start camera: {e}")
 
+    def _read_exposure_settings(self):
+        """Reads exposure, gain and white balance of the next frame from its metadata."""
+        metadata = self.picam2.capture_metadata()
+        if "ExposureTime" not in metadata or "AnalogueGain" not in metadata:
+            return None
+
+        settings = {
+            "ExposureTime": int(metadata["ExposureTime"]),
+            "AnalogueGain": float(metadata["AnalogueGain"]),
+        }
+        if "ColourGains" in metadata:
+            settings["ColourGains"] = [float(g) for g in metadata["ColourGains"]]
+        return settings
+
+    def wait_for_exposure_convergence(self, target=None):
+        """
+        Polls frame metadata until exposure and gain are stable for
+        WARMUP_STABLE_FRAMES consecutive frames (or close to target, if given).
+        Returns the last settings read, even on timeout.
+        """
+        start = hal.clock.monotonic()
+        previous = None
+        settings = None
+        stable_frames = 0
+
+        def close(a, b):
+            return abs(a - b) <= WARMUP_TOLERANCE * max(abs(b), 1e-6)
+
+        while hal.clock.monotonic() - start < WARMUP_TIMEOUT:
+            settings = self._read_exposure_settings()
+            if settings is None:
+                # No metadata support: fall back to the old fixed warmup
+                hal.clock.sleep(max(0.0, 2.0 - (hal.clock.monotonic() - start)))
+                return None
+
+            reference = target if target is not None else previous
+            if reference is not None and all(
+                close(settings[key], reference[key])
+                for key in ("ExposureTime", "AnalogueGain")
+            ):
+                stable_frames += 1
+                if stable_frames >= WARMUP_STABLE_FRAMES:
+                    elapsed = hal.clock.monotonic() - start
+                    print(f"Exposure converged in {elapsed:.2f}s: {settings}")
+                    return settings
+            else:
+                stable_frames = 0
+
+            previous = settings
+
+        print(f"Exposure did not converge in {WARMUP_TIMEOUT}s, using {settings}")
+        return settings
+
+    def lock_exposure(self, settings):
+        """Disables AE/AWB and pins the given exposure, gain and colour gains."""
+        controls = {
+            "AeEnable": False,
+            "ExposureTime": int(settings["ExposureTime"]),
+            "AnalogueGain": float(settings["AnalogueGain"]),
+        }
+        if "ColourGains" in settings:
+            controls["AwbEnable"] = False
+            controls["ColourGains"] = tuple(settings["ColourGains"])
+
+        try:
+            self.picam2.set_controls(controls)
+        except Exception as e:
+            print(f"VISION WARNING: Could not lock exposure: {e}")
+
+    def recalibrate_exposure(self):
+        """
+        Re-enables auto exposure, waits for it to converge and saves the new
+        lock; the background model is checked against the new colours.
+        """
+        if not self.is_running:
+            return
+
+        self.picam2.set_controls({"AeEnable": True, "AwbEnable": True})
+        settings = self.wait_for_exposure_convergence()
+        if settings:
+            self.lock_exposure(settings)
+            calibration_store.save_json(CAMERA_SETTINGS_FILE, settings)
+
+        if BALL_DETECTOR == "background":
+            self.save_background()
+            self.load_or_build_background()
+
     def stop_camera(self):
         """Stops and closes the camera resources."""
         if not self.is_running or not self.picam2:
@@ -60,6 +263,9 @@ class VisionSystem:
 
         print("Stopping camera...")
         try:
+            self.save_background()
+            self.metrics.dump()
+
             self.picam2.stop()
             self.picam2.close()
             self.is_running = False
@@ -67,6 +273,507 @@ class VisionSystem:
         except Exception as e:
             print(f"VISION ERROR: Error stopping camera: {e}")
 
+    def attach_worker(self, worker):
+        """
+        Routes capture and ball detection through a running VisionWorker
+        (the local camera must be stopped first). Pass None to detach.
+        """
+        self.worker = worker
+
+    def _camera_available(self):
+        return self.is_running or self.worker is not None
+
+    def capture_frame(self):
+        """Captures a BGR frame from the running camera, in physical orientation."""
+        if self.worker is not None:
+            frame = self.worker.capture_frame()
+            if frame is None:
+                raise RuntimeError("Vision worker did not return a frame")
+            return frame
+
+        frame = self.picam2.capture_array()
+
+        # Drop the padding channel of XBGR/XRGB formats
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[:, :, :3]
+
+        # Rotate 180 degrees to match physical camera orientation
+        return cv2.rotate(frame, cv2.ROTATE_180)
+
+    def make_thumbnail(self, frame):
+        """Downscaled grayscale copy of a frame, cheap to store and compare."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+    def capture_thumbnail(self):
+        """Captures a frame and returns its thumbnail, or None if the camera is not running."""
+        if not self._camera_available():
+            return None
+
+        try:
+            return self.make_thumbnail(self.capture_frame())
+        except Exception as e:
+            print(f"VISION ERROR: {e}")
+            return None
+
+    def thumbnail_similarity(self, thumbnail, reference, shift=(0.0, 0.0)):
+        """
+        Normalized cross-correlation between two thumbnails (1.0 = identical scene).
+        Insensitive to global brightness changes and to where the ball is; a
+        moved camera or a covered field drops it sharply. shift (reference
+        pixels) is undone before comparing.
+        """
+        if thumbnail is None or reference is None or thumbnail.shape != reference.shape:
+            return 0.0
+
+        thumbnail = self._mask_bright(thumbnail.astype(np.float32))
+        reference = self._mask_bright(reference.astype(np.float32))
+
+        if shift[0] or shift[1]:
+            scale = self._thumbnail_scale()
+            translation = np.float32([[1, 0, -shift[0] * scale], [0, 1, -shift[1] * scale]])
+            thumbnail = cv2.warpAffine(
+                thumbnail, translation, THUMBNAIL_SIZE, borderMode=cv2.BORDER_REPLICATE
+            )
+
+        score = cv2.matchTemplate(thumbnail, reference, cv2.TM_CCOEFF_NORMED)
+        return float(score[0][0])
+
+    def set_drift_reference(self, thumbnail):
+        """Sets the thumbnail that defines the reference camera pose and clears any correction."""
+        self.drift_reference = thumbnail
+        self.drift = {"dx": 0.0, "dy": 0.0, "angle": 0.0}
+        self.field_corners = FIELD_CORNERS.copy()
+
+    def _thumbnail_scale(self):
+        return THUMBNAIL_SIZE[0] / REFERENCE_WIDTH
+
+    def _field_roi(self, thumbnail):
+        """Crops the bounding box of the reference field polygon out of a thumbnail."""
+        scale = self._thumbnail_scale()
+        x, y, w, h = cv2.boundingRect((FIELD_CORNERS * scale).astype(np.int32))
+        # cv2.phaseCorrelate zero-pads to the optimal DFT size and mislocates
+        # peaks when that padding is odd, so shrink to an even optimal size
+        w, h = _even_dft_size(w), _even_dft_size(h)
+        return self._mask_bright(thumbnail[y:y + h, x:x + w].astype(np.float32))
+
+    def _mask_bright(self, image):
+        """Fills bright blobs (the ball) with the median brightness of the rest."""
+        mask = (image >= DRIFT_MASK_BRIGHTNESS).astype(np.uint8)
+        if not mask.any():
+            return image
+
+        kernel = cv2.getStructuringElement(
+            cv2.MORPH_ELLIPSE, (2 * DRIFT_MASK_GROW + 1, 2 * DRIFT_MASK_GROW + 1)
+        )
+        mask = cv2.dilate(mask, kernel).astype(bool)
+        if mask.all():
+            return image
+
+        image = image.copy()
+        image[mask] = np.median(image[~mask])
+        return image
+
+    def _estimate_rotation(self, roi, reference_roi):
+        """
+        Rotation (degrees) of roi relative to reference_roi, from the phase
+        correlation of their log-polar magnitude spectra (translation invariant).
+        """
+        # Frequency axes only rotate with the image on a square patch
+        h, w = reference_roi.shape
+        side = min(h, w)
+        y0, x0 = (h - side) // 2, (w - side) // 2
+        reference_roi = reference_roi[y0:y0 + side, x0:x0 + side]
+        roi = roi[y0:y0 + side, x0:x0 + side]
+
+        window = cv2.createHanningWindow((side, side), cv2.CV_32F)
+        center = (side / 2.0, side / 2.0)
+
+        # One row per degree, so the ROI size does not limit angular resolution
+        angle_bins = 360
+
+        def log_polar_spectrum(image):
+            spectrum = np.fft.fftshift(np.abs(np.fft.fft2(image * window)))
+            spectrum = np.log1p(spectrum).astype(np.float32)
+            return cv2.warpPolar(
+                spectrum, (side, angle_bins), center, side / 2.0, cv2.WARP_POLAR_LOG
+            )
+
+        (_, shift_angle), _ = cv2.phaseCorrelate(
+            log_polar_spectrum(reference_roi), log_polar_spectrum(roi)
+        )
+        # Magnitude spectra are symmetric, so the angle is only known modulo 180
+        angle = 360.0 * shift_angle / angle_bins
+        return (angle + 90.0) % 180.0 - 90.0
+
+    def measure_drift(self, thumbnail=None):
+        """
+        Measures how far the camera moved since the reference was taken.
+        Returns: dict with dx, dy (reference pixels), angle (degrees) and the
+        correlation response, or None if no reference/frame is available.
+        """
+        if self.drift_reference is None:
+            return None
+
+        if thumbnail is None:
+            thumbnail = self.capture_thumbnail()
+            if thumbnail is None:
+                return None
+
+        reference_roi = self._field_roi(self.drift_reference)
+        roi = self._field_roi(thumbnail)
+        h, w = reference_roi.shape
+
+        angle = 0.0
+        if DRIFT_ESTIMATE_ROTATION:
+            angle = self._estimate_rotation(roi, reference_roi)
+            # Undo the rotation so the translation estimate is not biased by it
+            rotation = cv2.getRotationMatrix2D((w / 2.0, h / 2.0), angle, 1.0)
+            roi = cv2.warpAffine(roi, rotation, (w, h), borderMode=cv2.BORDER_REFLECT)
+
+        window = cv2.createHanningWindow((w, h), cv2.CV_32F)
+        (dx, dy), response = cv2.phaseCorrelate(reference_roi, roi, window)
+
+        scale = self._thumbnail_scale()
+        return {"dx": dx / scale, "dy": dy / scale, "angle": angle, "response": response}
+
+    def apply_drift(self, point):
+        """Maps a point from the reference camera pose to the current pose."""
+        if point is None:
+            return None
+
+        x, y = float(point[0]), float(point[1])
+        if self.drift["angle"]:
+            # Rotation is estimated about the centre of the field ROI
+            rx, ry, rw, rh = cv2.boundingRect(FIELD_CORNERS)
+            cx, cy = rx + rw / 2.0, ry + rh / 2.0
+            # Same convention as cv2.getRotationMatrix2D(center, -angle, 1)
+            theta = np.deg2rad(-self.drift["angle"])
+            x, y = (
+                cx + (x - cx) * np.cos(theta) + (y - cy) * np.sin(theta),
+                cy - (x - cx) * np.sin(theta) + (y - cy) * np.cos(theta),
+            )
+
+        return (int(round(x + self.drift["dx"])), int(round(y + self.drift["dy"])))
+
+    def remove_drift(self, point):
+        """Maps a point from the current camera pose back to the reference pose."""
+        if point is None:
+            return None
+
+        x = float(point[0]) - self.drift["dx"]
+        y = float(point[1]) - self.drift["dy"]
+        if self.drift["angle"]:
+            rx, ry, rw, rh = cv2.boundingRect(FIELD_CORNERS)
+            cx, cy = rx + rw / 2.0, ry + rh / 2.0
+            theta = np.deg2rad(self.drift["angle"])
+            x, y = (
+                cx + (x - cx) * np.cos(theta) + (y - cy) * np.sin(theta),
+                cy - (x - cx) * np.sin(theta) + (y - cy) * np.cos(theta),
+            )
+
+        return (int(round(x)), int(round(y)))
+
+    def check_camera_drift(self):
+        """
+        Measures drift and shifts the field polygon for small movements.
+        Returns: "ok", "corrected", "recalibrate" (large drift) or "unavailable".
+        """
+        drift = self.measure_drift()
+        if drift is None or drift["response"] < DRIFT_MIN_RESPONSE:
+            print("Drift check unavailable (no reference or weak correlation).")
+            return "unavailable"
+
+        magnitude = float(np.hypot(drift["dx"], drift["dy"]))
+        print(
+            f"Camera drift: dx={drift['dx']:.1f} dy={drift['dy']:.1f} "
+            f"angle={drift['angle']:.2f} (response {drift['response']:.2f})"
+        )
+
+        if magnitude > DRIFT_MAX_AUTO_CORRECT or abs(drift["angle"]) > DRIFT_MAX_AUTO_ROTATION:
+            print("VISION WARNING: Camera moved too much. Recalibration required.")
+            return "recalibrate"
+
+        self.drift = {"dx": drift["dx"], "dy": drift["dy"], "angle": drift["angle"]}
+        self.field_corners = np.array(
+            [self.apply_drift(corner) for corner in FIELD_CORNERS], dtype=np.int32
+        )
+
+        return "corrected" if magnitude >= 1.0 else "ok"
+
+    def _find_hole_candidate(self, frame):
+        """
+        Searches the field for the darkest circular blob.
+        Returns: (x, y) of the best candidate or None.
+        """
+        hsv = cv2.cvtColor(cv2.GaussianBlur(frame, (5, 5), 0), cv2.COLOR_BGR2HSV)
+        value = hsv[:, :, 2]
+
+        field_mask = np.zeros(value.shape, np.uint8)
+        cv2.fillPoly(field_mask, [self._corners_for(frame)], 255)
+        field_mask = cv2.erode(
+            field_mask, np.ones((2 * HOLE_FIELD_MARGIN + 1,) * 2, np.uint8)
+        )
+
+        cloth_brightness = np.median(value[field_mask > 0])
+        dark = (value < cloth_brightness * HOLE_DARK_RATIO).astype(np.uint8) * 255
+        dark = cv2.bitwise_and(dark, field_mask)
+        dark = cv2.morphologyEx(dark, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+
+        contours, _ = cv2.findContours(dark, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        h, w = frame.shape[:2]
+        area_scale = (REFERENCE_WIDTH / w) * (REFERENCE_HEIGHT / h)
+
+        best, best_score = None, 0.0
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            perimeter = cv2.arcLength(contour, True)
+            if not HOLE_MIN_AREA < area * area_scale < HOLE_MAX_AREA or perimeter == 0:
+                continue
+
+            circularity = 4 * np.pi * area / (perimeter * perimeter)
+            if circularity < HOLE_MIN_CIRCULARITY:
+                continue
+
+            # Prefer round blobs that are much darker than the cloth
+            blob_mask = np.zeros(value.shape, np.uint8)
+            cv2.drawContours(blob_mask, [contour], -1, 255, -1)
+            contrast = 1.0 - cv2.mean(value, mask=blob_mask)[0] / max(cloth_brightness, 1)
+            score = circularity * contrast
+            if score > best_score:
+                M = cv2.moments(contour)
+                best = self._to_reference(frame, M["m10"] / M["m00"], M["m01"] / M["m00"])
+                best_score = score
+
+        return best
+
+    def detect_hole(self):
+        """
+        Finds the hole directly in the image, confirmed over HOLE_CONFIRM_FRAMES
+        frames so a shadow or passing hand is not taken for it.
+        Returns: tuple (x, y) of hole coordinates, or None if not found.
+        """
+        if not self._camera_available():
+            return None
+
+        print("Searching for the hole...")
+        detections = []
+        try:
+            for _ in range(HOLE_CONFIRM_FRAMES):
+                candidate = self._find_hole_candidate(self.capture_frame())
+                if candidate is None:
+                    print("Hole not found in frame.")
+                    return None
+                detections.append(candidate)
+        except Exception as e:
+            print(f"VISION ERROR: {e}")
+            return None
+
+        detections = np.array(detections)
+        median = np.median(detections, axis=0)
+        spread = np.max(np.hypot(*(detections - median).T))
+        if spread > HOLE_CONFIRM_TOLERANCE:
+            print(f"Hole detections inconsistent (spread {spread:.1f}px).")
+            return None
+
+        hole_coords = (int(round(median[0])), int(round(median[1])))
+        print(f"Hole detected at {hole_coords}")
+        return hole_coords
+
+    def load_or_build_background(self):
+        """Loads the saved background model, or builds a new one if missing or stale."""
+        saved = calibration_store.load_array(BACKGROUND_FILE)
+        if saved is not None and saved.shape == (CAMERA_HEIGHT, CAMERA_WIDTH, 4):
+            difference = self._background_difference(saved[:, :, :3], saved[:, :, 3])
+            if difference is not None and difference <= BACKGROUND_STALE_DIFF:
+                print(f"Loaded saved background model (difference {difference:.0f}).")
+                self._set_background(saved[:, :, :3], saved[:, :, 3])
+                return
+            if difference is None:
+                print("Saved background model could not be checked. Rebuilding.")
+            else:
+                print(f"Saved background model is stale (difference {difference:.0f}). Rebuilding.")
+
+        self.build_background_model()
+
+    def _background_difference(self, background, unknown):
+        """
+        Median absolute difference (max over channels) between a fresh frame
+        and a background model, over the known field pixels. None without a frame.
+        """
+        try:
+            frame = self.capture_frame()
+        except Exception as e:
+            print(f"VISION ERROR: {e}")
+            return None
+        if frame.shape != background.shape:
+            return None
+
+        mask = self._field_mask(frame) > 0
+        if unknown is not None:
+            mask &= unknown == 0
+        if not mask.any():
+            return None
+
+        difference = cv2.absdiff(frame, background).max(axis=2)
+        return float(np.median(difference[mask]))
+
+    def save_background(self):
+        """Persists the model, with the unknown-pixel mask as a fourth channel."""
+        if self.background is None:
+            return
+
+        unknown = self.background_unknown
+        if unknown is None:
+            unknown = np.zeros(self.background.shape[:2], np.uint8)
+        calibration_store.save_array(
+            BACKGROUND_FILE, np.dstack([self.background, unknown])
+        )
+
+    def _set_background(self, background, unknown):
+        self.background = np.ascontiguousarray(background)
+        self.background_unknown = unknown if unknown is not None and unknown.any() else None
+
+        h, w = background.shape[:2]
+        self._background_coarse = cv2.resize(
+            background, (w // PYRAMID_SCALE, h // PYRAMID_SCALE), interpolation=cv2.INTER_AREA
+        )
+
+    def build_background_model(self, num_frames=BACKGROUND_BUILD_FRAMES):
+        """
+        Builds the background as the per-pixel median of a stack of frames.
+        The ball sits still somewhere during the build and cannot be told
+        apart from static glare yet, so every white blob is marked unknown;
+        those pixels are filled in from the first frame in which the ball is
+        known to be elsewhere (see update_background).
+        """
+        print(f"Building background model from {num_frames} frames...")
+        try:
+            stack = np.stack([self.capture_frame() for _ in range(num_frames)])
+        except Exception as e:
+            print(f"VISION ERROR: Could not build background: {e}")
+            return
+
+        background = np.median(stack, axis=0).astype(np.uint8)
+        unknown = cv2.dilate(
+            self._white_mask(background, 7),
+            np.ones((2 * BACKGROUND_EXCLUDE_RADIUS // 3 + 1,) * 2, np.uint8),
+        )
+
+        self._set_background(background, unknown)
+        self.save_background()
+        print("Background model ready.")
+
+    def update_background(self, frame, ball_coords):
+        """
+        Moves every pixel of the model a fixed step towards the frame (an
+        approximate running median, integer-only), except around the ball.
+        Pixels still unknown from the build are copied over directly.
+        """
+        if self.background is None or frame.shape != self.background.shape:
+            return
+
+        h, w = frame.shape[:2]
+        update_mask = np.full((h, w), 255, np.uint8)
+        cx, cy = int(ball_coords[0] * w / REFERENCE_WIDTH), int(ball_coords[1] * h / REFERENCE_HEIGHT)
+        cv2.circle(update_mask, (cx, cy), BACKGROUND_EXCLUDE_RADIUS, 0, -1)
+
+        background = self.background.copy()
+        unknown = self.background_unknown
+        if unknown is not None:
+            resolved = cv2.bitwise_and(unknown, update_mask)
+            cv2.copyTo(frame, resolved, background)
+            unknown = cv2.subtract(unknown, resolved)
+
+        brighter = cv2.compare(frame, background, cv2.CMP_GT)
+        darker = cv2.compare(frame, background, cv2.CMP_LT)
+        brighter = cv2.bitwise_and(brighter, brighter, mask=update_mask)
+        darker = cv2.bitwise_and(darker, darker, mask=update_mask)
+
+        # Saturating uint8 arithmetic; never steps past the frame value
+        step = np.full_like(background, BACKGROUND_UPDATE_STEP)
+        up = cv2.min(cv2.subtract(frame, background), step)
+        down = cv2.min(cv2.subtract(background, frame), step)
+        background = cv2.add(background, cv2.bitwise_and(up, brighter))
+        background = cv2.subtract(background, cv2.bitwise_and(down, darker))
+
+        self._set_background(background, unknown)
+
+    def _foreground(self, frame, background, field_mask, unknown=None):
+        """Pixels brighter than the background in every channel, inside the field."""
+        b, g, r = cv2.split(cv2.subtract(frame, background))
+        foreground = cv2.compare(
+            cv2.min(cv2.min(b, g), r), BACKGROUND_FG_THRESHOLD, cv2.CMP_GT
+        )
+        foreground = cv2.bitwise_and(foreground, field_mask)
+        if unknown is not None:
+            foreground = cv2.bitwise_and(foreground, cv2.bitwise_not(unknown))
+        return foreground
+
+    def _field_mask(self, frame):
+        """Filled field polygon at the frame's resolution (cached per size and pose)."""
+        key = (frame.shape[:2], self.field_corners.tobytes())
+        if self._field_mask_cache is None or self._field_mask_cache[0] != key:
+            mask = np.zeros(frame.shape[:2], np.uint8)
+            cv2.fillPoly(mask, [self._corners_for(frame)], 255)
+            self._field_mask_cache = (key, mask)
+        return self._field_mask_cache[1]
+
+    def _detect_ball_background(self, frame):
+        """
+        Finds the ball as the largest blob brighter than the background model
+        in every channel, inside the field: coarse search at 1/PYRAMID_SCALE,
+        then refinement in a full-resolution window. Same result format as
+        _detect_ball_threshold.
+        """
+        h, w = frame.shape[:2]
+
+        coarse = cv2.resize(
+            frame, (w // PYRAMID_SCALE, h // PYRAMID_SCALE), interpolation=cv2.INTER_AREA
+        )
+        unknown_coarse = None
+        if self.background_unknown is not None:
+            unknown_coarse = cv2.resize(
+                self.background_unknown, coarse.shape[1::-1], interpolation=cv2.INTER_NEAREST
+            )
+        foreground = self._foreground(
+            coarse, self._background_coarse, self._field_mask(coarse), unknown_coarse
+        )
+        contours, _ = cv2.findContours(
+            foreground, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        if not contours:
+            # The ball may still be where it was during the build
+            if self.background_unknown is not None:
+                return self._detect_ball_threshold(frame)
+            return {"reason": "no_white"}
+
+        x, y, bw, bh = cv2.boundingRect(max(contours, key=cv2.contourArea))
+
+        pad = REFINE_MARGIN
+        x0 = max(0, x * PYRAMID_SCALE - pad)
+        y0 = max(0, y * PYRAMID_SCALE - pad)
+        x1 = min(w, (x + bw) * PYRAMID_SCALE + pad)
+        y1 = min(h, (y + bh) * PYRAMID_SCALE + pad)
+
+        window = (slice(y0, y1), slice(x0, x1))
+        unknown = None if self.background_unknown is None else self.background_unknown[window]
+        foreground = self._foreground(
+            frame[window], self.background[window], self._field_mask(frame)[window], unknown
+        )
+        kernel = np.ones((5, 5), np.uint8)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_OPEN, kernel)
+        foreground = cv2.morphologyEx(foreground, cv2.MORPH_CLOSE, kernel)
+
+        contours, _ = cv2.findContours(
+            foreground, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0)
+        )
+        if not contours:
+            return {"reason": "no_white"}
+
+        return self._classify_contour(frame, max(contours, key=cv2.contourArea))
+
     def is_point_in_quad(self, point, corners):
         """
         Checks if a point (x, y) is inside the quadrilateral defined by corners.
@@ -74,10 +781,141 @@ class VisionSystem:
         """
         return cv2.pointPolygonTest(corners, point, False) >= 0
 
+    def _to_reference(self, frame, x, y):
+        """Converts capture pixel coordinates to the REFERENCE_WIDTH x REFERENCE_HEIGHT frame."""
+        h, w = frame.shape[:2]
+        return x * REFERENCE_WIDTH / w, y * REFERENCE_HEIGHT / h
+
+    def _corners_for(self, frame):
+        """Field polygon in the pixel coordinates of the given frame."""
+        h, w = frame.shape[:2]
+        scale = np.array([w / REFERENCE_WIDTH, h / REFERENCE_HEIGHT])
+        return (self.field_corners * scale).astype(np.int32)
+
+    def _white_mask(self, image, kernel_size, open_mask=True):
+        """Blur, HSV threshold and morphological cleanup of the white ball colour."""
+        blurred = cv2.GaussianBlur(image, (kernel_size, kernel_size), 0)
+        hsv = cv2.cvtColor(blurred, cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, LOWER_WHITE, UPPER_WHITE)
+
+        kernel = np.ones((kernel_size, kernel_size), np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        if open_mask:
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        return mask
+
+    def _detect_ball(self, frame):
+        """Runs the configured BALL_DETECTOR on a frame."""
+        if BALL_DETECTOR == "background" and self.background is not None:
+            return self._detect_ball_background(frame)
+        return self._detect_ball_threshold(frame)
+
+    def _detect_ball_threshold(self, frame):
+        """
+        Two-level search: find the largest white blob on a 1/PYRAMID_SCALE image,
+        then refine its contour and centroid in a small full-resolution window.
+        Returns: dict with "reason" ("ok", "out_of_bounds", "bad_area", "no_white")
+        and, when a blob was found, "contour" (frame pixels), "area" and "center"
+        (reference coordinates).
+        """
+        h, w = frame.shape[:2]
+        start_ns = self.metrics.now()
+
+        # Coarse level. No opening: at this scale it would erase a distant ball.
+        coarse = cv2.resize(
+            frame, (w // PYRAMID_SCALE, h // PYRAMID_SCALE), interpolation=cv2.INTER_AREA
+        )
+        coarse_mask = self._white_mask(coarse, 3, open_mask=False)
+        contours, _ = cv2.findContours(
+            coarse_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        t = self.metrics.record_stage("coarse_search", start_ns)
+        if not contours:
+            return {"reason": "no_white"}
+
+        x, y, bw, bh = cv2.boundingRect(max(contours, key=cv2.contourArea))
+
+        # Fine level: window around the coarse blob, padded for the blur/morphology
+        pad = REFINE_MARGIN
+        x0 = max(0, x * PYRAMID_SCALE - pad)
+        y0 = max(0, y * PYRAMID_SCALE - pad)
+        x1 = min(w, (x + bw) * PYRAMID_SCALE + pad)
+        y1 = min(h, (y + bh) * PYRAMID_SCALE + pad)
+
+        mask = self._white_mask(frame[y0:y1, x0:x1], 7)
+        contours, _ = cv2.findContours(
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x0, y0)
+        )
+        self.metrics.record_stage("refine", t)
+        if not contours:
+            return {"reason": "no_white"}
+
+        return self._classify_contour(frame, max(contours, key=cv2.contourArea))
+
+    def _classify_contour(self, frame, largest_contour):
+        """Area and field-boundary checks shared by the ball detectors."""
+        h, w = frame.shape[:2]
+
+        # Areas are specified in reference pixels
+        area_scale = (REFERENCE_WIDTH / w) * (REFERENCE_HEIGHT / h)
+        area = cv2.contourArea(largest_contour) * area_scale
+        detection = {"contour": largest_contour, "area": area}
+
+        M = cv2.moments(largest_contour)
+        if not MIN_BALL_AREA < area < MAX_BALL_AREA or M["m00"] == 0:
+            detection["reason"] = "bad_area"
+            return detection
+
+        cX, cY = self._to_reference(frame, M["m10"] / M["m00"], M["m01"] / M["m00"])
+        detection["center"] = (int(cX), int(cY))
+
+        # Check if inside field boundaries
+        if self.is_point_in_quad(detection["center"], self.field_corners):
+            detection["reason"] = "ok"
+        else:
+            detection["reason"] = "out_of_bounds"
+        return detection
+
+    def _draw_debug(self, frame, detection):
+        """Draws the detection result and the field polygon onto the frame."""
+        if "center" not in detection:
+            return
+
+        cX, cY = detection["center"]
+        area = int(detection["area"])
+        if detection["reason"] == "ok":
+            debug_color = (0, 255, 0)  # Green for valid
+            status_text = f"Pos:{detection['center']} Area:{area}"
+        else:
+            debug_color = (0, 0, 255)  # Red for out of bounds
+            status_text = f"OUT:{cX},{cY} Area:{area}"
+
+        h, w = frame.shape[:2]
+        px, py = int(cX * w / REFERENCE_WIDTH), int(cY * h / REFERENCE_HEIGHT)
+        cv2.drawContours(frame, [detection["contour"]], -1, debug_color, 2)
+        cv2.circle(frame, (px, py), 5, debug_color, -1)
+        if len(self.field_corners) > 0:
+            cv2.polylines(frame, [self._corners_for(frame)], True, (255, 0, 0), 2)
+
+        cv2.putText(
+            frame,
+            status_text,
+            (px - 20, py - 20),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (255, 255, 255),
+            2,
+        )
+
     def get_live_ball_position(self):
         """
-        Captures a frame from the running camera, processes it, and returns (x, y).
+        Captures a frame from the running camera, processes it, and returns (x, y)
+        in reference coordinates (REFERENCE_WIDTH x REFERENCE_HEIGHT), whatever
+        the capture resolution.
         """
+        if self.worker is not None:
+            return self.worker.get_live_ball_position()
+
         if not self.is_running:
             print("Camera not running. Attempting to start...")
             self.start_camera()
@@ -86,79 +924,46 @@ class VisionSystem:
 
         print("Capturing frame...")
         ball_coords = None
+        metrics = self.metrics
+        start_ns = metrics.now()
 
         try:
             # Capture from existing stream
-            frame = self.picam2.capture_array()
-
-            # Rotate 180 degrees to match physical camera orientation
-            frame = cv2.rotate(frame, cv2.ROTATE_180)
-
-            # 2. Blur (Reduces noise)
-            blurred_frame = cv2.GaussianBlur(frame, (7, 7), 0)
-
-            # 3. Convert to HSV
-            hsv_frame = cv2.cvtColor(blurred_frame, cv2.COLOR_BGR2HSV)
-
-            # 4. Mask
-            mask = cv2.inRange(hsv_frame, LOWER_WHITE, UPPER_WHITE)
-
-            # 5. Morphological Operations
-            morph_kernel = np.ones((7, 7), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, morph_kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, morph_kernel)
-
-            # 6. Find Contours
-            contours, _ = cv2.findContours(
-                mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-            )
-
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                area = cv2.contourArea(largest_contour)
-
-                if MIN_BALL_AREA < area < MAX_BALL_AREA:
-                    M = cv2.moments(largest_contour)
-                    if M["m00"] != 0:
-                        cX = int(M["m10"] / M["m00"])
-                        cY = int(M["m01"] / M["m00"])
-                        
-                        # Check if inside field boundaries
-                        if self.is_point_in_quad((cX, cY), FIELD_CORNERS):
-                            ball_coords = (cX, cY)
-                            debug_color = (0, 255, 0) # Green for valid
-                            status_text = f"Pos:{ball_coords} Area:{int(area)}"
-                            print(f"Ball found at {ball_coords} (Area: {area})")
-                        else:
-                            debug_color = (0, 0, 255) # Red for out of bounds
-                            status_text = f"OUT:{cX},{cY} Area:{int(area)}"
-                            print(f"Ball ignored at {cX},{cY} (Out of bounds)")
-
-                        # Draw Debug Info
-                        cv2.drawContours(frame, [largest_contour], -1, debug_color, 2)
-                        cv2.circle(frame, (cX, cY), 5, debug_color, -1)
-                        if len(FIELD_CORNERS) > 0:
-                            cv2.polylines(frame, [FIELD_CORNERS], True, (255, 0, 0), 2)
-
-                        cv2.putText(
-                            frame,
-                            status_text,
-                            (cX - 20, cY - 20),
-                            cv2.FONT_HERSHEY_SIMPLEX,
-                            0.5,
-                            (255, 255, 255),
-                            2,
-                        )
-                else:
-                    print(f"Object detected but too small (Area: {area})")
+            frame = self.capture_frame()
+            t = metrics.record_stage("capture", start_ns)
+
+            detection = self._detect_ball(frame)
+            t = metrics.record_stage("detect", t)
+            reason = detection["reason"]
+            metrics.count(reason)
+
+            if reason == "ok":
+                ball_coords = detection["center"]
+                print(f"Ball found at {ball_coords} (Area: {detection['area']})")
+
+                # The ball's location is known, so the rest of the field is empty
+                if BALL_DETECTOR == "background":
+                    self.update_background(frame, ball_coords)
+                    t = metrics.record_stage("background_update", t)
+            elif reason == "out_of_bounds":
+                cX, cY = detection["center"]
+                print(f"Ball ignored at {cX},{cY} (Out of bounds)")
+            elif reason == "bad_area":
+                print(f"Object detected but too small (Area: {detection['area']})")
             else:
                 print("No white objects found.")
 
             # Save image for verification
+            self._draw_debug(frame, detection)
             cv2.imwrite("debug_view.jpg", frame)
+            metrics.record_stage("debug_write", t)
 
         except Exception as e:
             print(f"VISION ERROR: {e}")
+            metrics.count("error")
+
+        metrics.record_stage("total", start_ns)
+        metrics.maybe_dump()
 
         return ball_coords
 
@@ -0,0 +1,205 @@
+import time
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import vision_system
+
+
+# Optional mode: capture and detection run in their own process so image
+# processing never competes for the GIL with the bit-banged stepper loops.
+# Frames and results are exchanged through shared memory (no pickling);
+# only the two wakeup events cross the process boundary.
+
+# Number of frame slots in the ring buffer
+FRAME_SLOTS = 4
+
+# Request kinds
+REQUEST_BALL = 1  # Capture, detect and publish frame + ball position
+REQUEST_FRAME = 2  # Capture and publish the frame only
+
+# Control block layout (int64): request seq, request kind, stop flag, field corners
+CTRL_REQUEST_SEQ = 0
+CTRL_REQUEST_KIND = 1
+CTRL_STOP = 2
+CTRL_CORNERS = 3  # 8 values: FIELD_CORNERS flattened
+CTRL_SIZE = CTRL_CORNERS + 8
+
+# Result row layout (float64), one row per frame slot
+RES_SEQ = 0  # Request seq answered (written last)
+RES_FOUND = 1
+RES_X = 2
+RES_Y = 3
+RES_CAPTURED_AT = 4  # time.monotonic() in the worker
+RES_DONE_AT = 5
+RES_SIZE = 6
+
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _worker_main(names, frame_shape, request_event, response_event):
+    """Worker process entry point: owns the camera and answers requests."""
+    ctrl_shm, ctrl = _attach(names["ctrl"], (CTRL_SIZE,), np.int64)
+    frames_shm, frames = _attach(names["frames"], (FRAME_SLOTS,) + frame_shape, np.uint8)
+    results_shm, results = _attach(names["results"], (FRAME_SLOTS, RES_SIZE), np.float64)
+
+    vision = vision_system.VisionSystem()
+    vision.start_camera()
+
+    last_seq = 0
+    try:
+        while not ctrl[CTRL_STOP]:
+            # Short timeout so a stop request is noticed promptly
+            if not request_event.wait(0.1):
+                continue
+            request_event.clear()
+
+            seq = int(ctrl[CTRL_REQUEST_SEQ])
+            if seq == last_seq:
+                continue
+            last_seq = seq
+            kind = int(ctrl[CTRL_REQUEST_KIND])
+
+            slot = seq % FRAME_SLOTS
+            row = results[slot]
+            row[RES_FOUND] = 0
+
+            try:
+                captured_at = time.monotonic()
+                frame = vision.capture_frame()
+                frames[slot, : frame.shape[0], : frame.shape[1]] = frame
+
+                if kind == REQUEST_BALL:
+                    vision.field_corners = ctrl[CTRL_CORNERS:CTRL_SIZE].reshape(4, 2).astype(np.int32)
+                    detection = vision._detect_ball(frame)
+                    if detection["reason"] == "ok":
+                        row[RES_X], row[RES_Y] = detection["center"]
+                        row[RES_FOUND] = 1
+
+                row[RES_CAPTURED_AT] = captured_at
+            except Exception as e:
+                print(f"VISION WORKER ERROR: {e}")
+
+            row[RES_DONE_AT] = time.monotonic()
+            row[RES_SEQ] = seq
+            response_event.set()
+    finally:
+        vision.stop_camera()
+        del ctrl, frames, results
+        for shm in (ctrl_shm, frames_shm, results_shm):
+            shm.close()
+
+
+class VisionWorker:
+    """
+    Runs VisionSystem capture and detection in a dedicated process.
+    get_live_ball_position() mirrors VisionSystem.get_live_ball_position.
+    """
+
+    def __init__(self, width=vision_system.CAMERA_WIDTH, height=vision_system.CAMERA_HEIGHT):
+        self.frame_shape = (height, width, 3)
+        self.process = None
+        self.seq = 0
+        self.last_latency = None
+        self._shms = []
+
+    def _create(self, shape, dtype):
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self._shms.append(shm)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array[:] = 0
+        return shm.name, array
+
+    def start(self):
+        """Creates the shared buffers and starts the worker process."""
+        if self.process is not None:
+            return
+
+        ctrl_name, self.ctrl = self._create((CTRL_SIZE,), np.int64)
+        frames_name, self.frames = self._create((FRAME_SLOTS,) + self.frame_shape, np.uint8)
+        results_name, self.results = self._create((FRAME_SLOTS, RES_SIZE), np.float64)
+        names = {"ctrl": ctrl_name, "frames": frames_name, "results": results_name}
+
+        # spawn: the child gets a clean interpreter, without our GPIO handles
+        ctx = mp.get_context("spawn")
+        self.request_event = ctx.Event()
+        self.response_event = ctx.Event()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(names, self.frame_shape, self.request_event, self.response_event),
+            name="vision_worker",
+            daemon=True,
+        )
+        self.process.start()
+        print(f"Vision worker started (pid {self.process.pid}).")
+
+    def stop(self):
+        """Stops the worker process and releases the shared buffers."""
+        if self.process is None:
+            return
+
+        self.ctrl[CTRL_STOP] = 1
+        self.request_event.set()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+
+        del self.ctrl, self.frames, self.results
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms = []
+        print("Vision worker stopped.")
+
+    def _request(self, kind, timeout):
+        """Posts a request and waits for its result row. Returns the slot or None on timeout."""
+        if self.process is None:
+            return None
+
+        self.seq += 1
+        self.ctrl[CTRL_CORNERS:CTRL_SIZE] = (
+            vision_system.vision_system_instance.field_corners.reshape(-1)
+        )
+        self.ctrl[CTRL_REQUEST_KIND] = kind
+        self.ctrl[CTRL_REQUEST_SEQ] = self.seq
+
+        requested_at = time.monotonic()
+        slot = self.seq % FRAME_SLOTS
+        self.response_event.clear()
+        self.request_event.set()
+
+        deadline = requested_at + timeout
+        while self.results[slot, RES_SEQ] != self.seq:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.process.is_alive():
+                print("VISION WORKER: request timed out.")
+                return None
+            self.response_event.wait(remaining)
+            self.response_event.clear()
+
+        self.last_latency = time.monotonic() - requested_at
+        return slot
+
+    def get_live_ball_position(self, timeout=2.0):
+        """Captures and processes a frame in the worker. Returns (x, y) or None."""
+        slot = self._request(REQUEST_BALL, timeout)
+        if slot is None or not self.results[slot, RES_FOUND]:
+            return None
+
+        return (int(self.results[slot, RES_X]), int(self.results[slot, RES_Y]))
+
+    def capture_frame(self, timeout=2.0):
+        """Captures a frame in the worker and returns a copy of it, or None."""
+        slot = self._request(REQUEST_FRAME, timeout)
+        if slot is None:
+            return None
+
+        # Copy out: the slot is reused FRAME_SLOTS requests later
+        return self.frames[slot].copy()